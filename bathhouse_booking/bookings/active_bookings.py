@@ -0,0 +1,138 @@
+"""
+Счетчик активных бронирований клиента.
+
+Client.active_bookings_count - число approved бронирований клиента, которые
+еще не закончились; по нему проверяется лимит MAX_ACTIVE_BOOKINGS_PER_CLIENT
+без запросов к таблице бронирований. Счетчик меняется атомарным
+UPDATE ... SET active_bookings_count = active_bookings_count +/- 1 при
+подтверждении и отклонении (transitions.py) и при сохранении/удалении
+бронирования (signals.py). Прошедшие бронирования вычитает периодический
+пересчет recount_active_bookings, он же исправляет расхождения.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Booking, Client
+
+logger = logging.getLogger(__name__)
+
+# Статус бронирований, которые учитываются в лимите
+ACTIVE_STATUS = 'approved'
+
+
+def adjust_active_count(client_id, delta: int, client: Optional[Client] = None) -> None:
+    """
+    Изменить счетчик клиента на delta одним UPDATE.
+
+    Args:
+        client_id: ID клиента
+        delta: Изменение счетчика
+        client: Загруженный объект клиента, который нужно обновить в памяти (опционально)
+    """
+    if not delta or client_id is None:
+        return
+    Client.objects.filter(pk=client_id).update(  # type: ignore
+        active_bookings_count=F('active_bookings_count') + delta
+    )
+    if client is not None:
+        client.active_bookings_count += delta
+
+
+def adjust_active_counts(deltas: Dict[int, int]) -> None:
+    """Изменить счетчики нескольких клиентов одним UPDATE ({ID клиента: изменение})."""
+    deltas = {client_id: delta for client_id, delta in deltas.items() if delta and client_id is not None}
+    if not deltas:
+        return
+    Client.objects.filter(pk__in=list(deltas)).update(  # type: ignore
+        active_bookings_count=F('active_bookings_count') + Case(
+            *[When(pk=client_id, then=Value(delta)) for client_id, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    )
+
+
+def _cached_client(booking) -> Optional[Client]:
+    """Клиент, уже загруженный вместе с бронированием (без запроса к БД)"""
+    return booking._state.fields_cache.get('client')
+
+
+def sync_active_count(booking, deleted: bool = False) -> None:
+    """
+    Обновить счетчик после сохранения или удаления бронирования.
+
+    Вызывается из сигналов до sync_booking_occupancy: статус при загрузке берется
+    из booking._loaded_occupancy.
+
+    Args:
+        booking: Сохраненное или удаленное бронирование
+        deleted: Бронирование было удалено
+    """
+    previous = getattr(booking, '_loaded_occupancy', None)
+    previous_client_id = getattr(booking, '_loaded_client_id', None)
+    if deleted:
+        was_active, is_active = booking.status == ACTIVE_STATUS, False
+        previous_client_id = booking.client_id
+    else:
+        was_active = previous is not None and previous[0] == ACTIVE_STATUS
+        is_active = booking.status == ACTIVE_STATUS
+
+    if was_active and not (is_active and previous_client_id == booking.client_id):
+        cached = _cached_client(booking)
+        adjust_active_count(
+            previous_client_id, -1,
+            cached if cached is not None and cached.pk == previous_client_id else None
+        )
+    if is_active and not (was_active and previous_client_id == booking.client_id):
+        adjust_active_count(booking.client_id, 1, _cached_client(booking))
+
+    booking._loaded_client_id = None if deleted else booking.client_id
+
+
+def _actual_counts(now: datetime):
+    """Подзапрос: число незакончившихся approved бронирований клиента"""
+    return Coalesce(
+        Subquery(
+            Booking.objects.filter(  # type: ignore
+                client=OuterRef('pk'), status=ACTIVE_STATUS, end_datetime__gt=now
+            ).order_by().values('client').annotate(count=Count('pk')).values('count')
+        ),
+        Value(0)
+    )
+
+
+def recount_active_bookings(now: Optional[datetime] = None, dry_run: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    Сверить счетчики с бронированиями и исправить расхождения.
+
+    Вычитает закончившиеся бронирования и исправляет расхождения, например после
+    массовых UPDATE в обход сервисов. Расхождения исправляются одним UPDATE.
+
+    Args:
+        now: Момент, после которого бронирование считается незакончившимся (по умолчанию timezone.now())
+        dry_run: Только найти расхождения, ничего не меняя
+
+    Returns:
+        Список (ID клиента, значение счетчика, фактическое число) для клиентов с расхождением
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    now = now or timezone.now()
+    drifted = list(
+        Client.objects.annotate(actual=_actual_counts(now)).filter(  # type: ignore
+            ~Q(active_bookings_count=F('actual'))
+        ).order_by('pk').values_list('pk', 'active_bookings_count', 'actual')
+    )
+
+    if drifted and not dry_run:
+        Client.objects.filter(pk__in=[client_id for client_id, _, _ in drifted]).update(  # type: ignore
+            active_bookings_count=_actual_counts(now)
+        )
+        logger.info(f"Active booking counters recounted: {len(drifted)} clients")
+    return drifted
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django import forms
-from .models import Client, Bathhouse, Booking, SystemConfig
+from .models import Client, Bathhouse, Booking, SystemConfig, WorkingHours, ScheduleException, PriceRule
 
 admin.site.site_header = "Удачи!!"
 admin.site.site_title = "Удачи!!"
@@ -26,6 +26,15 @@ class BookingAdminForm(forms.ModelForm):
 class ClientAdmin(admin.ModelAdmin):
     list_display = ['name', 'phone', 'telegram_id', 'created_at']
     search_fields = ['name', 'phone', 'telegram_id']
+    readonly_fields = ['active_bookings_count']
+    
+    def save_model(self, request, obj, form, change):
+        # Счетчик active_bookings_count меняется только атомарными UPDATE:
+        # при изменении клиента сохраняем только поля формы
+        if change:
+            obj.save(update_fields=form.changed_data)
+        else:
+            super().save_model(request, obj, form, change)
 
 
 @admin.register(Bathhouse)
@@ -80,76 +89,85 @@ class BookingAdmin(admin.ModelAdmin):
     
     @admin.action(description="Подтвердить выбранные бронирования")
     def approve(self, request, queryset):
-        from .services import approve_booking
-        from django.contrib import messages
-
-        success_count = 0
-        error_count = 0
-
-        for booking in queryset:
-            try:
-                # Проверяем, что у клиента есть telegram_id для уведомлений
-                if not booking.client.telegram_id:
-                    self.message_user(
-                        request,
-                        f"У клиента {booking.client} нет telegram_id. Уведомление не будет отправлено.",
-                        messages.WARNING
-                    )
-                approve_booking(booking.id)
-                success_count += 1
-            except Exception as e:
-                error_count += 1
-                self.message_user(
-                    request,
-                    f"Ошибка при подтверждении бронирования {booking.id}: {str(e)}",
-                    messages.ERROR
-                )
+        from .services import approve_bookings
 
-        if success_count:
-            self.message_user(
-                request,
-                f"Подтверждено бронирований: {success_count}",
-                messages.SUCCESS
-            )
+        self._apply_bulk_transition(
+            request, queryset, approve_bookings, "подтверждении", "Подтверждено"
+        )
     
     @admin.action(description="Отклонить выбранные бронирования")
     def reject(self, request, queryset):
-        from .services import reject_booking
+        from .services import reject_bookings
+        
+        self._apply_bulk_transition(
+            request, queryset, reject_bookings, "отклонении", "Отклонено"
+        )
+    
+    def _apply_bulk_transition(self, request, queryset, bulk_action, action_name, done_label):
+        """Выполнить массовый переход для выбранных бронирований и сообщить результат"""
         from django.contrib import messages
         
-        success_count = 0
-        error_count = 0
+        booking_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        changed, errors = bulk_action(booking_ids)
         
-        for booking in queryset:
-            try:
-                # Проверяем, что у клиента есть telegram_id для уведомлений
-                if not booking.client.telegram_id:
-                    self.message_user(
-                        request,
-                        f"У клиента {booking.client} нет telegram_id. Уведомление не будет отправлено.",
-                        messages.WARNING
-                    )
-                reject_booking(booking.id)
-                success_count += 1
-            except Exception as e:
-                error_count += 1
+        for booking in changed:
+            # Проверяем, что у клиента есть telegram_id для уведомлений
+            if not booking.client.telegram_id:
                 self.message_user(
                     request,
-                    f"Ошибка при подтверждении бронирования {booking.id}: {str(e)}",
-                    messages.ERROR
+                    f"У клиента {booking.client} нет telegram_id. Уведомление не будет отправлено.",
+                    messages.WARNING
                 )
         
-        if success_count:
+        for booking_id, error in errors.items():
             self.message_user(
                 request,
-                f"Отклонено бронирований: {success_count}",
+                f"Ошибка при {action_name} бронирования {booking_id}: {'; '.join(dict.fromkeys(error.messages))}",
+                messages.ERROR
+            )
+        
+        # Бронирования, которые уже были в целевом статусе, не меняются и не считаются ошибкой
+        changed_ids = {booking.pk for booking in changed}
+        skipped_ids = [pk for pk in booking_ids if pk not in changed_ids and pk not in errors]
+        if skipped_ids:
+            self.message_user(
+                request,
+                f"Пропущено бронирований (уже в этом статусе): {len(skipped_ids)} "
+                f"(ID: {', '.join(map(str, skipped_ids))})",
+                messages.INFO
+            )
+        
+        if changed:
+            self.message_user(
+                request,
+                f"{done_label} бронирований: {len(changed)}",
                 messages.SUCCESS
             )
-    
-
 
 
 @admin.register(SystemConfig)
 class SystemConfigAdmin(admin.ModelAdmin):
     list_display = ['key', 'value', 'description']
     search_fields = ['key', 'description']
+
+
+@admin.register(WorkingHours)
+class WorkingHoursAdmin(admin.ModelAdmin):
+    list_display = ['bathhouse', 'weekday', 'open_time', 'close_time']
+    list_filter = ['bathhouse', 'weekday']
+    ordering = ('bathhouse', 'weekday', 'open_time')
+
+
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ['date', 'bathhouse', 'is_closed', 'open_time', 'close_time', 'comment']
+    list_filter = ['bathhouse', 'is_closed']
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ['bathhouse', 'day_type', 'start_time', 'end_time', 'hourly_price']
+    list_filter = ['bathhouse', 'day_type']
+    ordering = ('bathhouse', 'day_type', 'start_time')
@@ -0,0 +1,260 @@
+"""
+Расчет доступности бань по интервалам.
+
+Чистые функции без обращения к базе данных: на вход подаются занятые
+интервалы (или битовая карта суток) и границы рабочего дня, на выходе -
+слоты или свободные окна.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def merge_busy_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Объединить занятые интервалы в отсортированный список непересекающихся.
+
+    Соприкасающиеся интервалы склеиваются, поэтому концы результата
+    монотонно возрастают - это позволяет проходить по ним одним указателем.
+
+    Args:
+        intervals: Интервалы (начало, конец) в любом порядке
+
+    Returns:
+        Отсортированный по началу список объединенных интервалов
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals, key=lambda x: x[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_available_slots(busy: List[Interval], open_time: datetime, close_time: datetime,
+                         step_minutes: int, slot_minutes: int) -> List[Interval]:
+    """
+    Найти слоты фиксированной длины, не пересекающиеся с занятыми интервалами.
+
+    Слоты перебираются от open_time с шагом step_minutes, занятые интервалы -
+    одним указателем, поэтому сложность O(слоты + интервалы).
+
+    Args:
+        busy: Результат merge_busy_intervals
+        open_time: Начало рабочего дня (aware datetime)
+        close_time: Конец рабочего дня (aware datetime)
+        step_minutes: Шаг между началами слотов
+        slot_minutes: Длина слота
+
+    Returns:
+        Список слотов (начало, конец) в часовом поясе open_time
+    """
+    step = timedelta(minutes=step_minutes)
+    length = timedelta(minutes=slot_minutes)
+    slots: List[Interval] = []
+
+    i = 0
+    n = len(busy)
+    current = open_time
+    while current < close_time:
+        slot_end = current + length
+        if slot_end > close_time:
+            break
+
+        # Пропускаем интервалы, закончившиеся до начала слота
+        while i < n and busy[i][1] <= current:
+            i += 1
+
+        if i == n or busy[i][0] >= slot_end:
+            slots.append((current, slot_end))
+
+        current += step
+
+    return slots
+
+
+def find_free_intervals(busy: List[Interval], open_time: datetime, close_time: datetime,
+                        tz) -> List[Interval]:
+    """
+    Найти свободные окна рабочего дня между занятыми интервалами.
+
+    Args:
+        busy: Занятые интервалы, отсортированные по началу
+        open_time: Начало рабочего дня (aware datetime)
+        close_time: Конец рабочего дня (aware datetime)
+        tz: Часовой пояс, в который переводятся границы интервалов
+
+    Returns:
+        Список свободных интервалов (начало, конец) ненулевой длины
+    """
+    free_intervals: List[Interval] = []
+    current_start = open_time
+
+    for busy_start, busy_end in busy:
+        busy_start_local = busy_start.astimezone(tz)
+        busy_end_local = busy_end.astimezone(tz)
+
+        if current_start < busy_start_local:
+            free_intervals.append((current_start, busy_start_local))
+
+        if current_start < busy_end_local:
+            current_start = busy_end_local
+
+    if current_start < close_time:
+        free_intervals.append((current_start, close_time))
+
+    return [(start, end) for start, end in free_intervals if start < end]
+
+
+# Битовые карты занятости: бит i соответствует минуте i локальных суток
+MINUTES_PER_DAY = 24 * 60
+DAY_BITS_BYTES = MINUTES_PER_DAY // 8
+
+_MINUTE = timedelta(minutes=1)
+
+
+def split_interval_by_day(start: datetime, end: datetime, tz) -> Iterator[Tuple[date, int, int]]:
+    """
+    Разбить интервал на части по локальным суткам.
+
+    Частично занятые минуты считаются занятыми целиком.
+
+    Args:
+        start: Начало интервала (aware datetime)
+        end: Конец интервала (aware datetime)
+        tz: Часовой пояс бани
+
+    Yields:
+        Тройки (дата, первая минута, минута после последней)
+    """
+    start_local = start.astimezone(tz).replace(tzinfo=None)
+    end_local = end.astimezone(tz).replace(tzinfo=None)
+
+    day = start_local.date()
+    while True:
+        day_start = datetime.combine(day, time(0, 0))
+        if day_start >= end_local:
+            break
+        first = (max(start_local, day_start) - day_start) // _MINUTE
+        last = -((day_start - min(end_local, day_start + timedelta(days=1))) // _MINUTE)
+        if last > first:
+            yield day, first, last
+        day += timedelta(days=1)
+
+
+def occupancy_bits_by_day(intervals: Iterable[Interval], tz) -> Dict[date, int]:
+    """
+    Построить битовые карты занятости по дням из интервалов бронирований.
+
+    Args:
+        intervals: Интервалы (начало, конец)
+        tz: Часовой пояс бани
+
+    Returns:
+        Словарь {локальная дата: битовая карта}
+    """
+    bits_by_day: Dict[date, int] = {}
+    for start, end in intervals:
+        for day, first, last in split_interval_by_day(start, end, tz):
+            bits_by_day[day] = bits_by_day.get(day, 0) | (((1 << (last - first)) - 1) << first)
+    return bits_by_day
+
+
+def bits_to_bytes(bits: int) -> bytes:
+    """Упаковать битовую карту суток для хранения в БД."""
+    return bits.to_bytes(DAY_BITS_BYTES, 'little')
+
+
+def bits_from_bytes(data) -> int:
+    """Распаковать битовую карту суток, сохраненную bits_to_bytes."""
+    return int.from_bytes(bytes(data), 'little') if data else 0
+
+
+def find_available_slots_in_bits(bits: int, open_minute: int, close_minute: int,
+                                 step_minutes: int, slot_minutes: int) -> List[int]:
+    """
+    Найти начала свободных слотов по битовой карте суток.
+
+    Args:
+        bits: Битовая карта занятости
+        open_minute: Минута открытия от начала суток
+        close_minute: Минута закрытия от начала суток
+        step_minutes: Шаг между началами слотов
+        slot_minutes: Длина слота
+
+    Returns:
+        Список минут начала свободных слотов
+    """
+    slot_mask = (1 << slot_minutes) - 1
+    starts: List[int] = []
+
+    current = open_minute
+    while current < close_minute:
+        if current + slot_minutes > close_minute:
+            break
+        if not (bits >> current) & slot_mask:
+            starts.append(current)
+        current += step_minutes
+
+    return starts
+
+
+def find_free_ranges_in_bits(bits: int, open_minute: int, close_minute: int) -> List[Tuple[int, int]]:
+    """
+    Найти свободные участки рабочего дня по битовой карте суток.
+
+    Args:
+        bits: Битовая карта занятости
+        open_minute: Минута открытия от начала суток
+        close_minute: Минута закрытия от начала суток
+
+    Returns:
+        Список пар минут (начало, конец) свободных участков
+    """
+    if close_minute <= open_minute:
+        return []
+
+    width = close_minute - open_minute
+    free = ~(bits >> open_minute) & ((1 << width) - 1)
+
+    ranges: List[Tuple[int, int]] = []
+    while free:
+        low = (free & -free).bit_length() - 1
+        run = free >> low
+        length = (run ^ (run + 1)).bit_length() - 1
+        ranges.append((open_minute + low, open_minute + low + length))
+        free &= ~(((1 << length) - 1) << low)
+
+    return ranges
+
+
+def find_slots_in_free_ranges(free_ranges: Iterable[Tuple[int, int]], open_minute: int,
+                              step_minutes: int, lengths: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Разложить свободные участки дня на слоты нескольких длительностей.
+
+    Начала слотов лежат на той же сетке open_minute + k * step_minutes, что и
+    в find_available_slots_in_bits, поэтому для каждой длины результат совпадает
+    с отдельным проходом по битовой карте.
+
+    Args:
+        free_ranges: Свободные участки (начало, конец) в минутах, как из find_free_ranges_in_bits
+        open_minute: Минута открытия от начала суток
+        step_minutes: Шаг между началами слотов
+        lengths: Длительности слотов в минутах
+
+    Returns:
+        Словарь {длительность: список минут начала свободных слотов}
+    """
+    starts_by_length: Dict[int, List[int]] = {length: [] for length in lengths}
+
+    for range_start, range_end in free_ranges:
+        # Первое начало на сетке не раньше начала участка
+        first = open_minute + -(-(range_start - open_minute) // step_minutes) * step_minutes
+        for length, starts in starts_by_length.items():
+            starts.extend(range(first, range_end - length + 1, step_minutes))
+
+    return starts_by_length
@@ -0,0 +1,91 @@
+"""
+Кэш доступности бань в памяти процесса.
+
+Хранит результаты get_available_slots, get_free_intervals,
+get_available_slots_by_duration и месячные сводки
+get_month_availability по ключу (вид, баня, дата, версия конфигурации) с
+вытеснением по LRU; сводка хранится под первым числом месяца. Записи
+точечно сбрасываются сигналами Booking (см. signals.py), а смена настроек,
+влияющих на слоты, повышает версию конфигурации. TTL ограничивает
+устаревание при изменениях, сделанных в другом процессе (например, в админке).
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+
+from .lru import BoundedLRU
+
+# Ключи SystemConfig, от которых зависят слоты и свободные интервалы
+SLOT_CONFIG_KEYS = frozenset({"OPEN_HOUR", "CLOSE_HOUR", "SLOT_STEP_MINUTES", "MIN_BOOKING_MINUTES"})
+
+KIND_SLOTS = "slots"
+KIND_FREE_INTERVALS = "free_intervals"
+KIND_SLOTS_BY_DURATION = "slots_by_duration"
+KIND_MONTH_SUMMARY = "month_summary"
+KINDS = (KIND_SLOTS, KIND_FREE_INTERVALS, KIND_SLOTS_BY_DURATION)
+
+
+class AvailabilityCache:
+    """LRU-кэш доступности с ограничением размера и счетчиками попаданий"""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60):
+        self.config_version = 0
+        self._entries = BoundedLRU(max_size, ttl_seconds)
+        self._epoch = 0
+
+    def _key(self, kind: str, bathhouse_id: int, day: date) -> tuple:
+        return (kind, bathhouse_id, day, self.config_version)
+
+    def get(self, kind: str, bathhouse_id: int, day: date) -> Optional[Any]:
+        """Получить значение из кэша или None при промахе."""
+        with self._entries.lock:
+            return self._entries.get(self._key(kind, bathhouse_id, day))
+
+    def begin(self) -> int:
+        """
+        Запомнить эпоху инвалидаций перед расчетом значения.
+
+        Результат передается в set(): если между расчетом и записью случилась
+        инвалидация, устаревшее значение в кэш не попадет.
+        """
+        return self._epoch
+
+    def set(self, kind: str, bathhouse_id: int, day: date, value: Any, epoch: int) -> None:
+        """Сохранить рассчитанное значение."""
+        with self._entries.lock:
+            if epoch == self._epoch:
+                self._entries.set(self._key(kind, bathhouse_id, day), value)
+
+    def invalidate_days(self, bathhouse_id: int, days: Iterable[date]) -> None:
+        """Сбросить записи бани за указанные даты и сводки их месяцев."""
+        with self._entries.lock:
+            self._epoch += 1
+            for day in days:
+                for kind in KINDS:
+                    self._entries.discard(self._key(kind, bathhouse_id, day))
+                self._entries.discard(self._key(KIND_MONTH_SUMMARY, bathhouse_id, day.replace(day=1)))
+
+    def bump_config_version(self) -> None:
+        """Сделать недоступными все записи, рассчитанные по старым настройкам."""
+        with self._entries.lock:
+            self._epoch += 1
+            self.config_version += 1
+            self._entries.clear(reset_stats=False)
+
+    def clear(self) -> None:
+        """Очистить кэш и счетчики."""
+        with self._entries.lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов."""
+        with self._entries.lock:
+            return {**self._entries.stats(), "config_version": self.config_version}
+
+
+availability_cache = AvailabilityCache(
+    max_size=getattr(settings, "AVAILABILITY_CACHE_SIZE", 1024),
+    ttl_seconds=getattr(settings, "AVAILABILITY_CACHE_TTL_SECONDS", 60),
+)
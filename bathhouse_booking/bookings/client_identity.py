@@ -0,0 +1,24 @@
+"""
+Карта идентичности клиентов бота в памяти процесса.
+
+Сопоставляет Telegram ID пользователя с первичным ключом Client, чтобы на
+каждом обновлении клиент загружался одним запросом по первичному ключу.
+Размер карты ограничен (LRU). Запись не устаревает по времени: если клиента
+удалили или сменили ему Telegram ID в админке, загрузка по первичному ключу
+это заметит, и запись будет сброшена.
+"""
+from django.conf import settings
+
+from .lru import BoundedLRU
+
+
+class ClientIdentityMap(BoundedLRU):
+    """LRU-отображение Telegram ID -> ID клиента (без ограничения времени жизни)"""
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(max_size)
+
+
+client_identity_map = ClientIdentityMap(
+    max_size=getattr(settings, "CLIENT_IDENTITY_MAP_SIZE", 10000)
+)
@@ -0,0 +1,77 @@
+"""
+Хранение скомпилированных таблиц (расписание, цены) в памяти процесса.
+
+Таблица компилируется при первом обращении и живет до явной инвалидации
+(сигналы моделей, см. signals.py) или истечения TTL, который ограничивает
+устаревание при изменениях, сделанных в другом процессе.
+"""
+import threading
+import time
+from typing import Awaitable, Callable, Generic, Optional, Tuple, TypeVar
+
+from asgiref.sync import sync_to_async
+
+T = TypeVar("T")
+
+
+class CompiledCache(Generic[T]):
+    """Лениво компилируемое значение с инвалидацией и TTL"""
+
+    def __init__(self, compile_func: Callable[[], T], ttl_seconds: float = 60,
+                 acompile_func: Optional[Callable[[], Awaitable[T]]] = None):
+        """
+        Args:
+            compile_func: Функция компиляции
+            ttl_seconds: Время жизни скомпилированного значения
+            acompile_func: Асинхронная функция компиляции для aget()
+                (по умолчанию compile_func в потоке через sync_to_async)
+        """
+        self.compile_func = compile_func
+        self.acompile_func = acompile_func
+        self.ttl_seconds = ttl_seconds
+        self._compiled: Optional[T] = None
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self) -> Tuple[Optional[T], int]:
+        with self._lock:
+            if self._compiled is not None and self._expires_at >= time.monotonic():
+                return self._compiled, self._version
+            return None, self._version
+
+    def _store(self, compiled: T, version: int) -> None:
+        with self._lock:
+            # Если источник изменился во время компиляции, результат не сохраняем
+            if version == self._version:
+                self._compiled = compiled
+                self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def get(self) -> T:
+        """Получить актуальную таблицу, при необходимости скомпилировав ее."""
+        compiled, version = self._lookup()
+        if compiled is not None:
+            return compiled
+
+        compiled = self.compile_func()
+        self._store(compiled, version)
+        return compiled
+
+    async def aget(self) -> T:
+        """Асинхронная версия get(): актуальная таблица возвращается без перехода в поток."""
+        compiled, version = self._lookup()
+        if compiled is not None:
+            return compiled
+
+        if self.acompile_func is not None:
+            compiled = await self.acompile_func()
+        else:
+            compiled = await sync_to_async(self.compile_func)()
+        self._store(compiled, version)
+        return compiled
+
+    def invalidate(self) -> None:
+        """Пересобрать таблицу при следующем обращении."""
+        with self._lock:
+            self._version += 1
+            self._compiled = None
@@ -1,8 +1,18 @@
 """
 Инициализация конфигурации системы.
 Создает дефолтные значения в SystemConfig при первом запуске.
+
+Чтение настроек идет через кэш в памяти процесса: все ключи загружаются одним
+запросом и хранятся до изменения SystemConfig (сигналы, см. signals.py) или
+истечения CONFIG_CACHE_TTL_SECONDS.
 """
 import logging
+from typing import Dict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from bathhouse_booking.bookings.compiled_cache import CompiledCache
 from bathhouse_booking.bookings.models import SystemConfig
 
 logger = logging.getLogger(__name__)
@@ -48,6 +58,11 @@ DEFAULT_CONFIGS = [
         'value': '30',
         'description': 'Таймаут сессии бронирования в минутах'
     },
+    {
+        'key': 'SLOT_HOLD_MINUTES',
+        'value': '30',
+        'description': 'Сколько минут неоплаченное бронирование удерживает слот (0 - не удерживать)'
+    },
     {
         'key': 'TELEGRAM_NOTIFICATIONS_ENABLED',
         'value': 'true',
@@ -60,41 +75,75 @@ DEFAULT_CONFIGS = [
     }
 ]
 
+def _existing_configs() -> Dict[str, SystemConfig]:
+    """Существующие строки ключей по умолчанию (одним запросом)"""
+    return {
+        config.key: config
+        for config in SystemConfig.objects.filter(  # type: ignore
+            key__in=[config_data['key'] for config_data in DEFAULT_CONFIGS]
+        ).only('id', 'key', 'description')
+    }
+
+
 def initialize_system_config():
-    """Инициализировать системную конфигурацию дефолтными значениями"""
-    created_count = 0
-    updated_count = 0
-    
-    for config_data in DEFAULT_CONFIGS:
-        key = config_data['key']
-        value = config_data['value']
-        description = config_data['description']
-        
-        try:
-            config, created = SystemConfig.objects.get_or_create(
-                key=key,
-                defaults={
-                    'value': value,
-                    'description': description
-                }
-            )
-            
-            if created:
-                created_count += 1
-                logger.info(f"Created config: {key} = {value}")
-            else:
-                # Обновляем описание, если оно изменилось
-                if config.description != description:
-                    config.description = description
-                    config.save()
-                    updated_count += 1
-                    logger.info(f"Updated description for config: {key}")
-                    
-        except Exception as e:
-            logger.error(f"Failed to initialize config {key}: {e}")
-    
-    logger.info(f"System config initialized: {created_count} created, {updated_count} updated")
-    return created_count + updated_count
+    """
+    Инициализировать системную конфигурацию дефолтными значениями.
+
+    Существующие ключи читаются одним запросом, недостающие создаются одним
+    bulk_create, устаревшие описания обновляются одним bulk_update; значения
+    существующих ключей не меняются. Если другая реплика успела создать часть
+    ключей между чтением и вставкой, ключи перечитываются и вставка
+    повторяется, поэтому создаются и попадают в лог только недостающие ключи.
+
+    Returns:
+        Количество созданных и обновленных настроек
+    """
+    try:
+        with transaction.atomic():
+            for attempt in range(2):
+                existing = _existing_configs()
+
+                to_create = []
+                to_update = []
+                for config_data in DEFAULT_CONFIGS:
+                    config = existing.get(config_data['key'])
+                    if config is None:
+                        to_create.append(SystemConfig(**config_data))
+                    elif config.description != config_data['description']:
+                        # Обновляем описание, если оно изменилось
+                        config.description = config_data['description']
+                        to_update.append(config)
+
+                if not to_create:
+                    break
+                try:
+                    with transaction.atomic():
+                        SystemConfig.objects.bulk_create(to_create)  # type: ignore
+                    break
+                except IntegrityError:
+                    # Параллельная реплика создала часть ключей: перечитываем и повторяем
+                    if attempt:
+                        raise
+
+            if to_update:
+                SystemConfig.objects.bulk_update(to_update, ['description'])  # type: ignore
+
+            if to_create or to_update:
+                # Массовые операции не вызывают сигналы: сбрасываем кэши явно
+                from bathhouse_booking.bookings.config_version import bump_version, drop_local_caches
+                bump_version()
+                drop_local_caches()
+                transaction.on_commit(drop_local_caches)
+    except Exception as e:
+        logger.error(f"Failed to initialize system config: {e}")
+        return 0
+
+    for config in to_create:
+        logger.info(f"Created config: {config.key} = {config.value}")
+    for config in to_update:
+        logger.info(f"Updated description for config: {config.key}")
+    logger.info(f"System config initialized: {len(to_create)} created, {len(to_update)} updated")
+    return len(to_create) + len(to_update)
 
 
 async def initialize_system_config_async():
@@ -103,44 +152,80 @@ async def initialize_system_config_async():
     return await sync_to_async(initialize_system_config)()
 
 
-def get_config(key, default=None):
-    """Получить значение конфигурации как строку"""
-    try:
-        config = SystemConfig.objects.get(key=key)
-        return config.value
-    except SystemConfig.DoesNotExist:
+def load_config_values() -> Dict[str, str]:
+    """
+    Прочитать все настройки одним запросом.
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    return dict(SystemConfig.objects.values_list('key', 'value'))  # type: ignore
+
+
+async def aload_config_values() -> Dict[str, str]:
+    """Асинхронная версия load_config_values (через async ORM, без перехода в поток)"""
+    return {key: value async for key, value in SystemConfig.objects.values_list('key', 'value')}  # type: ignore
+
+
+config_cache: CompiledCache[Dict[str, str]] = CompiledCache(
+    load_config_values, ttl_seconds=getattr(settings, "CONFIG_CACHE_TTL_SECONDS", 60),
+    acompile_func=aload_config_values
+)
+
+
+def _str_value(values, key, default):
+    if key not in values:
         logger.warning(f"Config {key} not found, using default: {default}")
         return default
+    return values[key]
 
 
-def get_config_int(key, default=0):
-    """Получить значение конфигурации как целое число"""
-    try:
-        config = SystemConfig.objects.get(key=key)
-        return int(config.value)
-    except SystemConfig.DoesNotExist:
+def _int_value(values, key, default):
+    if key not in values:
         logger.warning(f"Config {key} not found, using default: {default}")
         return default
+    try:
+        return int(values[key])
     except ValueError as e:
         logger.error(f"Failed to cast config {key} value to int: {e}")
         return default
 
 
+def _bool_value(values, key, default):
+    if key not in values:
+        logger.warning(f"Config {key} not found, using default: {default}")
+        return default
+    return values[key].lower() in ('true', '1', 'yes', 'y', 'on')
+
+
+def get_config(key, default=None):
+    """Получить значение конфигурации как строку"""
+    return _str_value(config_cache.get(), key, default)
+
+
+async def get_config_async(key, default=None):
+    """Асинхронная версия get_config"""
+    return _str_value(await config_cache.aget(), key, default)
+
+
+def get_config_int(key, default=0):
+    """Получить значение конфигурации как целое число"""
+    return _int_value(config_cache.get(), key, default)
+
+
 async def get_config_int_async(key, default=0):
     """Асинхронная версия get_config_int"""
-    from asgiref.sync import sync_to_async
-    return await sync_to_async(get_config_int)(key, default)
+    return _int_value(await config_cache.aget(), key, default)
 
 
 def get_config_bool(key, default=False):
     """Получить значение конфигурации как булево значение"""
-    try:
-        config = SystemConfig.objects.get(key=key)
-        value = config.value.lower()
-        return value in ('true', '1', 'yes', 'y', 'on')
-    except SystemConfig.DoesNotExist:
-        logger.warning(f"Config {key} not found, using default: {default}")
-        return default
+    return _bool_value(config_cache.get(), key, default)
+
+
+async def get_config_bool_async(key, default=False):
+    """Асинхронная версия get_config_bool"""
+    return _bool_value(await config_cache.aget(), key, default)
 
 
 # Инициализация должна быть вызвана вручную после настройки Django
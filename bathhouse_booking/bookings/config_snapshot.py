@@ -0,0 +1,85 @@
+"""
+Типизированный неизменяемый срез настроек SystemConfig.
+
+Срез собирается из кэша настроек (см. config_init.config_cache) один раз на
+обновление бота (см. bot/middleware/config_snapshot.py) и передается в
+обработчики и сервисы, поэтому все шаги обработки видят одни и те же значения.
+"""
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .config_init import _bool_value, _int_value, config_cache
+
+DEFAULT_PAYMENT_INSTRUCTION = (
+    "Пожалуйста, переведите оплату на карту •1234 5678 9012 3456• и нажмите 'Я оплатил'"
+)
+
+
+class ConfigSnapshot(NamedTuple):
+    """Настройки системы на момент обработки обновления"""
+
+    open_hour: int
+    close_hour: int
+    slot_step_minutes: int
+    min_booking_minutes: int
+    hourly_price: int
+    max_active_bookings: int
+    session_timeout_minutes: int
+    slot_hold_minutes: int
+    notifications_enabled: bool
+    admin_id: Optional[str]
+    payment_instruction: str
+
+    @classmethod
+    def from_values(cls, values: Dict[str, str]) -> "ConfigSnapshot":
+        """
+        Собрать срез из словаря {ключ: значение}; отсутствующие ключи получают значения по умолчанию.
+
+        Args:
+            values: Значения SystemConfig
+        """
+        return cls(
+            open_hour=_int_value(values, "OPEN_HOUR", 9),
+            close_hour=_int_value(values, "CLOSE_HOUR", 22),
+            slot_step_minutes=_int_value(values, "SLOT_STEP_MINUTES", 30),
+            min_booking_minutes=_int_value(values, "MIN_BOOKING_MINUTES", 120),
+            hourly_price=_int_value(values, "HOURLY_PRICE", 1000),
+            max_active_bookings=_int_value(values, "MAX_ACTIVE_BOOKINGS_PER_CLIENT", 3),
+            session_timeout_minutes=_int_value(values, "BOOKING_SESSION_TIMEOUT_MINUTES", 30),
+            slot_hold_minutes=_int_value(values, "SLOT_HOLD_MINUTES", 30),
+            notifications_enabled=_bool_value(values, "TELEGRAM_NOTIFICATIONS_ENABLED", True),
+            admin_id=values.get("TELEGRAM_ADMIN_ID") or None,
+            payment_instruction=values.get("PAYMENT_INSTRUCTION") or DEFAULT_PAYMENT_INSTRUCTION,
+        )
+
+
+_last_snapshot: Optional[Tuple[Dict[str, str], ConfigSnapshot]] = None
+_lock = threading.Lock()
+
+
+def _snapshot_for(values: Dict[str, str]) -> ConfigSnapshot:
+    global _last_snapshot
+
+    with _lock:
+        if _last_snapshot is not None and _last_snapshot[0] is values:
+            return _last_snapshot[1]
+
+    snapshot = ConfigSnapshot.from_values(values)
+    with _lock:
+        _last_snapshot = (values, snapshot)
+    return snapshot
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """
+    Текущий срез настроек; пока кэш настроек не изменился, возвращается тот же объект.
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    return _snapshot_for(config_cache.get())
+
+
+async def get_config_snapshot_async() -> ConfigSnapshot:
+    """Асинхронная версия get_config_snapshot (без перехода в поток, если кэш актуален)"""
+    return _snapshot_for(await config_cache.aget())
@@ -0,0 +1,150 @@
+"""
+Общая версия настроек для нескольких процессов (web и bot).
+
+Кэши настроек, расписания, цен и доступности живут в памяти каждого процесса,
+а сигналы моделей сбрасывают их только в том процессе, где произошло
+изменение. Поэтому каждое изменение SystemConfig, WorkingHours,
+ScheduleException и PriceRule в той же транзакции повышает счетчик в строке
+ConfigVersion. Остальные процессы сверяют счетчик не чаще раза в
+CONFIG_VERSION_CHECK_SECONDS (один запрос по уникальному ключу) и при
+расхождении сбрасывают свои кэши. Задержка распространения изменений
+ограничена этим интервалом.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .availability_cache import availability_cache
+from .config_init import config_cache
+from .models import ConfigVersion
+from .pricing import price_cache
+from .schedule import schedule_cache
+
+logger = logging.getLogger(__name__)
+
+CONFIG_VERSION_NAME = "config"
+
+
+def bump_version() -> None:
+    """
+    Повысить общую версию настроек (в текущей транзакции).
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    updated = ConfigVersion.objects.filter(name=CONFIG_VERSION_NAME).update(  # type: ignore
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ConfigVersion.objects.create(name=CONFIG_VERSION_NAME, version=1)  # type: ignore
+    except IntegrityError:
+        # Строку одновременно создал другой процесс
+        ConfigVersion.objects.filter(name=CONFIG_VERSION_NAME).update(  # type: ignore
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+
+
+def read_version() -> int:
+    """
+    Прочитать общую версию настроек (0, если настройки еще не менялись).
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    version = ConfigVersion.objects.filter(name=CONFIG_VERSION_NAME).values_list(  # type: ignore
+        'version', flat=True
+    ).first()
+    return version or 0
+
+
+async def aread_version() -> int:
+    """Асинхронная версия read_version (через async ORM, без перехода в поток)"""
+    version = await ConfigVersion.objects.filter(name=CONFIG_VERSION_NAME).values_list(  # type: ignore
+        'version', flat=True
+    ).afirst()
+    return version or 0
+
+
+def drop_local_caches() -> None:
+    """Сбросить все кэши процесса, зависящие от настроек."""
+    config_cache.invalidate()
+    schedule_cache.invalidate()
+    price_cache.invalidate()
+    availability_cache.bump_config_version()
+
+
+class ConfigVersionWatcher:
+    """Периодически сверяет общую версию настроек и сбрасывает кэши процесса при ее изменении"""
+
+    def __init__(self, check_interval_seconds: float = 5):
+        self.check_interval_seconds = check_interval_seconds
+        self._known_version: Optional[int] = None
+        self._next_check_at = 0.0
+        self._lock = threading.Lock()
+
+    def _claim_check(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check_at:
+                return False
+            self._next_check_at = now + self.check_interval_seconds
+            return True
+
+    def _apply(self, version: int) -> bool:
+        with self._lock:
+            previous = self._known_version
+            self._known_version = version
+
+        if previous is None or previous == version:
+            return False
+
+        logger.info(f"Config version changed: {previous} -> {version}, dropping local caches")
+        drop_local_caches()
+        return True
+
+    def check(self) -> bool:
+        """
+        Сверить версию, если с прошлой проверки прошло достаточно времени.
+
+        Returns:
+            True, если версия изменилась и кэши процесса сброшены
+        """
+        if not self._claim_check():
+            return False
+        try:
+            version = read_version()
+        except DatabaseError as e:
+            logger.error(f"Failed to read config version: {e}")
+            return False
+        return self._apply(version)
+
+    async def acheck(self) -> bool:
+        """Асинхронная версия check()"""
+        if not self._claim_check():
+            return False
+        try:
+            version = await aread_version()
+        except DatabaseError as e:
+            logger.error(f"Failed to read config version: {e}")
+            return False
+        return self._apply(version)
+
+    def reset(self) -> None:
+        """Забыть известную версию (следующая проверка только запомнит текущую)."""
+        with self._lock:
+            self._known_version = None
+            self._next_check_at = 0.0
+
+
+config_version_watcher = ConfigVersionWatcher(
+    check_interval_seconds=getattr(settings, "CONFIG_VERSION_CHECK_SECONDS", 5)
+)
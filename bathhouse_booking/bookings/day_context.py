@@ -0,0 +1,174 @@
+"""
+Контекст дня бани для расчета доступности.
+
+DayContext собирается один раз на пару (баня, дата): окна работы и параметры
+слотов из скомпилированного расписания (см. schedule.py), локальные границы
+рабочего дня и битовая карта занятости из DayOccupancy. Слоты, слоты по
+длительностям и свободные интервалы считаются из него без дополнительных
+запросов, поэтому обработчик, которому нужны несколько видов результата,
+обращается к БД один раз.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .availability import find_available_slots_in_bits, find_free_ranges_in_bits, find_slots_in_free_ranges
+from .schedule import CompiledSchedule, Windows, schedule_cache
+from . import occupancy
+
+BATHHOUSE_TIMEZONE = occupancy.BATHHOUSE_TIMEZONE
+
+
+class DayContext:
+    """Окна работы, параметры слотов и занятость бани за один день"""
+
+    def __init__(self, bathhouse_id: int, date: date, bits: int, windows: Windows,
+                 slot_step_minutes: Optional[int] = None, min_booking_minutes: Optional[int] = None):
+        """
+        Args:
+            bathhouse_id: ID бани
+            date: Локальная дата
+            bits: Битовая карта занятости суток (0, если день свободен)
+            windows: Окна работы (пары минут от начала суток), пустые - баня закрыта
+            slot_step_minutes: Шаг между началами слотов (нужен только для слотов)
+            min_booking_minutes: Минимальная длительность бронирования (нужна только для слотов)
+        """
+        self.bathhouse_id = bathhouse_id
+        self.date = date
+        self.bits = bits
+        self.windows = tuple(windows)
+        self.slot_step_minutes = slot_step_minutes
+        self.min_booking_minutes = min_booking_minutes
+
+        self.open_minute = self.windows[0][0] if self.windows else 0
+        self.close_minute = self.windows[-1][1] if self.windows else 0
+        midnight = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(0, 0)))
+        self._midnight = midnight
+        self.open_time = midnight + timedelta(minutes=self.open_minute) if self.windows else None
+        self.close_time = midnight + timedelta(minutes=self.close_minute) if self.windows else None
+
+        # Перерывы между окнами работы считаются занятым временем
+        self.busy_bits = bits
+        for (_, gap_start), (gap_end, _) in zip(self.windows, self.windows[1:]):
+            self.busy_bits |= ((1 << (gap_end - gap_start)) - 1) << gap_start
+
+    @property
+    def is_closed(self) -> bool:
+        return not self.windows
+
+    @classmethod
+    def from_schedule(cls, schedule: CompiledSchedule, bathhouse_id: int, date: date, bits: int) -> "DayContext":
+        """Собрать контекст по скомпилированному расписанию и готовой битовой карте."""
+        return cls(
+            bathhouse_id, date, bits, schedule.day_windows(bathhouse_id, date),
+            schedule.slot_step_minutes, schedule.min_booking_minutes
+        )
+
+    @classmethod
+    def load(cls, bathhouse, date) -> "DayContext":
+        """
+        Собрать контекст дня: одна строка занятости (расписание берется из памяти).
+
+        Raises:
+            DatabaseError: Если произошла ошибка базы данных
+        """
+        schedule = schedule_cache.get()
+        return cls.from_schedule(schedule, bathhouse.id, date, occupancy.get_day_bits(bathhouse.id, date))
+
+    @classmethod
+    async def aload(cls, bathhouse, date) -> "DayContext":
+        """
+        Асинхронная версия load: занятость читается через async ORM без перехода в поток.
+
+        Raises:
+            DatabaseError: Если произошла ошибка базы данных
+        """
+        schedule = await schedule_cache.aget()
+        return cls.from_schedule(schedule, bathhouse.id, date, await occupancy.aget_day_bits(bathhouse.id, date))
+
+    @classmethod
+    def load_range(cls, bathhouse, start_date, end_date) -> Dict[date, "DayContext"]:
+        """
+        Собрать контексты всех дней диапазона (включительно) с одним запросом занятости.
+
+        Raises:
+            DatabaseError: Если произошла ошибка базы данных
+        """
+        schedule = schedule_cache.get()
+        bits_by_day = occupancy.get_range_bits(bathhouse.id, start_date, end_date)
+
+        contexts = {}
+        current_date = start_date
+        while current_date <= end_date:
+            contexts[current_date] = cls.from_schedule(
+                schedule, bathhouse.id, current_date, bits_by_day.get(current_date, 0)
+            )
+            current_date += timedelta(days=1)
+        return contexts
+
+    def _slot(self, start_minute: int, length: timedelta) -> Tuple[datetime, datetime]:
+        slot_start = self._midnight + timedelta(minutes=start_minute)
+        return slot_start, slot_start + length
+
+    def available_slots(self, duration_minutes: Optional[int] = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Свободные слоты дня.
+
+        Args:
+            duration_minutes: Длина слота (по умолчанию MIN_BOOKING_MINUTES)
+
+        Returns:
+            Список слотов (начало, конец) в часовом поясе бани
+        """
+        if self.is_closed:
+            return []
+
+        duration_minutes = duration_minutes or self.min_booking_minutes
+        length = timedelta(minutes=duration_minutes)
+        return [
+            self._slot(start_minute, length)
+            for start_minute in find_available_slots_in_bits(
+                self.busy_bits, self.open_minute, self.close_minute, self.slot_step_minutes, duration_minutes
+            )
+        ]
+
+    def slot_durations(self) -> List[int]:
+        """Длительности бронирования: минимальная и далее с шагом в час, пока помещаются в самое длинное окно."""
+        longest = max((end - start for start, end in self.windows), default=0)
+        return list(range(self.min_booking_minutes, longest + 1, 60))
+
+    def available_slots_by_duration(self, durations: Optional[Iterable[int]] = None) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """
+        Свободные слоты для нескольких длительностей из одного прохода по свободным участкам.
+
+        Args:
+            durations: Длительности в минутах (по умолчанию slot_durations)
+
+        Returns:
+            Словарь {длительность: список слотов} по возрастанию длительности;
+            длительности без слотов не включаются
+        """
+        if durations is None:
+            durations = self.slot_durations()
+
+        starts_by_duration = find_slots_in_free_ranges(
+            self._free_ranges(), self.open_minute, self.slot_step_minutes, sorted(set(durations))
+        )
+
+        slots_by_duration = {}
+        for duration, starts in starts_by_duration.items():
+            if starts:
+                length = timedelta(minutes=duration)
+                slots_by_duration[duration] = [self._slot(start_minute, length) for start_minute in starts]
+        return slots_by_duration
+
+    def _free_ranges(self) -> List[Tuple[int, int]]:
+        if self.is_closed:
+            return []
+        return find_free_ranges_in_bits(self.busy_bits, self.open_minute, self.close_minute)
+
+    def free_intervals(self) -> List[Tuple[datetime, datetime]]:
+        """Свободные интервалы рабочего дня в часовом поясе бани (пусто, если баня закрыта)."""
+        return [
+            (self._midnight + timedelta(minutes=start), self._midnight + timedelta(minutes=end))
+            for start, end in self._free_ranges()
+        ]
@@ -0,0 +1,131 @@
+"""
+Удержание слотов неоплаченными бронированиями.
+
+Новое pending бронирование удерживает свой слот SLOT_HOLD_MINUTES минут (поле
+hold_expires_at): пока удержание действует, время отмечено в таблице занятости
+и не предлагается другим клиентам. Конфликты проверяются при создании
+бронирования и при сообщении об оплате под блокировкой строки бани, поэтому два
+клиента не могут занять один и тот же слот, и администратору не приходится
+отклонять проигравших.
+
+Истекшие удержания снимает сборщик release_expired_holds (фоновая задача бота и
+команда manage.py release_expired_holds) массовым UPDATE по частичному индексу
+booking_pending_hold_idx. До его прохода слот остается скрытым в списках
+доступности, но уже не мешает новым бронированиям.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SLOT_HELD_ERROR, Booking, lock_bathhouse, occupying_q
+from .occupancy import invalidate_availability, rebuild_for_intervals
+
+logger = logging.getLogger(__name__)
+
+
+def hold_deadline(config=None, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Срок удержания слота для нового бронирования.
+
+    Args:
+        config: Срез настроек ConfigSnapshot (по умолчанию читается из SystemConfig)
+        now: Текущий момент (по умолчанию timezone.now())
+
+    Returns:
+        Момент окончания удержания или None, если удержание отключено (SLOT_HOLD_MINUTES <= 0)
+    """
+    if config is not None:
+        hold_minutes = config.slot_hold_minutes
+    else:
+        from .config_init import get_config_int
+        hold_minutes = get_config_int("SLOT_HOLD_MINUTES", 30)
+
+    if hold_minutes <= 0:
+        return None
+    return (now or timezone.now()) + timedelta(minutes=hold_minutes)
+
+
+def conflicting_bookings(booking, now: Optional[datetime] = None):
+    """Бронирования той же бани, которые сейчас занимают пересекающееся время (кроме самого объекта)."""
+    conflicts = Booking.objects.filter(  # type: ignore
+        occupying_q(now or timezone.now()),
+        bathhouse_id=booking.bathhouse_id,
+        start_datetime__lt=booking.end_datetime,
+        end_datetime__gt=booking.start_datetime
+    )
+    if booking.pk:
+        conflicts = conflicts.exclude(pk=booking.pk)
+    return conflicts
+
+
+def save_if_slot_free(booking, now: Optional[datetime] = None) -> None:
+    """
+    Сохранить бронирование, если его время не занято другим бронированием.
+
+    Строка бани блокируется до конца транзакции (как в Booking.save), поэтому
+    параллельные запросы на один слот проверяются и сохраняются по очереди.
+
+    Raises:
+        ValidationError: Если время занято подтвержденным, оплаченным или удерживаемым бронированием
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    with transaction.atomic():
+        lock_bathhouse(booking.bathhouse_id)
+        if conflicting_bookings(booking, now).exists():
+            raise ValidationError({
+                'start_datetime': SLOT_HELD_ERROR,
+                'end_datetime': SLOT_HELD_ERROR
+            })
+        booking.save()
+
+
+def release_expired_holds(now: Optional[datetime] = None, batch_size: int = 500) -> int:
+    """
+    Снять истекшие удержания слотов.
+
+    Бронирования остаются в статусе pending: клиент еще может сообщить об оплате,
+    если слот к тому времени не занят. Удержания снимаются пачками по batch_size
+    одним UPDATE на пачку, занятость затронутых дней пересчитывается явно.
+
+    Args:
+        now: Момент, на который удержания считаются истекшими (по умолчанию timezone.now())
+        batch_size: Размер пачки
+
+    Returns:
+        Количество снятых удержаний
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    now = now or timezone.now()
+    released = 0
+
+    while True:
+        batch = list(Booking.objects.filter(  # type: ignore
+            status='pending', hold_expires_at__lte=now
+        ).order_by('hold_expires_at').values_list(
+            'id', 'bathhouse_id', 'start_datetime', 'end_datetime'
+        )[:batch_size])
+        if not batch:
+            break
+
+        with transaction.atomic():
+            released += Booking.objects.filter(  # type: ignore
+                id__in=[booking_id for booking_id, *_ in batch],
+                status='pending',
+                hold_expires_at__lte=now
+            ).update(hold_expires_at=None)
+            affected = rebuild_for_intervals(interval for _, *interval in batch)
+
+        invalidate_availability(affected)
+
+        if len(batch) < batch_size:
+            break
+
+    if released:
+        logger.info(f"Expired slot holds released: {released}")
+    return released
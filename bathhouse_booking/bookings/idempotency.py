@@ -0,0 +1,33 @@
+"""
+Недавние запросы на бронирование для защиты от повторов.
+
+Двойное нажатие кнопки или повторная доставка callback от Telegram приводят к
+повторному вызову create_booking_request с теми же параметрами. Ключ запроса
+(пользователь Telegram, баня, начало, конец) сопоставляется с ID созданного
+бронирования на короткое время (TTL); повторный запрос возвращает уже
+созданное бронирование без проверки лимита, расчета цены и вставки.
+"""
+from datetime import datetime
+from typing import Tuple
+
+from django.conf import settings
+
+from .lru import BoundedLRU
+
+
+def booking_request_key(telegram_id, bathhouse_id: int, start: datetime, end: datetime) -> Tuple:
+    """Ключ идемпотентности запроса на бронирование."""
+    return (str(telegram_id), bathhouse_id, start.timestamp(), end.timestamp())
+
+
+class RecentBookingRequests(BoundedLRU):
+    """LRU-отображение ключ запроса -> ID бронирования с ограничением времени жизни"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 120):
+        super().__init__(max_size, ttl_seconds)
+
+
+recent_booking_requests = RecentBookingRequests(
+    max_size=getattr(settings, "BOOKING_IDEMPOTENCY_MAX_SIZE", 10000),
+    ttl_seconds=getattr(settings, "BOOKING_IDEMPOTENCY_TTL_SECONDS", 120)
+)
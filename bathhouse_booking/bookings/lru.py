@@ -0,0 +1,73 @@
+"""
+Ограниченный LRU-словарь в памяти процесса.
+
+Общая основа кэша доступности (availability_cache.py), карты идентичности
+клиентов (client_identity.py) и недавних запросов на бронирование
+(idempotency.py): потокобезопасное хранение с вытеснением самых давно
+использованных записей, необязательным временем жизни и счетчиками
+попаданий и промахов.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class BoundedLRU:
+    """Потокобезопасный LRU-словарь с ограничением размера и необязательным TTL"""
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_size: Наибольшее число записей (0 - ничего не хранить)
+            ttl_seconds: Время жизни записи (None - без ограничения)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Реентерабельная: составные операции владельцев (проверка + запись) берут ее целиком
+        self.lock = threading.RLock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение или None при промахе (отсутствии или истечении записи)."""
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохранить значение, вытеснив самые давно использованные записи сверх max_size."""
+        if self.max_size <= 0 or (self.ttl_seconds is not None and self.ttl_seconds <= 0):
+            return
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self.lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        """Удалить запись, если она есть."""
+        with self.lock:
+            self._entries.pop(key, None)
+
+    def clear(self, reset_stats: bool = True) -> None:
+        """Удалить все записи и (по умолчанию) обнулить счетчики."""
+        with self.lock:
+            self._entries.clear()
+            if reset_stats:
+                self.hits = 0
+                self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bathhouse_booking.bookings.occupancy import find_mismatches, rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Перестроить таблицу занятости бань по бронированиям, занимающим время (approved, оплаченные, удерживаемые), и сверить ее с живыми данными"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Только сверить таблицу с живыми данными, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            rows = rebuild_all()
+            self.stdout.write(f"Таблица занятости перестроена: {rows} строк")
+
+        mismatches = find_mismatches()
+        if mismatches:
+            for bathhouse_id, day in mismatches:
+                self.stderr.write(f"Расхождение: баня {bathhouse_id}, дата {day}")
+            raise CommandError(f"Найдено расхождений: {len(mismatches)}")
+
+        self.stdout.write(self.style.SUCCESS("Таблица занятости совпадает с бронированиями"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bathhouse_booking.bookings.active_bookings import recount_active_bookings
+
+
+class Command(BaseCommand):
+    help = "Сверить счетчики активных бронирований клиентов с бронированиями и исправить расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Только найти расхождения, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        drifted = recount_active_bookings(dry_run=options['check'])
+        for client_id, stored, actual in drifted:
+            self.stderr.write(f"Расхождение: клиент {client_id}, счетчик {stored}, фактически {actual}")
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f"Найдено расхождений: {len(drifted)}")
+            self.stdout.write(self.style.SUCCESS("Счетчики совпадают с бронированиями"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено счетчиков: {len(drifted)}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from bathhouse_booking.bookings.holds import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Снять истекшие удержания слотов неоплаченными бронированиями и освободить время в таблице занятости"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Сколько бронирований обрабатывать одним UPDATE",
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Снято удержаний: {released}"))
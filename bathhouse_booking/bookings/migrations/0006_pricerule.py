@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_working_hours_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_type', models.CharField(choices=[('any', 'Любой день'), ('weekdays', 'Будни'), ('weekends', 'Выходные')], default='any', max_length=10)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField(help_text='00:00 - до конца суток')),
+                ('hourly_price', models.PositiveIntegerField()),
+                ('bathhouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bookings.bathhouse')),
+            ],
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+CONSTRAINT = 'booking_no_overlap_approved'
+
+
+def find_overlapping_approved(Booking):
+    """Пары ID пересекающихся approved бронирований одной бани"""
+    overlaps = []
+    open_bookings = []
+    last_bathhouse_id = None
+    for booking_id, bathhouse_id, start, end in Booking.objects.filter(status='approved').order_by(
+        'bathhouse_id', 'start_datetime', 'pk'
+    ).values_list('pk', 'bathhouse_id', 'start_datetime', 'end_datetime').iterator():
+        if bathhouse_id != last_bathhouse_id:
+            open_bookings, last_bathhouse_id = [], bathhouse_id
+        open_bookings = [(other_id, other_end) for other_id, other_end in open_bookings if other_end > start]
+        overlaps.extend((other_id, booking_id) for other_id, _ in open_bookings)
+        open_bookings.append((booking_id, end))
+    return overlaps
+
+
+def check_approved_overlaps(apps, schema_editor):
+    # Ограничение не создастся, пока в таблице есть пересечения; сообщаем, какие бронирования исправить
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    overlaps = find_overlapping_approved(apps.get_model('bookings', 'Booking'))
+    if overlaps:
+        pairs = ', '.join(f'{first}/{second}' for first, second in overlaps)
+        raise RuntimeError(
+            f'Пересекающиеся approved бронирования (ID): {pairs}. '
+            'Отклоните или перенесите лишние бронирования и повторите миграцию.'
+        )
+
+
+def add_overlap_constraint(apps, schema_editor):
+    # Ограничение-исключение есть только в PostgreSQL; остальные БД используют блокировку в Booking.save
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'ALTER TABLE bookings_booking ADD CONSTRAINT {CONSTRAINT} '
+        "EXCLUDE USING gist (bathhouse_id WITH =, tstzrange(start_datetime, end_datetime, '[)') WITH &&) "
+        "WHERE (status = 'approved')"
+    )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS {CONSTRAINT}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_configversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_approved_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
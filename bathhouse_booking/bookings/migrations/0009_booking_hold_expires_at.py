@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:42
+
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.db import migrations, models
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _bits_by_day(intervals, tz):
+    """Битовые карты занятости по локальным дням (бит на минуту, неполная минута занята целиком)"""
+    minute = timedelta(minutes=1)
+    bits_by_day = {}
+    for start, end in intervals:
+        start_local = start.astimezone(tz).replace(tzinfo=None)
+        end_local = end.astimezone(tz).replace(tzinfo=None)
+        day = start_local.date()
+        while True:
+            day_start = datetime.combine(day, time(0, 0))
+            if day_start >= end_local:
+                break
+            first = (max(start_local, day_start) - day_start) // minute
+            last = -((day_start - min(end_local, day_start + timedelta(days=1))) // minute)
+            if last > first:
+                bits_by_day[day] = bits_by_day.get(day, 0) | (((1 << (last - first)) - 1) << first)
+            day += timedelta(days=1)
+    return bits_by_day
+
+
+def rebuild_occupancy(apps, schema_editor):
+    """Перестроить занятость: теперь ее занимают и бронирования со статусом payment_reported"""
+    Booking = apps.get_model('bookings', 'Booking')
+    DayOccupancy = apps.get_model('bookings', 'DayOccupancy')
+    tz = pytz.timezone('Asia/Jakarta')
+
+    intervals_by_bathhouse = {}
+    for bathhouse_id, start, end in Booking.objects.filter(
+        status__in=('approved', 'payment_reported')
+    ).values_list('bathhouse_id', 'start_datetime', 'end_datetime').iterator():
+        intervals_by_bathhouse.setdefault(bathhouse_id, []).append((start, end))
+
+    DayOccupancy.objects.all().delete()
+    DayOccupancy.objects.bulk_create([
+        DayOccupancy(bathhouse_id=bathhouse_id, date=day, bits=bits.to_bytes(MINUTES_PER_DAY // 8, 'little'))
+        for bathhouse_id, intervals in intervals_by_bathhouse.items()
+        for day, bits in _bits_by_day(intervals, tz).items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_overlap_exclusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['hold_expires_at'], name='booking_pending_hold_idx'),
+        ),
+        migrations.RunPython(rebuild_occupancy, migrations.RunPython.noop),
+    ]
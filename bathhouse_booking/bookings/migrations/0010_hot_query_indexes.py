@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_booking_hold_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['bathhouse', 'status', 'start_datetime', 'end_datetime'], name='booking_bh_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', 'status'], name='booking_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['telegram_id'], name='client_telegram_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationqueue',
+            index=models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['created_at'], name='notification_unsent_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_clients(apps, schema_editor):
+    """Объединить клиентов с одинаковым telegram_id перед добавлением уникальности"""
+    Client = apps.get_model('bookings', 'Client')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    Client.objects.filter(telegram_id='').update(telegram_id=None)
+
+    duplicates = Client.objects.exclude(telegram_id=None).values('telegram_id').annotate(
+        count=Count('id'), keep_id=Min('id')
+    ).filter(count__gt=1)
+    for row in duplicates:
+        keeper = Client.objects.get(id=row['keep_id'])
+        others = Client.objects.filter(telegram_id=row['telegram_id']).exclude(id=keeper.id)
+
+        # Сохраняем телефон, если он был указан только у дубликата
+        if not keeper.phone:
+            phone = others.exclude(phone='').exclude(phone=None).order_by('-id').values_list('phone', flat=True).first()
+            if phone:
+                keeper.phone = phone
+                keeper.save(update_fields=['phone'])
+
+        Booking.objects.filter(client__in=others).update(client=keeper)
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_clients, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='client',
+            name='client_telegram_id_idx',
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='telegram_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
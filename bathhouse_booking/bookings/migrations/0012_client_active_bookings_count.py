@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def fill_active_bookings_count(apps, schema_editor):
+    """Посчитать незакончившиеся approved бронирования каждого клиента"""
+    Client = apps.get_model('bookings', 'Client')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    counts = Booking.objects.filter(
+        client=OuterRef('pk'), status='approved', end_datetime__gt=timezone.now()
+    ).order_by().values('client').annotate(count=Count('pk')).values('count')
+    Client.objects.update(active_bookings_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_client_unique_telegram_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='active_bookings_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_active_bookings_count, migrations.RunPython.noop),
+    ]
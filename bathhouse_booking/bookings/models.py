@@ -1,5 +1,6 @@
 from django.db import models
 from django.db import models
+from django.db import IntegrityError, connections, router, transaction
 from django.core.exceptions import ValidationError
 from django.apps import apps
 from django.utils import timezone
@@ -8,16 +9,23 @@ from django.utils import timezone
 class Client(models.Model):
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20, blank=True, null=True)
-    telegram_id = models.CharField(max_length=64, null=True, blank=True)
+    # Уникальный индекс: поиск клиента по Telegram ID идет на каждом обновлении бота
+    telegram_id = models.CharField(max_length=64, null=True, blank=True, unique=True)
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-
-
+    # Число approved бронирований, которые еще не закончились (см. active_bookings.py)
+    active_bookings_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         phone_display = self.phone if self.phone else "нет телефона"
         return f"{self.name} ({phone_display})"  # type: ignore
 
+    def save(self, *args, **kwargs):
+        # Пустой Telegram ID храним как NULL, иначе клиенты без Telegram нарушат уникальность
+        if self.telegram_id == '':
+            self.telegram_id = None
+        super().save(*args, **kwargs)
+
 
 class Bathhouse(models.Model):
     name = models.CharField(max_length=200)
@@ -30,6 +38,56 @@ class Bathhouse(models.Model):
         return self.name  # type: ignore
 
 
+# Ограничение-исключение PostgreSQL (миграция 0008): approved бронирования одной бани не пересекаются
+BOOKING_OVERLAP_CONSTRAINT = 'booking_no_overlap_approved'
+
+OVERLAP_ERROR = 'Пересечение с другим подтвержденным бронированием'
+
+SLOT_HELD_ERROR = 'Это время уже занято или удерживается другим бронированием'
+
+# Статусы, в которых бронирование занимает время бани; pending - только пока действует удержание слота
+OCCUPYING_STATUSES = ('approved', 'payment_reported')
+
+
+def occupying_q(now=None) -> models.Q:
+    """
+    Условие "бронирование занимает время бани".
+
+    Args:
+        now: Момент проверки. Без него удержание pending бронирования считается
+            действующим, пока его не снял сборщик (так строится таблица занятости);
+            с ним - пока не истек срок hold_expires_at (так проверяются конфликты).
+    """
+    if now is None:
+        held = models.Q(status='pending', hold_expires_at__isnull=False)
+    else:
+        held = models.Q(status='pending', hold_expires_at__gt=now)
+    # Избыточное условие status IN (...) позволяет искать по индексу booking_bh_status_time_idx,
+    # не просматривая историю отклоненных и отмененных бронирований
+    return models.Q(status__in=OCCUPYING_STATUSES + ('pending',)) & (models.Q(status__in=OCCUPYING_STATUSES) | held)
+
+
+def overlap_enforced_by_db(using) -> bool:
+    """Проверяет ли пересечения approved бронирований сама БД (ограничение-исключение PostgreSQL)."""
+    return connections[using].vendor == 'postgresql'
+
+
+def lock_bathhouse(bathhouse_id, using=None) -> None:
+    """
+    Заблокировать строку бани до конца текущей транзакции.
+
+    Пустой UPDATE блокирует строку (в SQLite - всю БД на запись), поэтому проверки
+    свободного времени одной бани под этой блокировкой выполняются по очереди.
+
+    Args:
+        bathhouse_id: ID бани или список ID
+        using: Псевдоним БД (по умолчанию - БД для записи)
+    """
+    ids = sorted(bathhouse_id) if isinstance(bathhouse_id, (list, tuple, set)) else [bathhouse_id]
+    bathhouses = Bathhouse.objects.using(using) if using else Bathhouse.objects  # type: ignore
+    bathhouses.filter(pk__in=ids).update(is_active=models.F('is_active'))
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Ожидает оплаты'),
@@ -48,12 +106,47 @@ class Booking(models.Model):
     prepayment_amount = models.IntegerField(null=True, blank=True)
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # До этого момента pending бронирование удерживает слот; NULL - удержания нет
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
 
-
+    class Meta:
+        indexes = [
+            # Проверки пересечений и пересчет занятости: баня + статус + интервал
+            models.Index(
+                fields=['bathhouse', 'status', 'start_datetime', 'end_datetime'],
+                name='booking_bh_status_time_idx',
+            ),
+            # Лимит активных бронирований и список "Мои бронирования"
+            models.Index(fields=['client', 'status'], name='booking_client_status_idx'),
+            # Сборщик истекших удержаний просматривает только pending бронирования
+            models.Index(
+                fields=['hold_expires_at'],
+                name='booking_pending_hold_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.bathhouse.name} - {self.client.name} ({self.start_datetime:%Y-%m-%d %H:%M})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные значения, чтобы при сохранении понять, какие дни занятости пересчитать
+        instance._loaded_occupancy = instance.occupancy_key()
+        instance._loaded_client_id = instance.__dict__.get('client_id')
+        return instance
+
+    def occupancy_key(self):
+        """Поля бронирования, от которых зависит таблица занятости DayOccupancy."""
+        return (
+            self.__dict__.get('status'),
+            self.__dict__.get('bathhouse_id'),
+            self.__dict__.get('start_datetime'),
+            self.__dict__.get('end_datetime'),
+            self.__dict__.get('hold_expires_at') is not None,
+        )
+
     def clean(self):
         # Проверка наличия обязательных полей
         if self.start_datetime is None or self.end_datetime is None:
@@ -76,27 +169,163 @@ class Booking(models.Model):
                 'end_datetime': 'Время начала не может быть в прошлом'
             })
         
-        # Запрет пересечений только для approved статуса
+        # Запрет пересечений только для approved статуса. Предварительная проверка нужна, чтобы форма
+        # показала ошибку; гонки ловит save (в PostgreSQL - ограничение-исключение БД)
         if self.status == 'approved':
-            # Ищем пересекающиеся approved бронирования для той же бани
-            overlapping_bookings = Booking.objects.filter(  # type: ignore
-                bathhouse=self.bathhouse,
-                status='approved',
-                # Проверка пересечения: (start < existing.end) AND (end > existing.start)
-                start_datetime__lt=self.end_datetime,
-                end_datetime__gt=self.start_datetime
-            )
-            
-            # Исключаем сам объект при обновлении существующей записи
-            if self.pk:
-                overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
-            
-            if overlapping_bookings.exists():
+            if self._overlapping_approved().exists():
                 raise ValidationError({
-                    'start_datetime': 'Пересечение с другим подтвержденным бронированием',
-                    'end_datetime': 'Пересечение с другим подтвержденным бронированием'
+                    'start_datetime': OVERLAP_ERROR,
+                    'end_datetime': OVERLAP_ERROR
                 })
 
+    def _overlapping_approved(self, using=None):
+        """Пересекающиеся approved бронирования той же бани (кроме самого объекта)."""
+        overlapping_bookings = Booking.objects.using(using).filter(  # type: ignore
+            bathhouse_id=self.bathhouse_id,
+            status='approved',
+            # Проверка пересечения: (start < existing.end) AND (end > existing.start)
+            start_datetime__lt=self.end_datetime,
+            end_datetime__gt=self.start_datetime
+        )
+        
+        # Исключаем сам объект при обновлении существующей записи
+        if self.pk:
+            overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
+        return overlapping_bookings
+
+    def save(self, *args, **kwargs):
+        """
+        Сохранить бронирование без гонок при подтверждении.
+
+        PostgreSQL: пересечения approved бронирований отсекает ограничение-исключение,
+        нарушение превращается в ValidationError. Остальные БД: строка бани
+        блокируется (в SQLite - вся БД на запись) до конца транзакции, и пересечения
+        проверяются под блокировкой.
+
+        Raises:
+            ValidationError: Если approved бронирование пересекается с другим
+        """
+        # Проверка нужна, только если бронирование становится approved или меняет время/баню
+        if self.status != 'approved' or getattr(self, '_loaded_occupancy', None) == self.occupancy_key():
+            return super().save(*args, **kwargs)
+
+        using = kwargs.get('using') or router.db_for_write(Booking, instance=self)
+        if overlap_enforced_by_db(using):
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError as e:
+                if BOOKING_OVERLAP_CONSTRAINT in str(e):
+                    raise ValidationError({
+                        'start_datetime': OVERLAP_ERROR,
+                        'end_datetime': OVERLAP_ERROR
+                    }) from e
+                raise
+
+        with transaction.atomic(using=using):
+            lock_bathhouse(self.bathhouse_id, using)
+            if self._overlapping_approved(using).exists():
+                raise ValidationError({
+                    'start_datetime': OVERLAP_ERROR,
+                    'end_datetime': OVERLAP_ERROR
+                })
+            return super().save(*args, **kwargs)
+
+
+class DayOccupancy(models.Model):
+    """Занятость бани approved, оплаченными и удерживаемыми бронированиями за локальные сутки (бит на минуту)"""
+    bathhouse = models.ForeignKey(Bathhouse, on_delete=models.CASCADE)
+    date = models.DateField()
+    bits = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bathhouse', 'date'], name='unique_day_occupancy'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.bathhouse_id} {self.date}"  # type: ignore
+
+
+class WorkingHours(models.Model):
+    """Часы работы бани по дню недели (без бани - для всех бань)"""
+    WEEKDAY_CHOICES = [
+        (0, 'Понедельник'),
+        (1, 'Вторник'),
+        (2, 'Среда'),
+        (3, 'Четверг'),
+        (4, 'Пятница'),
+        (5, 'Суббота'),
+        (6, 'Воскресенье'),
+    ]
+
+    bathhouse = models.ForeignKey(Bathhouse, on_delete=models.CASCADE, null=True, blank=True)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    open_time = models.TimeField()
+    close_time = models.TimeField()
+
+    def __str__(self) -> str:
+        scope = self.bathhouse_id or "все бани"  # type: ignore
+        return f"{scope}: {self.get_weekday_display()} {self.open_time:%H:%M}-{self.close_time:%H:%M}"  # type: ignore
+
+    def clean(self):
+        if self.open_time is not None and self.close_time is not None and self.open_time >= self.close_time:
+            raise ValidationError({'close_time': 'Время закрытия должно быть позже времени открытия'})
+
+
+class ScheduleException(models.Model):
+    """Исключение из расписания на дату: особые часы работы или выходной (без бани - для всех бань)"""
+    bathhouse = models.ForeignKey(Bathhouse, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    is_closed = models.BooleanField(default=False)  # type: ignore
+    open_time = models.TimeField(null=True, blank=True)
+    close_time = models.TimeField(null=True, blank=True)
+    comment = models.CharField(max_length=200, blank=True)
+
+    def __str__(self) -> str:
+        scope = self.bathhouse_id or "все бани"  # type: ignore
+        if self.is_closed:
+            return f"{scope}: {self.date} закрыто"
+        return f"{scope}: {self.date} {self.open_time:%H:%M}-{self.close_time:%H:%M}"
+
+    def clean(self):
+        if self.is_closed:
+            return
+        if self.open_time is None or self.close_time is None:
+            raise ValidationError('Укажите часы работы или отметьте день как выходной')
+        if self.open_time >= self.close_time:
+            raise ValidationError({'close_time': 'Время закрытия должно быть позже времени открытия'})
+
+
+class PriceRule(models.Model):
+    """Цена часа в интервале времени суток (без бани - для всех бань)"""
+    DAY_TYPE_CHOICES = [
+        ('any', 'Любой день'),
+        ('weekdays', 'Будни'),
+        ('weekends', 'Выходные'),
+    ]
+
+    bathhouse = models.ForeignKey(Bathhouse, on_delete=models.CASCADE, null=True, blank=True)
+    day_type = models.CharField(max_length=10, choices=DAY_TYPE_CHOICES, default='any')
+    start_time = models.TimeField()
+    end_time = models.TimeField(help_text='00:00 - до конца суток')
+    hourly_price = models.PositiveIntegerField()
+
+    def __str__(self) -> str:
+        scope = self.bathhouse_id or "все бани"  # type: ignore
+        return (
+            f"{scope}: {self.get_day_type_display()} "  # type: ignore
+            f"{self.start_time:%H:%M}-{self.end_time:%H:%M} {self.hourly_price} руб./ч"
+        )
+
+    def clean(self):
+        if self.start_time is None or self.end_time is None:
+            return
+        ends_at_midnight = self.end_time.hour == 0 and self.end_time.minute == 0
+        if not ends_at_midnight and self.start_time >= self.end_time:
+            raise ValidationError({'end_time': 'Время окончания должно быть позже времени начала'})
+
 
 class SystemConfig(models.Model):
     key = models.CharField(max_length=100, unique=True)
@@ -109,6 +338,16 @@ class SystemConfig(models.Model):
         return self.key  # type: ignore
 
 
+class ConfigVersion(models.Model):
+    """Общая версия настроек: растет при каждом изменении конфигурации, расписания или цен"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} v{self.version}"
+
+
 class NotificationQueue(models.Model):
     """Очередь уведомлений для отправки через бота"""
     telegram_id = models.CharField(max_length=64)
@@ -119,7 +358,15 @@ class NotificationQueue(models.Model):
     sent_at = models.DateTimeField(null=True, blank=True)
     attempts = models.IntegerField(default=0)
 
-
+    class Meta:
+        indexes = [
+            # Опрос очереди ботом: только неотправленные уведомления по времени создания
+            models.Index(
+                fields=['created_at'],
+                name='notification_unsent_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Notification to {self.telegram_id} ({self.status})"
@@ -122,10 +122,35 @@ async def notify_booking_status_change(booking_id: int, old_status: str, new_sta
         return False
 
 
+def _status_message(booking, new_status: str) -> Optional[str]:
+    """Текст уведомления клиенту о новом статусе бронирования или None, если уведомление не нужно"""
+    from django.utils import timezone
+    
+    # Конвертируем время из UTC в локальное (Asia/Jakarta)
+    local_start = timezone.localtime(booking.start_datetime)
+    local_end = timezone.localtime(booking.end_datetime)
+    
+    status_messages = {
+        'approved': f"✅ Ваше бронирование #{booking.id} подтверждено!\n"
+                   f"Баня: {booking.bathhouse.name}\n"
+                   f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}\n"
+                   f"Статус: Подтверждено\n\nЖдем вас в указанное время!",
+        
+        'rejected': f"❌ Ваше бронирование #{booking.id} отклонено.\n"
+                   f"Баня: {booking.bathhouse.name}\n"
+                   f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}\n"
+                   f"Причина: {booking.comment.split('Отклонено: ')[-1] if 'Отклонено:' in booking.comment else 'Не указана'}",
+        
+        'cancelled': f"🗑️ Ваше бронирование #{booking.id} отменено.\n"
+                    f"Баня: {booking.bathhouse.name}\n"
+                    f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}"
+    }
+    return status_messages.get(new_status)
+
+
 def send_booking_status_notification(booking_id: int, old_status: str, new_status: str) -> None:
     """Отправить уведомление об изменении статуса бронирования (синхронная версия)"""
     from .models import Booking, NotificationQueue
-    from django.utils import timezone
     
     try:
         booking = Booking.objects.get(id=booking_id)
@@ -134,28 +159,8 @@ def send_booking_status_notification(booking_id: int, old_status: str, new_statu
             logger.warning(f"Client {booking.client.id} has no telegram_id")
             return
         
-        # Конвертируем время из UTC в локальное (Asia/Jakarta)
-        local_start = timezone.localtime(booking.start_datetime)
-        local_end = timezone.localtime(booking.end_datetime)
-        
-        status_messages = {
-            'approved': f"✅ Ваше бронирование #{booking.id} подтверждено!\n"
-                       f"Баня: {booking.bathhouse.name}\n"
-                       f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}\n"
-                       f"Статус: Подтверждено\n\nЖдем вас в указанное время!",
-            
-            'rejected': f"❌ Ваше бронирование #{booking.id} отклонено.\n"
-                       f"Баня: {booking.bathhouse.name}\n"
-                       f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}\n"
-                       f"Причина: {booking.comment.split('Отклонено: ')[-1] if 'Отклонено:' in booking.comment else 'Не указана'}",
-            
-            'cancelled': f"🗑️ Ваше бронирование #{booking.id} отменено.\n"
-                        f"Баня: {booking.bathhouse.name}\n"
-                        f"Дата и время: {local_start.strftime('%d.%m.%Y %H:%M')} - {local_end.strftime('%H:%M')}"
-        }
-        
-        if new_status in status_messages:
-            message = status_messages[new_status]
+        message = _status_message(booking, new_status)
+        if message:
             # Сохраняем уведомление в базе данных для отправки ботом
             NotificationQueue.objects.create(
                 telegram_id=booking.client.telegram_id,
@@ -170,6 +175,39 @@ def send_booking_status_notification(booking_id: int, old_status: str, new_statu
     except Exception as e:
         logger.error(f"Failed to prepare booking status notification: {e}")
 
+
+def queue_booking_status_notifications(bookings, new_status: str) -> int:
+    """
+    Поставить в очередь уведомления об изменении статуса нескольких бронирований одним INSERT.
+
+    Бронирования должны быть загружены вместе с client и bathhouse (select_related).
+    Возвращает количество поставленных уведомлений.
+    """
+    from .models import NotificationQueue
+    
+    try:
+        notifications = []
+        for booking in bookings:
+            if not booking.client.telegram_id:
+                logger.warning(f"Client {booking.client.id} has no telegram_id")
+                continue
+            message = _status_message(booking, new_status)
+            if message:
+                notifications.append(NotificationQueue(
+                    telegram_id=booking.client.telegram_id,
+                    message=message,
+                    booking_id=booking.id,
+                    status=new_status
+                ))
+        
+        NotificationQueue.objects.bulk_create(notifications)
+        logger.info(f"Queued {len(notifications)} notifications: {new_status}")
+        return len(notifications)
+        
+    except Exception as e:
+        logger.error(f"Failed to queue booking status notifications: {e}")
+        return 0
+
 def queue_admin_payment_notification(booking_id: int) -> None:
     """Добавить уведомление администратору о новой оплате в очередь (синхронная версия)"""
     from .models import Booking, SystemConfig, NotificationQueue
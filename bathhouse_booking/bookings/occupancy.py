@@ -0,0 +1,282 @@
+"""
+Материализованная занятость бань по дням.
+
+Для каждой пары (баня, локальная дата), на которую приходится хотя бы одно
+бронирование, занимающее время бани (approved, payment_reported или pending
+с действующим удержанием слота, см. models.occupying_q), хранится строка
+DayOccupancy с битовой картой суток (бит на минуту). Отсутствие строки
+означает, что день полностью свободен. Таблица поддерживается сигналами
+модели Booking (см. signals.py) и сборщиком истекших удержаний (см. holds.py)
+и может быть перестроена командой manage.py rebuild_occupancy.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import pytz
+from django.db import transaction
+
+from .availability import bits_from_bytes, bits_to_bytes, occupancy_bits_by_day
+from .availability_cache import availability_cache
+from .models import OCCUPYING_STATUSES, Bathhouse, Booking, DayOccupancy, occupying_q
+
+logger = logging.getLogger(__name__)
+
+# Часовой пояс бани (GMT+7)
+BATHHOUSE_TIMEZONE = pytz.timezone('Asia/Jakarta')
+
+
+def get_day_bits(bathhouse_id: int, day: date) -> int:
+    """Получить битовую карту занятости бани за день (0, если день свободен)."""
+    data = DayOccupancy.objects.filter(  # type: ignore
+        bathhouse_id=bathhouse_id, date=day
+    ).values_list('bits', flat=True).first()
+    return bits_from_bytes(data)
+
+
+async def aget_day_bits(bathhouse_id: int, day: date) -> int:
+    """Асинхронная версия get_day_bits (через async ORM, без перехода в поток)."""
+    data = await DayOccupancy.objects.filter(  # type: ignore
+        bathhouse_id=bathhouse_id, date=day
+    ).values_list('bits', flat=True).afirst()
+    return bits_from_bytes(data)
+
+
+def get_range_bits(bathhouse_id: int, start_date: date, end_date: date) -> Dict[date, int]:
+    """Получить битовые карты бани за диапазон дат (только занятые дни)."""
+    return {
+        day: bits_from_bytes(data)
+        for day, data in DayOccupancy.objects.filter(  # type: ignore
+            bathhouse_id=bathhouse_id, date__gte=start_date, date__lte=end_date
+        ).values_list('date', 'bits')
+    }
+
+
+def get_bathhouses_day_bits(bathhouse_ids: Iterable[int], day: date) -> Dict[int, int]:
+    """Получить битовые карты нескольких бань за один день (только занятые бани)."""
+    return {
+        bathhouse_id: bits_from_bytes(data)
+        for bathhouse_id, data in DayOccupancy.objects.filter(  # type: ignore
+            bathhouse_id__in=list(bathhouse_ids), date=day
+        ).values_list('bathhouse_id', 'bits')
+    }
+
+
+def get_window_bits(bathhouse_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], int]:
+    """Получить битовые карты нескольких бань за диапазон дат одним запросом (только занятые дни)."""
+    return {
+        (bathhouse_id, day): bits_from_bytes(data)
+        for bathhouse_id, day, data in DayOccupancy.objects.filter(  # type: ignore
+            bathhouse_id__in=list(bathhouse_ids), date__gte=start_date, date__lte=end_date
+        ).values_list('bathhouse_id', 'date', 'bits')
+    }
+
+
+def _window_utc(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Границы локальных суток start_date..end_date в UTC."""
+    start = BATHHOUSE_TIMEZONE.localize(datetime.combine(start_date, time(0, 0)))
+    end = BATHHOUSE_TIMEZONE.localize(datetime.combine(end_date + timedelta(days=1), time(0, 0)))
+    return start.astimezone(pytz.UTC), end.astimezone(pytz.UTC)
+
+
+def compute_days_bits(bathhouse_id: int, days: Iterable[date]) -> Dict[date, int]:
+    """
+    Посчитать битовые карты дней по живым данным Booking.
+
+    Args:
+        bathhouse_id: ID бани
+        days: Локальные даты
+
+    Returns:
+        Словарь {дата: битовая карта} для всех переданных дат
+    """
+    days = set(days)
+    if not days:
+        return {}
+
+    window_start, window_end = _window_utc(min(days), max(days))
+    intervals = Booking.objects.filter(  # type: ignore
+        occupying_q(),
+        bathhouse_id=bathhouse_id,
+        start_datetime__lt=window_end,
+        end_datetime__gt=window_start
+    ).values_list('start_datetime', 'end_datetime')
+
+    bits_by_day = occupancy_bits_by_day(intervals, BATHHOUSE_TIMEZONE)
+    return {day: bits_by_day.get(day, 0) for day in days}
+
+
+def rebuild_days(bathhouse_id: int, days: Iterable[date]) -> None:
+    """
+    Пересчитать строки занятости бани за указанные дни.
+
+    Пересчеты одной бани сериализуются блокировкой строки Bathhouse, чтобы
+    параллельные подтверждения не перезаписали друг друга устаревшими данными.
+    """
+    days = set(days)
+    if not days:
+        return
+
+    with transaction.atomic():
+        list(Bathhouse.objects.select_for_update().filter(pk=bathhouse_id).values_list('pk'))  # type: ignore
+        bits_by_day = compute_days_bits(bathhouse_id, days)
+
+        empty_days = [day for day, bits in bits_by_day.items() if not bits]
+        if empty_days:
+            DayOccupancy.objects.filter(bathhouse_id=bathhouse_id, date__in=empty_days).delete()  # type: ignore
+
+        for day, bits in bits_by_day.items():
+            if bits:
+                DayOccupancy.objects.update_or_create(  # type: ignore
+                    bathhouse_id=bathhouse_id,
+                    date=day,
+                    defaults={'bits': bits_to_bytes(bits)}
+                )
+
+    logger.debug(f"Occupancy rebuilt: Bathhouse={bathhouse_id}, Days={sorted(days)}")
+
+
+def _occupies(key) -> bool:
+    """Занимает ли время бани бронирование с ключом occupancy_key() (см. models.occupying_q)."""
+    status, held = key[0], key[4]
+    return status in OCCUPYING_STATUSES or (status == 'pending' and held)
+
+
+def _booking_days(bathhouse_id, start, end) -> Dict[int, set]:
+    """Локальные даты, которые затрагивает интервал бронирования."""
+    if bathhouse_id is None or start is None or end is None:
+        return {}
+    first = start.astimezone(BATHHOUSE_TIMEZONE).date()
+    last = end.astimezone(BATHHOUSE_TIMEZONE).date()
+    return {bathhouse_id: {first + timedelta(days=i) for i in range((last - first).days + 1)}}
+
+
+def sync_booking_occupancy(booking, deleted: bool = False) -> Dict[int, set]:
+    """
+    Обновить занятость после сохранения или удаления бронирования.
+
+    Пересчитываются только дни, затронутые бронированием, которое занимало или
+    занимает время бани и изменило статус, время или баню.
+
+    Args:
+        booking: Сохраненное или удаленное бронирование
+        deleted: Бронирование было удалено
+
+    Returns:
+        Словарь {ID бани: множество пересчитанных дат}
+    """
+    previous = getattr(booking, '_loaded_occupancy', None)
+    current = booking.occupancy_key()
+
+    affected: Dict[int, set] = {}
+    if deleted:
+        if _occupies(current):
+            affected = _booking_days(*current[1:4])
+    elif previous != current and not (
+        # Статус и интервал не изменились, поменялся только срок удержания. При смене
+        # статуса дни пересчитываются всегда: загруженное состояние могло устареть
+        # (например, после массового UPDATE в обход сигналов)
+        previous is not None and _occupies(previous) and _occupies(current)
+        and previous[0] == current[0] and previous[1:4] == current[1:4]
+    ):
+        if previous is not None and _occupies(previous):
+            for bathhouse_id, days in _booking_days(*previous[1:4]).items():
+                affected.setdefault(bathhouse_id, set()).update(days)
+        if _occupies(current):
+            for bathhouse_id, days in _booking_days(*current[1:4]).items():
+                affected.setdefault(bathhouse_id, set()).update(days)
+
+    for bathhouse_id, days in affected.items():
+        rebuild_days(bathhouse_id, days)
+
+    booking._loaded_occupancy = None if deleted else current
+    return affected
+
+
+def rebuild_for_intervals(intervals: Iterable[Tuple[int, datetime, datetime]]) -> Dict[int, set]:
+    """
+    Пересчитать дни, затронутые интервалами, после массового изменения бронирований.
+
+    Массовые UPDATE не вызывают сигналы модели Booking, поэтому занятость
+    пересчитывается явно.
+
+    Args:
+        intervals: Тройки (ID бани, начало, конец)
+
+    Returns:
+        Словарь {ID бани: множество пересчитанных дат}
+    """
+    affected: Dict[int, set] = {}
+    for bathhouse_id, start, end in intervals:
+        for days_bathhouse_id, days in _booking_days(bathhouse_id, start, end).items():
+            affected.setdefault(days_bathhouse_id, set()).update(days)
+
+    for bathhouse_id, days in affected.items():
+        rebuild_days(bathhouse_id, days)
+    return affected
+
+
+def invalidate_availability(affected: Dict[int, set]) -> None:
+    """Сбросить кэш доступности пересчитанных дней сразу и повторно после коммита транзакции"""
+    def invalidate():
+        for bathhouse_id, days in affected.items():
+            availability_cache.invalidate_days(bathhouse_id, days)
+
+    if affected:
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+def _live_bits() -> Dict[Tuple[int, date], int]:
+    """Посчитать занятость всех бань по живым данным Booking."""
+    intervals_by_bathhouse: Dict[int, List] = {}
+    for bathhouse_id, start, end in Booking.objects.filter(  # type: ignore
+        occupying_q()
+    ).values_list('bathhouse_id', 'start_datetime', 'end_datetime').iterator():
+        intervals_by_bathhouse.setdefault(bathhouse_id, []).append((start, end))
+
+    live: Dict[Tuple[int, date], int] = {}
+    for bathhouse_id, intervals in intervals_by_bathhouse.items():
+        for day, bits in occupancy_bits_by_day(intervals, BATHHOUSE_TIMEZONE).items():
+            live[(bathhouse_id, day)] = bits
+    return live
+
+
+def rebuild_all() -> int:
+    """
+    Перестроить таблицу занятости с нуля.
+
+    Returns:
+        Количество созданных строк
+    """
+    with transaction.atomic():
+        live = _live_bits()
+        DayOccupancy.objects.all().delete()  # type: ignore
+        DayOccupancy.objects.bulk_create([  # type: ignore
+            DayOccupancy(bathhouse_id=bathhouse_id, date=day, bits=bits_to_bytes(bits))
+            for (bathhouse_id, day), bits in live.items()
+        ], batch_size=500)
+
+    logger.info(f"Occupancy table rebuilt: {len(live)} rows")
+    return len(live)
+
+
+def find_mismatches() -> List[Tuple[int, date]]:
+    """
+    Сверить таблицу занятости с живыми данными Booking.
+
+    Returns:
+        Отсортированный список пар (ID бани, дата), по которым есть расхождения
+    """
+    live = _live_bits()
+    stored = {
+        (bathhouse_id, day): bits_from_bytes(data)
+        for bathhouse_id, day, data in DayOccupancy.objects.values_list(  # type: ignore
+            'bathhouse_id', 'date', 'bits'
+        ).iterator()
+    }
+
+    return sorted(
+        key for key in set(live) | set(stored)
+        if live.get(key, 0) != stored.get(key, 0)
+    )
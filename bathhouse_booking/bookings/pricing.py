@@ -0,0 +1,166 @@
+"""
+Расчет стоимости бронирований по скомпилированной таблице цен.
+
+Цена часа для каждой минуты суток определяется базовой ценой HOURLY_PRICE и
+правилами PriceRule (часы пик, выходные, цены конкретной бани). Правила
+компилируются в массивы префиксных сумм по минутам для пар (баня, выходной
+ли день), поэтому стоимость любого слота - разность двух элементов массива,
+а все слоты дня оцениваются одним проходом без запросов к БД.
+
+Приоритет правил для минуты: правило бани важнее общего, правило для будней
+или выходных важнее правила на любой день, при равенстве - более позднее.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+from django.conf import settings
+
+from .availability import MINUTES_PER_DAY, split_interval_by_day
+from .compiled_cache import CompiledCache
+from .config_init import get_config_int
+from .models import PriceRule
+
+logger = logging.getLogger(__name__)
+
+# Часовой пояс бани (GMT+7)
+BATHHOUSE_TIMEZONE = pytz.timezone('Asia/Jakarta')
+
+DEFAULT_HOURLY_PRICE = 1000
+
+_MINUTE = timedelta(minutes=1)
+
+
+class PriceTable:
+    """Скомпилированные цены: префиксные суммы цены часа по минутам суток"""
+
+    def __init__(self, base_hourly_price: int, prefix_sums: Dict[Tuple[Optional[int], bool], List[int]]):
+        """
+        Args:
+            base_hourly_price: Базовая цена часа (она же минимальная стоимость бронирования)
+            prefix_sums: {(ID бани или None, выходной): префиксные суммы длиной MINUTES_PER_DAY + 1}
+        """
+        self.base_hourly_price = base_hourly_price
+        self.prefix_sums = prefix_sums
+
+    def _day_prefix(self, bathhouse_id: int, day: date) -> List[int]:
+        weekend = day.weekday() >= 5
+        prefix = self.prefix_sums.get((bathhouse_id, weekend))
+        if prefix is None:
+            prefix = self.prefix_sums[(None, weekend)]
+        return prefix
+
+    def _finalize(self, hour_price_minutes: float) -> int:
+        # Сумма цен часа по минутам / 60 = стоимость; не меньше цены одного часа
+        return max(int(round(hour_price_minutes / 60)), self.base_hourly_price)
+
+    def quote(self, bathhouse_id: int, start: datetime, end: datetime) -> int:
+        """
+        Стоимость бронирования бани на интервал (в том числе через полночь).
+
+        Returns:
+            Стоимость в рублях
+        """
+        parts = [
+            (self._day_prefix(bathhouse_id, day), first, last)
+            for day, first, last in split_interval_by_day(start, end, BATHHOUSE_TIMEZONE)
+        ]
+        if not parts:
+            return self._finalize(0)
+
+        total = sum(prefix[last] - prefix[first] for prefix, first, last in parts)
+
+        # Неполные минуты на краях интервала учитываются пропорционально
+        start_fraction = _minute_fraction(start)
+        if start_fraction:
+            prefix, first, _ = parts[0]
+            total -= (prefix[first + 1] - prefix[first]) * start_fraction
+        end_fraction = _minute_fraction(end)
+        if end_fraction:
+            prefix, _, last = parts[-1]
+            total -= (prefix[last] - prefix[last - 1]) * (1 - end_fraction)
+        return self._finalize(total)
+
+    def quote_day(self, bathhouse_id: int, day: date, slots: Iterable[Tuple[datetime, datetime]]) -> List[int]:
+        """
+        Стоимость всех слотов одного дня по одному массиву префиксных сумм.
+
+        Args:
+            bathhouse_id: ID бани
+            day: Локальная дата слотов
+            slots: Слоты (начало, конец)
+
+        Returns:
+            Список стоимостей в порядке слотов
+        """
+        prefix = self._day_prefix(bathhouse_id, day)
+        midnight = BATHHOUSE_TIMEZONE.localize(datetime.combine(day, time(0, 0)))
+
+        prices = []
+        for start, end in slots:
+            first = (start - midnight) // _MINUTE
+            last = -((midnight - end) // _MINUTE)
+            if 0 <= first and last <= MINUTES_PER_DAY and not _minute_fraction(start) and not _minute_fraction(end):
+                prices.append(self._finalize(prefix[last] - prefix[first]))
+            else:
+                prices.append(self.quote(bathhouse_id, start, end))
+        return prices
+
+
+def _minute_fraction(value: datetime) -> float:
+    """Доля минуты, прошедшая с ее начала."""
+    return (value.second + value.microsecond / 1_000_000) / 60
+
+
+def _rule_minutes(start_time, end_time) -> Tuple[int, int]:
+    start = start_time.hour * 60 + start_time.minute
+    end = end_time.hour * 60 + end_time.minute
+    # 00:00 в конце интервала означает конец суток
+    return start, end or MINUTES_PER_DAY
+
+
+def compile_prices() -> PriceTable:
+    """
+    Прочитать базовую цену и правила из БД и собрать таблицу цен.
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    base_hourly_price = get_config_int("HOURLY_PRICE", DEFAULT_HOURLY_PRICE)
+    # Защита от нулевой или отрицательной цены
+    if base_hourly_price <= 0:
+        logger.warning(f"Invalid hourly price: {base_hourly_price}, using default {DEFAULT_HOURLY_PRICE}")
+        base_hourly_price = DEFAULT_HOURLY_PRICE
+
+    rules = list(PriceRule.objects.order_by('id').values_list(  # type: ignore
+        'bathhouse_id', 'day_type', 'start_time', 'end_time', 'hourly_price'
+    ))
+
+    prefix_sums: Dict[Tuple[Optional[int], bool], List[int]] = {}
+    for bathhouse_id in {None} | {rule[0] for rule in rules}:
+        for weekend in (False, True):
+            day_type = 'weekends' if weekend else 'weekdays'
+            applicable = [
+                (index, rule) for index, rule in enumerate(rules)
+                if rule[0] in (None, bathhouse_id) and rule[1] in ('any', day_type)
+            ]
+            # Сначала общие правила, затем более точные: последнее записанное побеждает
+            applicable.sort(key=lambda item: (item[1][0] is not None, item[1][1] != 'any', item[0]))
+
+            minute_prices = [base_hourly_price] * MINUTES_PER_DAY
+            for _, (_, _, start_time, end_time, hourly_price) in applicable:
+                start, end = _rule_minutes(start_time, end_time)
+                if start < end:
+                    minute_prices[start:end] = [hourly_price] * (end - start)
+
+            prefix_sums[(bathhouse_id, weekend)] = list(accumulate(minute_prices, initial=0))
+
+    logger.debug(f"Price table compiled: Base={base_hourly_price}, Rules={len(rules)}")
+    return PriceTable(base_hourly_price, prefix_sums)
+
+
+price_cache: CompiledCache[PriceTable] = CompiledCache(
+    compile_prices, ttl_seconds=getattr(settings, "AVAILABILITY_CACHE_TTL_SECONDS", 60)
+)
@@ -0,0 +1,136 @@
+"""
+Расписание работы бань, скомпилированное в таблицы поиска в памяти процесса.
+
+Источники (в порядке приоритета для дня):
+    1. ScheduleException бани на дату (особые часы или выходной)
+    2. ScheduleException для всех бань на дату
+    3. WorkingHours бани на день недели
+    4. WorkingHours для всех бань на день недели
+    5. OPEN_HOUR/CLOSE_HOUR из SystemConfig
+
+Все источники читаются одним проходом и сворачиваются в словари, так что
+окна работы дня находятся за O(1) без запросов к БД. Вместе с ними
+сохраняются SLOT_STEP_MINUTES и MIN_BOOKING_MINUTES. Таблица пересобирается
+только после изменения расписания или этих настроек (см. compiled_cache.py).
+"""
+import logging
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from .compiled_cache import CompiledCache
+from .config_init import get_config_int
+from .models import ScheduleException, WorkingHours
+
+logger = logging.getLogger(__name__)
+
+# Окна работы дня: отсортированные непересекающиеся пары минут от начала суток
+Windows = Tuple[Tuple[int, int], ...]
+
+CLOSED: Windows = ()
+
+
+def _minute_of_day(value) -> int:
+    return value.hour * 60 + value.minute
+
+
+def merge_windows(windows: Iterable[Tuple[int, int]]) -> Windows:
+    """Отсортировать и склеить пересекающиеся или соприкасающиеся окна работы."""
+    merged = []
+    for start, end in sorted(window for window in windows if window[0] < window[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+class CompiledSchedule:
+    """Скомпилированное расписание: окна работы любой бани на любую дату за O(1)"""
+
+    def __init__(self, default_windows: Windows, weekly: Dict[Tuple[Optional[int], int], Windows],
+                 exceptions: Dict[Tuple[Optional[int], date], Windows],
+                 slot_step_minutes: int, min_booking_minutes: int):
+        """
+        Args:
+            default_windows: Окна по умолчанию (из OPEN_HOUR/CLOSE_HOUR)
+            weekly: {(ID бани или None, день недели): окна}
+            exceptions: {(ID бани или None, дата): окна}, пустой кортеж - выходной
+            slot_step_minutes: Шаг между началами слотов
+            min_booking_minutes: Минимальная длительность бронирования
+        """
+        self.default_windows = default_windows
+        self.weekly = weekly
+        self.exceptions = exceptions
+        self.slot_step_minutes = slot_step_minutes
+        self.min_booking_minutes = min_booking_minutes
+
+    def day_windows(self, bathhouse_id: int, day: date) -> Windows:
+        """
+        Окна работы бани в указанный день.
+
+        Returns:
+            Кортеж пар минут (открытие, закрытие); пустой, если баня не работает
+        """
+        windows = self.exceptions.get((bathhouse_id, day))
+        if windows is None:
+            windows = self.exceptions.get((None, day))
+        if windows is None:
+            weekday = day.weekday()
+            windows = self.weekly.get((bathhouse_id, weekday))
+            if windows is None:
+                windows = self.weekly.get((None, weekday), self.default_windows)
+        return windows
+
+
+def compile_schedule() -> CompiledSchedule:
+    """
+    Прочитать расписание из БД и собрать таблицы поиска.
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    weekly_rows: Dict[Tuple[Optional[int], int], list] = {}
+    for bathhouse_id, weekday, open_time, close_time in WorkingHours.objects.values_list(  # type: ignore
+        'bathhouse_id', 'weekday', 'open_time', 'close_time'
+    ):
+        weekly_rows.setdefault((bathhouse_id, weekday), []).append(
+            (_minute_of_day(open_time), _minute_of_day(close_time))
+        )
+
+    exception_rows: Dict[Tuple[Optional[int], date], list] = {}
+    closed = set()
+    for bathhouse_id, day, is_closed, open_time, close_time in ScheduleException.objects.values_list(  # type: ignore
+        'bathhouse_id', 'date', 'is_closed', 'open_time', 'close_time'
+    ):
+        key = (bathhouse_id, day)
+        exception_rows.setdefault(key, [])
+        if is_closed:
+            closed.add(key)
+        elif open_time is not None and close_time is not None:
+            exception_rows[key].append((_minute_of_day(open_time), _minute_of_day(close_time)))
+
+    open_hour = get_config_int("OPEN_HOUR", 9)
+    close_hour = get_config_int("CLOSE_HOUR", 22)
+
+    compiled = CompiledSchedule(
+        default_windows=merge_windows([(open_hour * 60, close_hour * 60)]),
+        weekly={key: merge_windows(windows) for key, windows in weekly_rows.items()},
+        exceptions={
+            key: CLOSED if key in closed else merge_windows(windows)
+            for key, windows in exception_rows.items()
+        },
+        slot_step_minutes=get_config_int("SLOT_STEP_MINUTES", 30),
+        min_booking_minutes=get_config_int("MIN_BOOKING_MINUTES", 120),
+    )
+
+    logger.debug(
+        f"Schedule compiled: Weekly rules={len(compiled.weekly)}, Exceptions={len(compiled.exceptions)}"
+    )
+    return compiled
+
+
+schedule_cache: CompiledCache[CompiledSchedule] = CompiledCache(
+    compile_schedule, ttl_seconds=getattr(settings, "AVAILABILITY_CACHE_TTL_SECONDS", 60)
+)
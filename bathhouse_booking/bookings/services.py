@@ -1,38 +1,78 @@
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ValidationError
-from django.db import DatabaseError
-from .models import Booking, SystemConfig
+from django.db import DatabaseError, close_old_connections
+from .models import Bathhouse, Booking, Client, SystemConfig
 from django.utils import timezone
-from datetime import datetime, time, timedelta
-from typing import List, Tuple
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import calendar
+import heapq
+import itertools
 import logging
 import pytz
 from .config_init import get_config_int
+from .client_identity import client_identity_map
+from .idempotency import recent_booking_requests
+from .availability_cache import (
+    KIND_FREE_INTERVALS,
+    KIND_MONTH_SUMMARY,
+    KIND_SLOTS,
+    KIND_SLOTS_BY_DURATION,
+    availability_cache,
+)
+from . import occupancy
+from .day_context import DayContext
+from .holds import hold_deadline, save_if_slot_free
+from .transitions import bulk_transition, transition
+from .pricing import price_cache
+from .schedule import schedule_cache
 
 logger = logging.getLogger(__name__)
 
 # Часовой пояс бани (GMT+7)
 BATHHOUSE_TIMEZONE = pytz.timezone('Asia/Jakarta')  # GMT+7
 
-def check_booking_limit(client):
+def check_booking_limit(client, config=None):
     """
     Проверить лимит активных бронирований клиента.
     
+    Число активных бронирований читается из счетчика Client.active_bookings_count
+    (см. active_bookings.py), запросов к таблице бронирований нет.
+    
     Args:
         client: Клиент
+        config: Срез настроек ConfigSnapshot (по умолчанию читается из SystemConfig)
         
     Raises:
         ValidationError: Если превышен лимит активных бронирований
     """
-    from .config_init import get_config_int
+    if config is not None:
+        max_active_bookings = config.max_active_bookings
+    else:
+        from .config_init import get_config_int
+        max_active_bookings = get_config_int("MAX_ACTIVE_BOOKINGS_PER_CLIENT", 3)
     
-    max_active_bookings = get_config_int("MAX_ACTIVE_BOOKINGS_PER_CLIENT", 3)
+    # Активные бронирования клиента (approved, еще не закончившиеся)
+    _raise_if_limit_exceeded(client.active_bookings_count, max_active_bookings)
+
+
+async def acheck_booking_limit(client, config=None):
+    """
+    Асинхронная версия check_booking_limit (без перехода в поток).
     
-    # Считаем активные бронирования клиента (только approved)
-    active_bookings_count = Booking.objects.filter(  # type: ignore
-        client=client,
-        status='approved'
-    ).count()
+    Raises:
+        ValidationError: Если превышен лимит активных бронирований
+    """
+    if config is not None:
+        max_active_bookings = config.max_active_bookings
+    else:
+        from .config_init import get_config_int_async
+        max_active_bookings = await get_config_int_async("MAX_ACTIVE_BOOKINGS_PER_CLIENT", 3)
     
+    _raise_if_limit_exceeded(client.active_bookings_count, max_active_bookings)
+
+
+def _raise_if_limit_exceeded(active_bookings_count, max_active_bookings):
     if active_bookings_count >= max_active_bookings:
         raise ValidationError(
             f"У вас уже есть {active_bookings_count} подтвержденных бронирований. "
@@ -41,98 +81,185 @@ def check_booking_limit(client):
         )
 
 
-def create_booking_request(client, bathhouse, start, end, comment=None):
+def create_booking_request(client, bathhouse, start, end, comment=None, config=None, idempotency_key=None):
     """
     Создать запрос на бронирование.
     
+    Бронирование удерживает слот SLOT_HOLD_MINUTES минут (см. holds.py); если
+    время уже занято или удерживается другим бронированием, запрос отклоняется сразу.
+    Повторный запрос с тем же idempotency_key (см. idempotency.py) возвращает уже
+    созданное активное бронирование.
+    
     Args:
         client: Клиент
         bathhouse: Баня
         start: Начало бронирования
         end: Конец бронирования
         comment: Комментарий (опционально)
+        config: Срез настроек ConfigSnapshot (опционально)
+        idempotency_key: Ключ запроса booking_request_key(...) (опционально)
     
     Returns:
-        Созданное бронирование
+        Созданное бронирование (или созданное ранее по тому же ключу)
         
     Raises:
-        ValidationError: Если данные невалидны или превышен лимит бронирований
+        ValidationError: Если данные невалидны, время занято или превышен лимит бронирований
         DatabaseError: Если произошла ошибка базы данных
     """
     try:
-        # Проверяем лимит активных бронирований
-        check_booking_limit(client)
-        
-        # Рассчитываем стоимость бронирования
-        hourly_price = get_config_int("HOURLY_PRICE", 1000)  # дефолтная цена 1000
-        
-        # Защита от нулевой или отрицательной цены
-        if hourly_price <= 0:
-            logger.warning(f"Invalid hourly price: {hourly_price}, using default 1000")
-            hourly_price = 1000
+        if idempotency_key is not None:
+            booking = _recent_booking(idempotency_key)
+            if booking is not None:
+                logger.info(f"Repeated booking request: ID={booking.id}, Client={client.id}")
+                return booking
         
-        duration_hours = (end - start).total_seconds() / 3600
-        price_total = int(round(duration_hours * hourly_price))
-        
-        # Валидация: цена должна быть не менее hourly_price (цена за 1 час)
-        if price_total < hourly_price:
-            logger.warning(
-                f"Price too low: {price_total} руб. for "
-                f"duration {duration_hours}h, hourly price {hourly_price} руб."
-            )
-            price_total = hourly_price  # Минимальная цена - стоимость 1 часа
+        # Проверяем лимит активных бронирований
+        check_booking_limit(client, config)
         
-        # Логирование расчета цены для отладки
-        logger.info(
-            f"Price calculated: {price_total} руб. for "
-            f"{duration_hours:.1f}h at {hourly_price} руб./h"
+        booking = _new_booking_request(
+            client, bathhouse, start, end, comment, price_cache.get(), hold_deadline(config)
         )
+        return _save_booking_request(booking, idempotency_key)
         
-        booking = Booking(
-            client=client,
-            bathhouse=bathhouse,
-            start_datetime=start,
-            end_datetime=end,
-            status="pending",
-            price_total=price_total,
-            prepayment_amount=0,
-            comment=comment or ""
-        )
+    except Exception as e:
+        _log_booking_request_error(e, client, bathhouse)
+        raise
+
 
-        booking.full_clean()
-        booking.save()
+async def acreate_booking_request(client, bathhouse, start, end, comment=None, config=None, idempotency_key=None):
+    """
+    Асинхронная версия create_booking_request.
+    
+    Повтор по idempotency_key, лимит бронирований и цена проверяются без перехода
+    в поток (async ORM и таблицы в памяти); валидация и сохранение под блокировкой
+    бани выполняются в пуле потоков (см. _in_thread_pool).
+    
+    Raises:
+        ValidationError: Если данные невалидны, время занято или превышен лимит бронирований
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    try:
+        if idempotency_key is not None:
+            booking = await _arecent_booking(idempotency_key)
+            if booking is not None:
+                logger.info(f"Repeated booking request: ID={booking.id}, Client={client.id}")
+                return booking
         
-        logger.info(
-            f"Booking request created: ID={booking.id}, "
-            f"Client={client.id}, Bathhouse={bathhouse.id}, "
-            f"Start={start}, End={end}"
-        )
+        if config is None:
+            from .config_snapshot import get_config_snapshot_async
+            config = await get_config_snapshot_async()
+        await acheck_booking_limit(client, config)
         
-        return booking
+        booking = _new_booking_request(
+            client, bathhouse, start, end, comment, await price_cache.aget(), hold_deadline(config)
+        )
+        return await _in_thread_pool(_save_booking_request)(booking, idempotency_key)
         
-    except ValidationError as e:
+    except Exception as e:
+        _log_booking_request_error(e, client, bathhouse)
+        raise
+
+
+def _new_booking_request(client, bathhouse, start, end, comment, price_table, hold_expires_at) -> Booking:
+    """Несохраненное pending бронирование с рассчитанной стоимостью"""
+    # Рассчитываем стоимость бронирования по таблице цен
+    price_total = price_table.quote(bathhouse.id, start, end)
+    
+    # Логирование расчета цены для отладки
+    duration_hours = (end - start).total_seconds() / 3600
+    logger.info(
+        f"Price calculated: {price_total} руб. for "
+        f"{duration_hours:.1f}h, Bathhouse={bathhouse.id}"
+    )
+    
+    return Booking(
+        client=client,
+        bathhouse=bathhouse,
+        start_datetime=start,
+        end_datetime=end,
+        status="pending",
+        price_total=price_total,
+        prepayment_amount=0,
+        comment=comment or "",
+        hold_expires_at=hold_expires_at
+    )
+
+
+def _save_booking_request(booking, idempotency_key=None) -> Booking:
+    """Проверить и сохранить новое бронирование, если его время свободно"""
+    booking.full_clean()
+    try:
+        save_if_slot_free(booking)
+    except ValidationError:
+        # Параллельный повтор того же запроса успел создать бронирование и занять слот
+        if idempotency_key is not None:
+            existing = _recent_booking(idempotency_key)
+            if existing is not None:
+                logger.info(f"Repeated booking request: ID={existing.id}, Client={booking.client_id}")
+                return existing
+        raise
+    if idempotency_key is not None:
+        recent_booking_requests.set(idempotency_key, booking.id)
+    
+    logger.info(
+        f"Booking request created: ID={booking.id}, "
+        f"Client={booking.client_id}, Bathhouse={booking.bathhouse_id}, "
+        f"Start={booking.start_datetime}, End={booking.end_datetime}, Hold until={booking.hold_expires_at}"
+    )
+    return booking
+
+
+def _log_booking_request_error(error, client, bathhouse) -> None:
+    if isinstance(error, ValidationError):
         logger.warning(
-            f"Validation error creating booking: {e}, "
+            f"Validation error creating booking: {error}, "
             f"Client={client.id}, Bathhouse={bathhouse.id}"
         )
-        raise
-    except DatabaseError as e:
+    elif isinstance(error, DatabaseError):
         logger.error(
-            f"Database error creating booking: {e}, "
+            f"Database error creating booking: {error}, "
             f"Client={client.id}, Bathhouse={bathhouse.id}"
         )
-        raise
-    except Exception as e:
+    else:
         logger.error(
-            f"Unexpected error creating booking: {e}, "
+            f"Unexpected error creating booking: {error}, "
             f"Client={client.id}, Bathhouse={bathhouse.id}"
         )
-        raise
+
+def _recent_booking(idempotency_key) -> Optional[Booking]:
+    """Активное бронирование, недавно созданное по ключу запроса, или None"""
+    booking_id = recent_booking_requests.get(idempotency_key)
+    if booking_id is None:
+        return None
+    booking = Booking.objects.filter(  # type: ignore
+        pk=booking_id, status__in=['pending', 'payment_reported', 'approved']
+    ).first()
+    if booking is None:
+        # Бронирование отменили или отклонили: запрос создаст новое
+        recent_booking_requests.discard(idempotency_key)
+    return booking
+
+
+async def _arecent_booking(idempotency_key) -> Optional[Booking]:
+    """Асинхронная версия _recent_booking"""
+    booking_id = recent_booking_requests.get(idempotency_key)
+    if booking_id is None:
+        return None
+    booking = await Booking.objects.filter(  # type: ignore
+        pk=booking_id, status__in=['pending', 'payment_reported', 'approved']
+    ).afirst()
+    if booking is None:
+        recent_booking_requests.discard(idempotency_key)
+    return booking
 
 def report_payment(booking_id):
     """
     Отметить бронирование как оплаченное.
     
+    Оплаченное бронирование занимает слот до решения администратора. Если
+    удержание уже истекло и слот занял кто-то другой, оплата не принимается.
+    Повторное сообщение об оплате ничего не меняет.
+    
     Args:
         booking_id: ID бронирования
         
@@ -140,27 +267,11 @@ def report_payment(booking_id):
         None
         
     Raises:
-        ValidationError: Если бронирование не найдено или данные невалидны
+        ValidationError: Если бронирование не найдено, статус не pending или слот уже занят
         DatabaseError: Если произошла ошибка базы данных
     """
     try:
-        booking = Booking.objects.get(id=booking_id)  # type: ignore
-    except Booking.DoesNotExist:  # type: ignore
-        logger.warning(f"Booking not found for payment report: ID={booking_id}")
-        raise ValidationError(f"Бронирование с ID {booking_id} не найдено")
-
-    old_status = booking.status
-    booking.status = "payment_reported"
-    
-    try:
-        booking.full_clean()
-        booking.save()
-        
-        logger.info(
-            f"Payment reported: Booking ID={booking_id}, "
-            f"Old status={old_status}, New status={booking.status}"
-        )
-        
+        booking, old_status = transition(booking_id, "payment_reported")
     except ValidationError as e:
         logger.warning(f"Validation error reporting payment for booking {booking_id}: {e}")
         raise
@@ -168,6 +279,15 @@ def report_payment(booking_id):
         logger.error(f"Database error reporting payment for booking {booking_id}: {e}")
         raise
     
+    if old_status == booking.status:
+        logger.info(f"Payment already reported: Booking ID={booking_id}")
+        return
+    
+    logger.info(
+        f"Payment reported: Booking ID={booking_id}, "
+        f"Old status={old_status}, New status={booking.status}"
+    )
+    
     # Отправляем уведомление администратору (через очередь)
     try:
         from .notifications import queue_admin_payment_notification
@@ -187,27 +307,11 @@ def approve_booking(booking_id):
         None
         
     Raises:
-        ValidationError: Если бронирование не найдено, данные невалидны или есть пересечение
+        ValidationError: Если бронирование не найдено, статус не допускает подтверждения или есть пересечение
         DatabaseError: Если произошла ошибка базы данных
     """
     try:
-        booking = Booking.objects.get(id=booking_id)  # type: ignore
-    except Booking.DoesNotExist:  # type: ignore
-        logger.warning(f"Booking not found for approval: ID={booking_id}")
-        raise ValidationError(f"Бронирование с ID {booking_id} не найдено")
-
-    old_status = booking.status
-    booking.status = "approved"
-    
-    try:
-        booking.full_clean()
-        booking.save()
-        
-        logger.info(
-            f"Booking approved: ID={booking_id}, "
-            f"Old status={old_status}, New status={booking.status}"
-        )
-        
+        booking, old_status = transition(booking_id, "approved")
     except ValidationError as e:
         logger.warning(f"Validation error approving booking {booking_id}: {e}")
         raise
@@ -215,6 +319,15 @@ def approve_booking(booking_id):
         logger.error(f"Database error approving booking {booking_id}: {e}")
         raise
     
+    if old_status == booking.status:
+        logger.info(f"Booking already approved: ID={booking_id}")
+        return
+    
+    logger.info(
+        f"Booking approved: ID={booking_id}, "
+        f"Old status={old_status}, New status={booking.status}"
+    )
+    
     # Отправляем уведомление
     try:
         from .notifications import send_booking_status_notification
@@ -235,30 +348,13 @@ def reject_booking(booking_id, reason=None):
         None
         
     Raises:
-        ValidationError: Если бронирование не найдено или данные невалидны
+        ValidationError: Если бронирование не найдено или статус не допускает отклонения
         DatabaseError: Если произошла ошибка базы данных
     """
     try:
-        booking = Booking.objects.get(id=booking_id)  # type: ignore
-    except Booking.DoesNotExist:  # type: ignore
-        logger.warning(f"Booking not found for rejection: ID={booking_id}")
-        raise ValidationError(f"Бронирование с ID {booking_id} не найдено")
-
-    old_status = booking.status
-    booking.status = "rejected"
-    if reason:
-        booking.comment = f"{booking.comment}\nОтклонено: {reason}" if booking.comment else f"Отклонено: {reason}"
-    
-    try:
-        booking.full_clean()
-        booking.save()
-        
-        logger.info(
-            f"Booking rejected: ID={booking_id}, "
-            f"Old status={old_status}, New status={booking.status}, "
-            f"Reason={reason or 'not specified'}"
+        booking, old_status = transition(
+            booking_id, "rejected", note=f"Отклонено: {reason}" if reason else None
         )
-        
     except ValidationError as e:
         logger.warning(f"Validation error rejecting booking {booking_id}: {e}")
         raise
@@ -266,6 +362,16 @@ def reject_booking(booking_id, reason=None):
         logger.error(f"Database error rejecting booking {booking_id}: {e}")
         raise
     
+    if old_status == booking.status:
+        logger.info(f"Booking already rejected: ID={booking_id}")
+        return
+    
+    logger.info(
+        f"Booking rejected: ID={booking_id}, "
+        f"Old status={old_status}, New status={booking.status}, "
+        f"Reason={reason or 'not specified'}"
+    )
+    
     # Отправляем уведомление
     try:
         from .notifications import send_booking_status_notification
@@ -274,53 +380,103 @@ def reject_booking(booking_id, reason=None):
         logger.error(f"Failed to send rejection notification for booking {booking_id}: {e}")
 
 
-def cancel_booking(booking_id):
+def _bulk_transition_with_notifications(booking_ids, new_status, note=None):
+    """Перевести бронирования в новый статус и поставить уведомления клиентам одним INSERT"""
+    try:
+        changed, errors = bulk_transition(booking_ids, new_status, note=note)
+    except DatabaseError as e:
+        logger.error(f"Database error in bulk transition to {new_status}: {e}")
+        raise
+    
+    for booking_id, error in errors.items():
+        logger.warning(f"Validation error in bulk transition of booking {booking_id} to {new_status}: {error}")
+    
+    if changed:
+        logger.info(
+            f"Bookings {new_status}: IDs={[booking.id for booking, _ in changed]}"
+        )
+        from .notifications import queue_booking_status_notifications
+        queue_booking_status_notifications([booking for booking, _ in changed], new_status)
+    
+    return [booking for booking, _ in changed], errors
+
+
+def approve_bookings(booking_ids) -> Tuple[List[Booking], Dict[int, ValidationError]]:
     """
-    Отменить бронирование (клиентом).
+    Подтвердить несколько бронирований.
+    
+    Бронирования блокируются и обновляются одним запросом, пересечения (в том
+    числе между бронированиями пачки) проверяются одним запросом, уведомления
+    ставятся в очередь одним INSERT.
     
     Args:
-        booking_id: ID бронирования
+        booking_ids: ID бронирований
         
     Returns:
-        None
+        Кортеж (подтвержденные бронирования, словарь {ID бронирования: ошибка});
+        уже подтвержденные бронирования не попадают ни в один из них
         
     Raises:
-        ValidationError: Если бронирование не найдено, нельзя отменить или данные невалидны
         DatabaseError: Если произошла ошибка базы данных
     """
-    try:
-        booking = Booking.objects.get(id=booking_id)  # type: ignore
-    except Booking.DoesNotExist:  # type: ignore
-        logger.warning(f"Booking not found for cancellation: ID={booking_id}")
-        raise ValidationError(f"Бронирование с ID {booking_id} не найдено")
+    return _bulk_transition_with_notifications(booking_ids, "approved")
+
+
+def reject_bookings(booking_ids, reason=None) -> Tuple[List[Booking], Dict[int, ValidationError]]:
+    """
+    Отклонить несколько бронирований.
     
-    # Проверяем, можно ли отменить бронирование
-    if booking.status not in ['pending', 'payment_reported']:
-        logger.warning(
-            f"Cannot cancel booking {booking_id}: "
-            f"Invalid status {booking.status}"
-        )
-        raise ValidationError(f"Нельзя отменить бронирование со статусом {booking.status}")
+    Args:
+        booking_ids: ID бронирований
+        reason: Причина отклонения (опционально)
+        
+    Returns:
+        Кортеж (отклоненные бронирования, словарь {ID бронирования: ошибка});
+        уже отклоненные бронирования не попадают ни в один из них
+        
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    return _bulk_transition_with_notifications(
+        booking_ids, "rejected", note=f"Отклонено: {reason}" if reason else None
+    )
+
+
+def cancel_booking(booking_id):
+    """
+    Отменить бронирование (клиентом).
     
-    old_status = booking.status
-    booking.status = "cancelled"
+    Отменить можно только бронирование в статусе pending или payment_reported;
+    повторная отмена ничего не меняет.
     
-    try:
-        booking.full_clean()
-        booking.save()
+    Args:
+        booking_id: ID бронирования
         
-        logger.info(
-            f"Booking cancelled: ID={booking_id}, "
-            f"Old status={old_status}, New status={booking.status}"
-        )
+    Returns:
+        None
         
+    Raises:
+        ValidationError: Если бронирование не найдено или его нельзя отменить
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    try:
+        booking, old_status = transition(booking_id, "cancelled")
     except ValidationError as e:
-        logger.warning(f"Validation error cancelling booking {booking_id}: {e}")
+        logger.warning(f"Cannot cancel booking {booking_id}: {e}")
         raise
     except DatabaseError as e:
         logger.error(f"Database error cancelling booking {booking_id}: {e}")
         raise
     
+    if old_status == booking.status:
+        logger.info(f"Booking already cancelled: ID={booking_id}")
+        return
+    
+    logger.info(
+        f"Booking cancelled: ID={booking_id}, "
+        f"Old status={old_status}, New status={booking.status}"
+    )
+    
     # Отправляем уведомление
     try:
         from .notifications import send_booking_status_notification
@@ -329,13 +485,68 @@ def cancel_booking(booking_id):
         logger.error(f"Failed to send cancellation notification for booking {booking_id}: {e}")
 
 
-def get_available_slots(bathhouse, date) -> List[Tuple[datetime, datetime]]:
+
+def _in_thread_pool(func):
+    """
+    Обернуть синхронную функцию сервиса для вызова из асинхронного кода.
+    
+    Django пока не поддерживает транзакции в async ORM, поэтому переходы статусов
+    и сохранение под блокировкой остаются синхронными. В отличие от sync_to_async
+    по умолчанию, функция выполняется в пуле потоков, а не в единственном потоке
+    thread_sensitive: долгая транзакция одного пользователя не задерживает
+    остальных. Соединения с БД в потоках пула проверяются так же, как в начале и
+    конце запроса Django.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def areport_payment(booking_id):
+    """Асинхронная версия report_payment (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(report_payment)(booking_id)
+
+
+async def aapprove_booking(booking_id):
+    """Асинхронная версия approve_booking (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(approve_booking)(booking_id)
+
+
+async def areject_booking(booking_id, reason=None):
+    """Асинхронная версия reject_booking (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(reject_booking)(booking_id, reason)
+
+
+async def acancel_booking(booking_id):
+    """Асинхронная версия cancel_booking (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(cancel_booking)(booking_id)
+
+
+async def aget_available_slots_range(bathhouse, start_date, end_date) -> Dict[date_type, List[Tuple[datetime, datetime]]]:
+    """Асинхронная версия get_available_slots_range (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(get_available_slots_range)(bathhouse, start_date, end_date)
+
+
+async def afind_next_available(duration_minutes, **kwargs) -> List[Tuple[Bathhouse, datetime, datetime]]:
+    """Асинхронная версия find_next_available (выполняется в пуле потоков, см. _in_thread_pool)"""
+    return await _in_thread_pool(find_next_available)(duration_minutes, **kwargs)
+
+
+def get_available_slots(bathhouse, date, context=None) -> List[Tuple[datetime, datetime]]:
     """
     Получить доступные слоты для бронирования.
     
+    Занятость дня берется из одной строки DayOccupancy, без выборки бронирований.
+    Результат кэшируется в памяти процесса (см. availability_cache).
+    
     Args:
         bathhouse: Объект бани
         date: Дата для поиска слотов
+        context: Готовый DayContext дня (тогда запросов к БД нет)
         
     Returns:
         Список доступных слотов (начало, конец) в часовом поясе бани
@@ -343,61 +554,23 @@ def get_available_slots(bathhouse, date) -> List[Tuple[datetime, datetime]]:
     Raises:
         DatabaseError: Если произошла ошибка базы данных
     """
+    if context is not None:
+        return context.available_slots()
+    
+    cached = availability_cache.get(KIND_SLOTS, bathhouse.id, date)
+    if cached is not None:
+        return list(cached)
+    epoch = availability_cache.begin()
+    
     try:
-        # Получаем настройки из конфига
-        from .config_init import get_config_int
-        
-        open_hour = get_config_int("OPEN_HOUR", 9)
-        close_hour = get_config_int("CLOSE_HOUR", 22)
-        slot_step_minutes = get_config_int("SLOT_STEP_MINUTES", 30)
-        min_booking_minutes = get_config_int("MIN_BOOKING_MINUTES", 120)
-        
-        # Создаем datetime объекты в часовом поясе бани
-        start_of_day_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(0, 0)))
-        end_of_day_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(23, 59, 59)))
-        
-        # Конвертируем в UTC для сравнения с данными в базе
-        start_of_day_utc = start_of_day_local.astimezone(pytz.UTC)
-        end_of_day_utc = end_of_day_local.astimezone(pytz.UTC)
-        
-        approved_bookings = list(Booking.objects.filter(  # type: ignore
-            bathhouse=bathhouse,
-            status="approved",
-            start_datetime__lt=end_of_day_utc,
-            end_datetime__gt=start_of_day_utc
-        ))
-        
-        # Генерируем все возможные слоты в часовом поясе бани
-        slots = []
-        current_time_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(open_hour, 0)))
-        end_time_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(close_hour, 0)))
-        
-        while current_time_local < end_time_local:
-            slot_start_local = current_time_local
-            slot_end_local = slot_start_local + timedelta(minutes=min_booking_minutes)
-            
-            if slot_end_local <= end_time_local:
-                # Конвертируем в UTC для сравнения с бронированиями
-                slot_start_utc = slot_start_local.astimezone(pytz.UTC)
-                slot_end_utc = slot_end_local.astimezone(pytz.UTC)
-                
-                # Проверяем пересечение с approved бронированиями
-                overlaps = False
-                for booking in approved_bookings:
-                    if not (slot_end_utc <= booking.start_datetime or slot_start_utc >= booking.end_datetime):
-                        overlaps = True
-                        break
-                
-                if not overlaps:
-                    slots.append((slot_start_local, slot_end_local))
-            
-            current_time_local += timedelta(minutes=slot_step_minutes)
+        slots = DayContext.load(bathhouse, date).available_slots()
         
         logger.debug(
             f"Available slots found: Bathhouse={bathhouse.id}, "
             f"Date={date}, Slots count={len(slots)}"
         )
         
+        availability_cache.set(KIND_SLOTS, bathhouse.id, date, tuple(slots), epoch)
         return slots
         
     except DatabaseError as e:
@@ -408,75 +581,478 @@ def get_available_slots(bathhouse, date) -> List[Tuple[datetime, datetime]]:
         raise
 
 
-def get_free_intervals(bathhouse, date) -> List[Tuple[datetime, datetime]]:
+async def aget_available_slots(bathhouse, date) -> List[Tuple[datetime, datetime]]:
+    """
+    Асинхронная версия get_available_slots.
+    
+    При попадании в кэш доступности обращения к БД нет; при промахе занятость
+    дня читается через async ORM, без перехода в поток.
+    
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    cached = availability_cache.get(KIND_SLOTS, bathhouse.id, date)
+    if cached is not None:
+        return list(cached)
+    epoch = availability_cache.begin()
+    
+    try:
+        context = await DayContext.aload(bathhouse, date)
+    except DatabaseError as e:
+        logger.error(f"Database error getting available slots for bathhouse {bathhouse.id}: {e}")
+        raise
+    
+    slots = context.available_slots()
+    availability_cache.set(KIND_SLOTS, bathhouse.id, date, tuple(slots), epoch)
+    return slots
+
+
+def get_available_slots_by_duration(bathhouse, date, durations=None, context=None) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """
+    Получить доступные слоты сразу для нескольких длительностей.
+    
+    Свободные участки дня считаются один раз по битовой карте занятости (как
+    в get_free_intervals), после чего из них выводятся слоты каждой
+    длительности на общей сетке SLOT_STEP_MINUTES. Бронирования для каждой
+    длительности повторно не просматриваются.
+    
+    Args:
+        bathhouse: Объект бани
+        date: Дата для поиска слотов
+        durations: Длительности в минутах (по умолчанию DayContext.slot_durations)
+        context: Готовый DayContext дня (тогда запросов к БД нет)
+        
+    Returns:
+        Словарь {длительность: список слотов (начало, конец) в часовом поясе бани}
+        по возрастанию длительности; длительности без слотов не включаются
+        
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    use_cache = durations is None and context is None
+    if use_cache:
+        cached = _get_cached_slots_by_duration(bathhouse, date)
+        if cached is not None:
+            return cached
+    epoch = availability_cache.begin()
+    
+    if context is None:
+        try:
+            context = DayContext.load(bathhouse, date)
+        except DatabaseError as e:
+            logger.error(f"Database error getting slots by duration for bathhouse {bathhouse.id}: {e}")
+            raise
+    
+    slots_by_duration = context.available_slots_by_duration(durations)
+    
+    logger.debug(
+        f"Available slots by duration found: Bathhouse={bathhouse.id}, "
+        f"Date={date}, Durations={list(slots_by_duration)}"
+    )
+    
+    if use_cache:
+        _cache_slots_by_duration(bathhouse, date, slots_by_duration, epoch)
+    return slots_by_duration
+
+
+def _get_cached_slots_by_duration(bathhouse, date) -> Optional[Dict[int, List[Tuple[datetime, datetime]]]]:
+    cached = availability_cache.get(KIND_SLOTS_BY_DURATION, bathhouse.id, date)
+    if cached is None:
+        return None
+    return {duration: list(slots) for duration, slots in cached}
+
+
+def _cache_slots_by_duration(bathhouse, date, slots_by_duration, epoch) -> None:
+    availability_cache.set(
+        KIND_SLOTS_BY_DURATION, bathhouse.id, date,
+        tuple((duration, tuple(slots)) for duration, slots in slots_by_duration.items()), epoch
+    )
+
+
+async def aget_available_slots_by_duration(bathhouse, date) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """
+    Асинхронная версия get_available_slots_by_duration (длительности по умолчанию).
+    
+    При попадании в кэш доступности обращения к БД нет; при промахе занятость
+    дня читается через async ORM, без перехода в поток sync_to_async.
+    
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    cached = _get_cached_slots_by_duration(bathhouse, date)
+    if cached is not None:
+        return cached
+    epoch = availability_cache.begin()
+    
+    try:
+        context = await DayContext.aload(bathhouse, date)
+    except DatabaseError as e:
+        logger.error(f"Database error getting slots by duration for bathhouse {bathhouse.id}: {e}")
+        raise
+    
+    slots_by_duration = context.available_slots_by_duration()
+    _cache_slots_by_duration(bathhouse, date, slots_by_duration, epoch)
+    return slots_by_duration
+
+
+def get_slot_prices(bathhouse, date, slots_by_duration) -> Dict[int, List[int]]:
+    """
+    Рассчитать стоимость слотов дня для всех длительностей.
+    
+    Все слоты оцениваются по одному массиву префиксных сумм из таблицы цен,
+    без запросов к БД (кроме первой компиляции таблицы).
+    
+    Args:
+        bathhouse: Объект бани
+        date: Дата слотов
+        slots_by_duration: Результат get_available_slots_by_duration
+        
+    Returns:
+        Словарь {длительность: список стоимостей в порядке слотов}
+    """
+    price_table = price_cache.get()
+    return {
+        duration: price_table.quote_day(bathhouse.id, date, slots)
+        for duration, slots in slots_by_duration.items()
+    }
+
+
+async def aget_slot_prices(bathhouse, date, slots_by_duration) -> Dict[int, List[int]]:
+    """Асинхронная версия get_slot_prices"""
+    price_table = await price_cache.aget()
+    return {
+        duration: price_table.quote_day(bathhouse.id, date, slots)
+        for duration, slots in slots_by_duration.items()
+    }
+
+
+async def aget_active_bathhouses() -> List[Bathhouse]:
+    """Активные бани (через async ORM)"""
+    return [bathhouse async for bathhouse in Bathhouse.objects.filter(is_active=True)]  # type: ignore
+
+
+async def aget_client(telegram_id) -> Optional[Client]:
+    """
+    Клиент по Telegram ID или None (через async ORM, одним запросом).
+
+    Если Telegram ID уже встречался в этом процессе, клиент загружается по
+    первичному ключу из карты идентичности (см. client_identity.py).
+    """
+    telegram_id = str(telegram_id)
+    client_id = client_identity_map.get(telegram_id)
+    if client_id is not None:
+        client = await Client.objects.filter(pk=client_id).afirst()  # type: ignore
+        if client is not None and client.telegram_id == telegram_id:
+            return client
+        # Клиента удалили или сменили ему Telegram ID в админке
+        client_identity_map.discard(telegram_id)
+
+    client = await Client.objects.filter(telegram_id=telegram_id).afirst()  # type: ignore
+    if client is not None:
+        client_identity_map.set(telegram_id, client.pk)
+    return client
+
+
+async def aget_or_create_client(telegram_id, name, phone="") -> Tuple[Client, bool]:
+    """
+    Найти клиента по Telegram ID или создать нового.
+
+    Args:
+        telegram_id: Telegram ID пользователя
+        name: Имя для нового клиента
+        phone: Телефон для нового клиента (опционально)
+
+    Returns:
+        Кортеж (клиент, создан ли он)
+    """
+    client = await aget_client(telegram_id)
+    if client is not None:
+        return client, False
+
+    # Уникальный telegram_id: при параллельном создании get_or_create вернет уже созданного клиента
+    client, created = await Client.objects.aget_or_create(  # type: ignore
+        telegram_id=str(telegram_id),
+        defaults={'name': name, 'phone': phone}
+    )
+    client_identity_map.set(str(telegram_id), client.pk)
+    return client, created
+
+
+def iter_available_slots_range(bathhouse, start_date, end_date) -> Iterator[Tuple[date_type, List[Tuple[datetime, datetime]]]]:
+    """
+    Последовательно выдать доступные слоты по дням диапазона.
+    
+    Настройки читаются один раз, занятость за весь диапазон загружается
+    одним запросом к DayOccupancy.
+    
+    Args:
+        bathhouse: Объект бани
+        start_date: Первая дата диапазона
+        end_date: Последняя дата диапазона (включительно)
+        
+    Yields:
+        Пары (дата, список слотов) в порядке возрастания даты
+        
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    if end_date < start_date:
+        return
+    
+    try:
+        contexts = DayContext.load_range(bathhouse, start_date, end_date)
+    except DatabaseError as e:
+        logger.error(f"Database error getting available slots range for bathhouse {bathhouse.id}: {e}")
+        raise
+    
+    for current_date, context in contexts.items():
+        yield current_date, context.available_slots()
+
+
+def get_available_slots_range(bathhouse, start_date, end_date) -> Dict[date_type, List[Tuple[datetime, datetime]]]:
+    """
+    Получить доступные слоты для диапазона дат одним запросом к занятости.
+    
+    Args:
+        bathhouse: Объект бани
+        start_date: Первая дата диапазона
+        end_date: Последняя дата диапазона (включительно)
+        
+    Returns:
+        Словарь {дата: список слотов (начало, конец) в часовом поясе бани}
+        
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    slots_by_date = dict(iter_available_slots_range(bathhouse, start_date, end_date))
+    
+    logger.debug(
+        f"Available slots range found: Bathhouse={bathhouse.id}, "
+        f"Dates={start_date}..{end_date}, Days={len(slots_by_date)}"
+    )
+    
+    return slots_by_date
+
+
+def get_month_availability(bathhouse, year, month) -> Dict[date_type, int]:
+    """
+    Получить количество свободных слотов по каждому дню месяца.
+    
+    Занятость за месяц загружается одним запросом к DayOccupancy, полностью
+    свободные дни считаются один раз. Сводка кэшируется в памяти процесса и
+    сбрасывается при изменении бронирований любого дня месяца.
+    
+    Args:
+        bathhouse: Объект бани
+        year: Год
+        month: Месяц (1-12)
+        
+    Returns:
+        Словарь {дата: количество свободных слотов} для всех дней месяца
+        
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    first_day = date_type(year, month, 1)
+    cached = availability_cache.get(KIND_MONTH_SUMMARY, bathhouse.id, first_day)
+    if cached is not None:
+        return dict(cached)
+    epoch = availability_cache.begin()
+    
+    last_day = first_day.replace(day=calendar.monthrange(year, month)[1])
+    
+    try:
+        contexts = DayContext.load_range(bathhouse, first_day, last_day)
+    except DatabaseError as e:
+        logger.error(f"Database error getting month availability for bathhouse {bathhouse.id}: {e}")
+        raise
+    
+    # Свободные дни с одинаковыми часами работы совпадают, их слоты считаются один раз
+    free_day_counts = {}
+    counts = {}
+    for current_date, context in contexts.items():
+        if context.bits:
+            counts[current_date] = len(context.available_slots())
+        else:
+            if context.windows not in free_day_counts:
+                free_day_counts[context.windows] = len(context.available_slots())
+            counts[current_date] = free_day_counts[context.windows]
+    
+    logger.debug(
+        f"Month availability calculated: Bathhouse={bathhouse.id}, "
+        f"Month={year}-{month:02d}, Full days={sum(1 for count in counts.values() if not count)}"
+    )
+    
+    availability_cache.set(KIND_MONTH_SUMMARY, bathhouse.id, first_day, tuple(counts.items()), epoch)
+    return counts
+
+
+def _iter_bathhouse_slots(bathhouse, bits_by_key, start_date, end_date, after, schedule,
+                          duration_minutes) -> Iterator[Tuple[datetime, datetime]]:
+    """Лениво выдать свободные слоты бани по возрастанию начала, начиная с момента after."""
+    current_date = start_date
+    while current_date <= end_date:
+        context = DayContext.from_schedule(
+            schedule, bathhouse.id, current_date, bits_by_key.get((bathhouse.id, current_date), 0)
+        )
+        for slot_start, slot_end in context.available_slots(duration_minutes):
+            if slot_start >= after:
+                yield slot_start, slot_end
+        current_date += timedelta(days=1)
+
+
+def find_next_available(duration_minutes, after=None, bathhouse_ids=None, horizon_days=30, limit=5) -> List[Tuple[Bathhouse, datetime, datetime]]:
+    """
+    Найти ближайшие свободные слоты по всем активным баням.
+    
+    Занятость всех бань за горизонт поиска загружается одним запросом к
+    DayOccupancy. Слоты каждой бани выдаются ленивым потоком по возрастанию
+    времени, потоки сливаются по началу слота, поэтому просматриваются только
+    дни до первого найденного набора слотов.
+    
+    Args:
+        duration_minutes: Длительность слота в минутах
+        after: Момент, не раньше которого должен начинаться слот (по умолчанию сейчас)
+        bathhouse_ids: ID бань для поиска (по умолчанию все активные)
+        horizon_days: Количество дней поиска, начиная с даты after
+        limit: Максимальное количество слотов
+        
+    Returns:
+        Список (баня, начало, конец) в часовом поясе бани, отсортированный по началу
+        
+    Raises:
+        ValidationError: Если длительность не положительна
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    if duration_minutes <= 0:
+        raise ValidationError("Длительность бронирования должна быть положительной")
+    
+    after = after or timezone.now()
+    start_date = after.astimezone(BATHHOUSE_TIMEZONE).date()
+    end_date = start_date + timedelta(days=max(horizon_days, 1) - 1)
+    
+    try:
+        bathhouses = Bathhouse.objects.filter(is_active=True).order_by('id')  # type: ignore
+        if bathhouse_ids is not None:
+            bathhouses = bathhouses.filter(id__in=list(bathhouse_ids))
+        bathhouses = list(bathhouses)
+        if not bathhouses:
+            return []
+        
+        schedule = schedule_cache.get()
+        
+        bits_by_key = occupancy.get_window_bits(
+            [bathhouse.id for bathhouse in bathhouses], start_date, end_date
+        )
+    except DatabaseError as e:
+        logger.error(f"Database error searching next available slots: {e}")
+        raise
+    
+    streams = [
+        ((slot_start, bathhouse.id, bathhouse, slot_end) for slot_start, slot_end in _iter_bathhouse_slots(
+            bathhouse, bits_by_key, start_date, end_date, after, schedule, duration_minutes
+        ))
+        for bathhouse in bathhouses
+    ]
+    merged = heapq.merge(*streams, key=lambda item: (item[0], item[1]))
+    
+    result = [
+        (bathhouse, slot_start, slot_end)
+        for slot_start, _, bathhouse, slot_end in itertools.islice(merged, limit)
+    ]
+    
+    logger.debug(
+        f"Next available slots found: Duration={duration_minutes}, After={after}, "
+        f"Bathhouses={len(bathhouses)}, Slots count={len(result)}"
+    )
+    
+    return result
+
+
+def get_free_intervals(bathhouse, date, context=None) -> List[Tuple[datetime, datetime]]:
     """
     Calculate free intervals based on approved bookings and working hours.
     
     Args:
         bathhouse: Bathhouse object
         date: Date object
+        context: Prepared DayContext for the day (no DB queries then)
     
     Returns:
         List of (start_datetime, end_datetime) tuples for free intervals (in bathhouse timezone)
     """
-    # Получаем настройки из конфига
-    from .config_init import get_config_int
+    if context is not None:
+        return context.free_intervals()
     
-    open_hour = get_config_int("OPEN_HOUR", 9)
-    close_hour = get_config_int("CLOSE_HOUR", 22)
+    cached = availability_cache.get(KIND_FREE_INTERVALS, bathhouse.id, date)
+    if cached is not None:
+        return list(cached)
+    epoch = availability_cache.begin()
     
-    # Создаем datetime объекты в часовом поясе бани
-    start_of_day_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(0, 0)))
-    end_of_day_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(23, 59, 59)))
+    free_intervals = DayContext.load(bathhouse, date).free_intervals()
     
-    # Конвертируем в UTC для сравнения с данными в базе
-    start_of_day_utc = start_of_day_local.astimezone(pytz.UTC)
-    end_of_day_utc = end_of_day_local.astimezone(pytz.UTC)
+    availability_cache.set(KIND_FREE_INTERVALS, bathhouse.id, date, tuple(free_intervals), epoch)
+    return free_intervals
+
+
+def get_day_schedule_for_bathhouses(bathhouse_ids, date) -> str:
+    """
+    Сформировать текст расписания свободных окон для нескольких бань на дату.
     
-    approved_bookings = list(Booking.objects.filter(  # type: ignore
-        bathhouse=bathhouse,
-        status="approved",
-        start_datetime__lt=end_of_day_utc,
-        end_datetime__gt=start_of_day_utc
-    ))
+    Бани и их занятость за день загружаются двумя запросами, после чего
+    свободные интервалы всех бань считаются за один проход. Если расчет для
+    одной бани завершился ошибкой, в ее строке выводится "Ошибка получения данных".
     
-    if not approved_bookings:
-        # Whole day is free
-        workday_start = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(open_hour, 0)))
-        workday_end = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(close_hour, 0)))
-        return [(workday_start, workday_end)]
+    Args:
+        bathhouse_ids: ID бань в порядке отображения
+        date: Дата расписания
+        
+    Returns:
+        Текст расписания в Markdown (пустая строка, если ни одна баня не найдена)
+    """
+    bathhouses_by_id = Bathhouse.objects.in_bulk(bathhouse_ids)  # type: ignore
+    bathhouses = []
+    for bathhouse_id in bathhouse_ids:
+        bathhouse = bathhouses_by_id.get(bathhouse_id)
+        if bathhouse is None:
+            logger.warning(f"Bathhouse with id {bathhouse_id} not found")
+            continue
+        bathhouses.append(bathhouse)
     
-    # Sort bookings by start time
-    sorted_bookings = sorted(approved_bookings, key=lambda x: x.start_datetime)
+    if not bathhouses:
+        return ""
     
-    # Create workday boundaries in bathhouse timezone
-    workday_start = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(open_hour, 0)))
-    workday_end = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(close_hour, 0)))
+    schedule = schedule_cache.get()
+    bits_by_bathhouse = occupancy.get_bathhouses_day_bits([bathhouse.id for bathhouse in bathhouses], date)
     
-    free_intervals = []
-    current_start = workday_start
+    schedule_text = f"📅 *Расписание свободных окон на {date.strftime('%d.%m.%Y')}*\n\n"
     
-    for booking in sorted_bookings:
-        # Конвертируем время бронирования в часовой пояс бани для сравнения
-        booking_start_local = booking.start_datetime.astimezone(BATHHOUSE_TIMEZONE)
-        booking_end_local = booking.end_datetime.astimezone(BATHHOUSE_TIMEZONE)
+    for bathhouse in bathhouses:
+        schedule_text += f"*{bathhouse.name}:*\n"
         
-        # If there's a gap before this booking, it's free
-        if current_start < booking_start_local:
-            free_intervals.append((current_start, booking_start_local))
+        # Ошибка по одной бане не должна ломать расписание остальных
+        try:
+            context = DayContext.from_schedule(schedule, bathhouse.id, date, bits_by_bathhouse.get(bathhouse.id, 0))
+            if context.is_closed:
+                schedule_text += "  Не работает\n\n"
+                continue
+            
+            free_intervals = context.free_intervals()
+            
+            # Объединяем смежные интервалы (с допуском 30 минут)
+            formatted_intervals = format_free_intervals(merge_adjacent_intervals(free_intervals, gap_minutes=30))
+            
+            if formatted_intervals:
+                schedule_text += f"  Свободно: {formatted_intervals}\n"
+            else:
+                schedule_text += "  Нет свободного времени\n"
+        except Exception as e:
+            logger.error(f"Error getting free intervals for {bathhouse.name} on {date}: {e}")
+            schedule_text += "  Ошибка получения данных\n"
         
-        # Move current_start to the end of this booking
-        if current_start < booking_end_local:
-            current_start = booking_end_local
-    
-    # Check for free time after last booking
-    if current_start < workday_end:
-        free_intervals.append((current_start, workday_end))
+        schedule_text += "\n"
     
-    # Filter out zero-length intervals
-    free_intervals = [(start, end) for start, end in free_intervals if start < end]
-    
-    return free_intervals
+    return schedule_text
 
 
 def merge_adjacent_intervals(intervals, gap_minutes=0) -> List[Tuple[datetime, datetime]]:
@@ -0,0 +1,77 @@
+"""
+Сигналы моделей бронирования.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .active_bookings import sync_active_count
+from .availability_cache import SLOT_CONFIG_KEYS, availability_cache
+from .config_init import config_cache
+from .config_version import bump_version
+from .models import Booking, PriceRule, ScheduleException, SystemConfig, WorkingHours
+from .occupancy import invalidate_availability, sync_booking_occupancy
+from .pricing import price_cache
+from .schedule import schedule_cache
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    """Обновить счетчик активных бронирований клиента и занятость дней при изменении бронирования"""
+    sync_active_count(instance)
+    invalidate_availability(sync_booking_occupancy(instance))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """Освободить дни удаленного бронирования и уменьшить счетчик активных бронирований клиента"""
+    sync_active_count(instance, deleted=True)
+    invalidate_availability(sync_booking_occupancy(instance, deleted=True))
+
+
+@receiver(post_save, sender=SystemConfig)
+@receiver(post_delete, sender=SystemConfig)
+def system_config_changed(sender, instance, **kwargs):
+    """Сбросить кэш настроек и зависящие от них таблицы (в том числе в других процессах)"""
+    bump_version()
+    config_cache.invalidate()
+    transaction.on_commit(config_cache.invalidate)
+
+    if instance.key in SLOT_CONFIG_KEYS:
+        _invalidate_schedule()
+    elif instance.key == "HOURLY_PRICE":
+        _invalidate_prices()
+
+
+def _invalidate_schedule():
+    """Пересобрать расписание и сбросить кэш доступности сразу и повторно после коммита"""
+    def invalidate():
+        schedule_cache.invalidate()
+        availability_cache.bump_config_version()
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+@receiver(post_save, sender=ScheduleException)
+@receiver(post_delete, sender=ScheduleException)
+def schedule_changed(sender, instance, **kwargs):
+    """Пересобрать расписание при изменении часов работы или исключений"""
+    bump_version()
+    _invalidate_schedule()
+
+
+def _invalidate_prices():
+    """Пересобрать таблицу цен сразу и повторно после коммита"""
+    price_cache.invalidate()
+    transaction.on_commit(price_cache.invalidate)
+
+
+@receiver(post_save, sender=PriceRule)
+@receiver(post_delete, sender=PriceRule)
+def price_rule_changed(sender, instance, **kwargs):
+    """Пересобрать таблицу цен при изменении правил"""
+    bump_version()
+    _invalidate_prices()
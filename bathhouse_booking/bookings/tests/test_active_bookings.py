@@ -0,0 +1,112 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+import pytz
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.active_bookings import recount_active_bookings
+from bathhouse_booking.bookings.admin import ClientAdmin
+from bathhouse_booking.bookings.config_snapshot import ConfigSnapshot
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class ActiveBookingCounterTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.day = timezone.now().date() + timedelta(days=2)
+
+    def _booking(self, hour, status="pending"):
+        start = TZ.localize(datetime.combine(self.day, time(hour, 0)))
+        return Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            status=status
+        )
+
+    def _stored_count(self):
+        return Client.objects.values_list('active_bookings_count', flat=True).get(pk=self.client_obj.pk)  # type: ignore
+
+    def test_counter_follows_transitions(self):
+        first = self._booking(10)
+        second = self._booking(14)
+
+        services.approve_booking(first.id)
+        services.approve_bookings([second.id])
+        self.assertEqual(self._stored_count(), 2)
+
+        services.reject_booking(first.id)
+        self.assertEqual(self._stored_count(), 1)
+
+        Booking.objects.get(pk=second.pk).delete()  # type: ignore
+        self.assertEqual(self._stored_count(), 0)
+        self.assertEqual(recount_active_bookings(), [])
+
+    def test_saved_booking_updates_loaded_client(self):
+        booking = self._booking(10, status="approved")
+        self.assertEqual(self.client_obj.active_bookings_count, 1)
+
+        booking.status = "cancelled"
+        booking.save()
+        self.assertEqual(self.client_obj.active_bookings_count, 0)
+        self.assertEqual(self._stored_count(), 0)
+
+    def test_limit_check_reads_loaded_client(self):
+        snapshot = ConfigSnapshot.from_values({"MAX_ACTIVE_BOOKINGS_PER_CLIENT": "1"})
+        self._booking(10, status="approved")
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(ValidationError):
+                services.check_booking_limit(self.client_obj, snapshot)
+
+    def test_admin_client_change_keeps_counter(self):
+        stale = Client.objects.get(pk=self.client_obj.pk)  # type: ignore
+        self._booking(10, status="approved")
+
+        client_admin = ClientAdmin(Client, AdminSite())
+        request = RequestFactory().post('/admin/')
+        request.user = User(is_superuser=True)
+        form = client_admin.get_form(request, stale)(
+            {"name": stale.name, "phone": "+79990000000", "telegram_id": stale.telegram_id, "comment": ""},
+            instance=stale
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        client_admin.save_model(request, form.save(commit=False), form, change=True)
+
+        self.assertIn("active_bookings_count", client_admin.get_readonly_fields(request, stale))
+        self.assertEqual(Client.objects.get(pk=stale.pk).phone, "+79990000000")  # type: ignore
+        self.assertEqual(self._stored_count(), 1)
+
+    def test_recount_expires_finished_bookings(self):
+        booking = self._booking(10, status="approved")
+
+        after_end = booking.end_datetime + timedelta(minutes=1)
+        self.assertEqual(recount_active_bookings(now=after_end, dry_run=True), [(self.client_obj.pk, 1, 0)])
+        self.assertEqual(self._stored_count(), 1)
+
+        recount_active_bookings(now=after_end)
+        self.assertEqual(self._stored_count(), 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        self._booking(10, status="approved")
+        Client.objects.update(active_bookings_count=5)  # type: ignore
+
+        with self.assertRaises(CommandError):
+            call_command("reconcile_active_bookings", "--check", stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command("reconcile_active_bookings", stdout=out, stderr=StringIO())
+        self.assertIn("Исправлено счетчиков: 1", out.getvalue())
+        self.assertEqual(self._stored_count(), 1)
+        call_command("reconcile_active_bookings", "--check", stdout=StringIO(), stderr=StringIO())
@@ -1,5 +1,5 @@
 from django.test import TestCase
-from bathhouse_booking.bookings.models import Client, Bathhouse, Booking, SystemConfig
+from bathhouse_booking.bookings.models import Client, Bathhouse, Booking, NotificationQueue, SystemConfig
 from django.utils import timezone
 
 
@@ -100,4 +100,69 @@ class TestBookingAdminActions(TestCase):
             services.approve_booking(overlapping_booking.id)
         
         overlapping_booking.refresh_from_db()
-        self.assertEqual(overlapping_booking.status, "payment_reported")
\ No newline at end of file
+        self.assertEqual(overlapping_booking.status, "payment_reported")
+
+class TestBulkAdminActions(TestCase):
+    """Массовые действия админки выполняются одним набором запросов"""
+    
+    def setUp(self):
+        from django.contrib.admin.sites import AdminSite
+        from django.contrib.auth.models import User
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.test import RequestFactory
+        from bathhouse_booking.bookings.admin import BookingAdmin
+        
+        client = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        start = timezone.now() + timezone.timedelta(days=1)
+        self.bookings = [
+            Booking.objects.create(  # type: ignore
+                client=client,
+                bathhouse=bathhouse,
+                start_datetime=start + timezone.timedelta(hours=2 * i),
+                end_datetime=start + timezone.timedelta(hours=2 * i + 2),
+                status="payment_reported"
+            )
+            for i in range(3)
+        ]
+        self.admin = BookingAdmin(Booking, AdminSite())
+        self.request = RequestFactory().post('/admin/')
+        self.request.user = User(is_superuser=True)
+        self.request.session = {}
+        self.request._messages = FallbackStorage(self.request)
+    
+    def _messages(self):
+        return [str(message) for message in self.request._messages]
+    
+    def test_approve_action(self):
+        self.admin.approve(self.request, Booking.objects.all())  # type: ignore
+        
+        self.assertEqual(
+            set(Booking.objects.values_list('status', flat=True)), {"approved"}  # type: ignore
+        )
+        self.assertIn("Подтверждено бронирований: 3", self._messages())
+    
+    def test_reject_action_reports_errors(self):
+        Booking.objects.filter(pk=self.bookings[0].pk).update(status="cancelled")  # type: ignore
+        
+        self.admin.reject(self.request, Booking.objects.all())  # type: ignore
+        
+        self.assertEqual(NotificationQueue.objects.filter(status="rejected").count(), 2)  # type: ignore
+        messages = self._messages()
+        self.assertIn(
+            f"Ошибка при отклонении бронирования {self.bookings[0].pk}: "
+            "Нельзя отклонить бронирование со статусом cancelled",
+            messages
+        )
+        self.assertIn("Отклонено бронирований: 2", messages)
+    
+    def test_already_approved_bookings_are_reported_as_skipped(self):
+        Booking.objects.filter(pk=self.bookings[0].pk).update(status="approved")  # type: ignore
+        
+        self.admin.approve(self.request, Booking.objects.all())  # type: ignore
+        
+        messages = self._messages()
+        self.assertIn("Подтверждено бронирований: 2", messages)
+        self.assertIn(
+            f"Пропущено бронирований (уже в этом статусе): 1 (ID: {self.bookings[0].pk})", messages
+        )
@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+import pytz
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.config_init import get_config_int_async
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client, SystemConfig
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class AsyncReadPathTests(TestCase):
+    def setUp(self):
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        Bathhouse.objects.create(name="Закрытая баня", is_active=False)  # type: ignore
+        self.client_obj = Client.objects.create(telegram_id="100", name="Клиент")  # type: ignore
+        self.day = (datetime.now(TZ) + timedelta(days=3)).date()
+
+    def test_slots_by_duration_match_sync_version_and_are_cached(self):
+        # После первого расчета (и компиляции таблицы цен) повторные чтения идут без запросов
+        start = TZ.localize(datetime.combine(self.day, time(12, 0)))
+        Booking.objects.create(  # type: ignore
+            client=self.client_obj, bathhouse=self.bathhouse,
+            start_datetime=start, end_datetime=start + timedelta(hours=2), status="approved"
+        )
+
+        slots_by_duration = async_to_sync(services.aget_available_slots_by_duration)(self.bathhouse, self.day)
+        self.assertEqual(slots_by_duration, services.get_available_slots_by_duration(self.bathhouse, self.day))
+        services.get_slot_prices(self.bathhouse, self.day, slots_by_duration)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                async_to_sync(services.aget_available_slots_by_duration)(self.bathhouse, self.day),
+                slots_by_duration
+            )
+            prices = async_to_sync(services.aget_slot_prices)(self.bathhouse, self.day, slots_by_duration)
+        self.assertEqual(set(prices), set(slots_by_duration))
+
+    def test_cached_config_read_without_queries(self):
+        SystemConfig.objects.create(key="OPEN_HOUR", value="10")  # type: ignore
+        self.assertEqual(async_to_sync(get_config_int_async)("OPEN_HOUR", 9), 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(get_config_int_async)("OPEN_HOUR", 9), 10)
+
+    def test_client_bathhouses_and_booking_limit(self):
+        self.assertEqual(async_to_sync(services.aget_active_bathhouses)(), [self.bathhouse])
+        self.assertEqual(async_to_sync(services.aget_client)(100), self.client_obj)
+        self.assertIsNone(async_to_sync(services.aget_client)("404"))
+
+        SystemConfig.objects.create(key="MAX_ACTIVE_BOOKINGS_PER_CLIENT", value="1")  # type: ignore
+        async_to_sync(services.acheck_booking_limit)(self.client_obj)
+        start = TZ.localize(datetime.combine(self.day, time(10, 0)))
+        Booking.objects.create(  # type: ignore
+            client=self.client_obj, bathhouse=self.bathhouse,
+            start_datetime=start, end_datetime=start + timedelta(hours=2), status="approved"
+        )
+        with self.assertRaises(ValidationError):
+            async_to_sync(services.acheck_booking_limit)(self.client_obj)
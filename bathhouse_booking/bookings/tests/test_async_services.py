@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import threading
+from datetime import datetime, time, timedelta
+
+import pytz
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.idempotency import booking_request_key
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+# Синхронные части выполняются в потоках пула со своими соединениями с БД,
+# поэтому данные теста должны быть закоммичены (TransactionTestCase)
+class AsyncBookingLifecycleTests(TransactionTestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.day = timezone.now().date() + timedelta(days=2)
+        self.start = TZ.localize(datetime.combine(self.day, time(12, 0)))
+        self.end = self.start + timedelta(hours=2)
+
+    def _status(self, booking):
+        return Booking.objects.values_list('status', flat=True).get(pk=booking.pk)  # type: ignore
+
+    def test_lifecycle(self):
+        key = booking_request_key("1", self.bathhouse.id, self.start, self.end)
+        booking = async_to_sync(services.acreate_booking_request)(
+            self.client_obj, self.bathhouse, self.start, self.end, idempotency_key=key
+        )
+        self.assertEqual(self._status(booking), "pending")
+        self.assertEqual(
+            async_to_sync(services.acreate_booking_request)(
+                self.client_obj, self.bathhouse, self.start, self.end, idempotency_key=key
+            ),
+            booking
+        )
+        self.assertNotIn((self.start, self.end), async_to_sync(services.aget_available_slots)(self.bathhouse, self.day))
+
+        async_to_sync(services.areport_payment)(booking.id)
+        self.assertEqual(self._status(booking), "payment_reported")
+        async_to_sync(services.aapprove_booking)(booking.id)
+        self.assertEqual(self._status(booking), "approved")
+        async_to_sync(services.areject_booking)(booking.id, "Нет мест")
+        self.assertEqual(self._status(booking), "rejected")
+
+        other = async_to_sync(services.acreate_booking_request)(self.client_obj, self.bathhouse, self.start, self.end)
+        async_to_sync(services.acancel_booking)(other.id)
+        self.assertEqual(self._status(other), "cancelled")
+
+    def test_available_slots_match_sync_version(self):
+        slots = async_to_sync(services.aget_available_slots)(self.bathhouse, self.day)
+        self.assertEqual(slots, services.get_available_slots(self.bathhouse, self.day))
+        with self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(services.aget_available_slots)(self.bathhouse, self.day), slots)
+
+
+def test_thread_pool_calls_run_concurrently():
+    # Оба вызова должны дождаться друг друга у барьера; в одном потоке барьер не откроется
+    barrier = threading.Barrier(2, timeout=5)
+
+    async def both():
+        call = services._in_thread_pool(barrier.wait)
+        await asyncio.gather(call(), call())
+
+    asyncio.run(both())
+
+
+def test_dispatcher_exposes_async_services():
+    from aiogram import Dispatcher
+    from bathhouse_booking.bot.dependencies import get_services, setup_dependencies
+
+    dp = Dispatcher()
+    asyncio.run(setup_dependencies(dp))
+
+    dp_services = get_services(dp)
+    assert dp_services["create_booking_request"] is services.acreate_booking_request
+    assert all(inspect.iscoroutinefunction(func) for func in dp_services.values())
@@ -0,0 +1,106 @@
+import random
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import occupancy, services
+from bathhouse_booking.bookings.availability import (
+    find_available_slots,
+    find_free_intervals,
+    merge_busy_intervals,
+)
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+def legacy_available_slots(bookings, open_time, close_time, step_minutes, slot_minutes):
+    """Прежний алгоритм: каждый слот сверяется с каждым бронированием."""
+    slots = []
+    current = open_time
+    while current < close_time:
+        slot_end = current + timedelta(minutes=slot_minutes)
+        if slot_end <= close_time:
+            overlaps = any(
+                not (slot_end <= b_start or current >= b_end)
+                for b_start, b_end in bookings
+            )
+            if not overlaps:
+                slots.append((current, slot_end))
+        current += timedelta(minutes=step_minutes)
+    return slots
+
+
+class AvailabilityEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.date = datetime(2030, 5, 10).date()
+        self.open_time = TZ.localize(datetime.combine(self.date, time(9, 0)))
+        self.close_time = TZ.localize(datetime.combine(self.date, time(22, 0)))
+
+    def _random_bookings(self, rng, count):
+        bookings = []
+        for _ in range(count):
+            start = self.open_time + timedelta(minutes=rng.randrange(-120, 13 * 60, 5))
+            end = start + timedelta(minutes=rng.randrange(0, 180, 5))
+            bookings.append((start.astimezone(pytz.UTC), end.astimezone(pytz.UTC)))
+        return bookings
+
+    def test_merge_busy_intervals_joins_touching_and_overlapping(self):
+        t = self.open_time
+        h = timedelta(hours=1)
+        merged = merge_busy_intervals([(t + 3 * h, t + 4 * h), (t, t + h), (t + h, t + 2 * h), (t + 3 * h, t + 5 * h)])
+        self.assertEqual(merged, [(t, t + 2 * h), (t + 3 * h, t + 5 * h)])
+
+    def test_matches_legacy_algorithm_on_random_days(self):
+        rng = random.Random(42)
+        for count in (0, 1, 3, 10, 50):
+            for _ in range(20):
+                bookings = self._random_bookings(rng, count)
+                for step, length in ((30, 120), (15, 60), (60, 180)):
+                    expected = legacy_available_slots(bookings, self.open_time, self.close_time, step, length)
+                    actual = find_available_slots(
+                        merge_busy_intervals(bookings), self.open_time, self.close_time, step, length
+                    )
+                    self.assertEqual(actual, expected)
+
+    def test_free_intervals_between_bookings(self):
+        h = timedelta(hours=1)
+        busy = [(self.open_time + h, self.open_time + 3 * h), (self.open_time + 5 * h, self.open_time + 6 * h)]
+        free = find_free_intervals(busy, self.open_time, self.close_time, TZ)
+        self.assertEqual(free, [
+            (self.open_time, self.open_time + h),
+            (self.open_time + 3 * h, self.open_time + 5 * h),
+            (self.open_time + 6 * h, self.close_time),
+        ])
+
+
+class GetAvailableSlotsEngineTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=3)
+
+    def test_output_identical_to_legacy_with_overlapping_bookings(self):
+        open_time = TZ.localize(datetime.combine(self.date, time(9, 0)))
+        close_time = TZ.localize(datetime.combine(self.date, time(22, 0)))
+        intervals = [(11, 13), (12, 14), (17, 18)]
+        # Пересекающиеся approved записи (данные до появления запрета) - в обход Booking.save
+        Booking.objects.bulk_create([  # type: ignore
+            Booking(
+                client=self.client,
+                bathhouse=self.bathhouse,
+                start_datetime=TZ.localize(datetime.combine(self.date, time(start_hour, 0))),
+                end_datetime=TZ.localize(datetime.combine(self.date, time(end_hour, 0))),
+                status="approved"
+            )
+            for start_hour, end_hour in intervals
+        ])
+        occupancy.rebuild_days(self.bathhouse.id, [self.date])
+
+        expected = legacy_available_slots(
+            list(Booking.objects.values_list("start_datetime", "end_datetime")),  # type: ignore
+            open_time, close_time, 30, 120
+        )
+        self.assertEqual(services.get_available_slots(self.bathhouse, self.date), expected)
@@ -0,0 +1,98 @@
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.availability_cache import KIND_SLOTS, AvailabilityCache, availability_cache
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client, SystemConfig
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class AvailabilityCacheUnitTests(SimpleTestCase):
+    def setUp(self):
+        self.day = datetime(2030, 1, 1).date()
+
+    def test_lru_eviction_respects_size_bound(self):
+        cache = AvailabilityCache(max_size=2)
+        for bathhouse_id in (1, 2):
+            cache.set(KIND_SLOTS, bathhouse_id, self.day, (bathhouse_id,), cache.begin())
+        cache.get(KIND_SLOTS, 1, self.day)  # 1 становится самым свежим
+        cache.set(KIND_SLOTS, 3, self.day, (3,), cache.begin())
+
+        self.assertEqual(cache.get(KIND_SLOTS, 1, self.day), (1,))
+        self.assertIsNone(cache.get(KIND_SLOTS, 2, self.day))
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_stale_value_is_not_stored_after_invalidation(self):
+        cache = AvailabilityCache()
+        epoch = cache.begin()
+        cache.invalidate_days(1, [self.day])
+        cache.set(KIND_SLOTS, 1, self.day, ("stale",), epoch)
+        self.assertIsNone(cache.get(KIND_SLOTS, 1, self.day))
+
+    def test_expired_entries_are_misses(self):
+        cache = AvailabilityCache(ttl_seconds=-1)
+        cache.set(KIND_SLOTS, 1, self.day, (), cache.begin())
+        self.assertIsNone(cache.get(KIND_SLOTS, 1, self.day))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class AvailabilityCacheIntegrationTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        self.booking = Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            status="pending"
+        )
+
+    def test_repeated_call_is_served_without_queries(self):
+        first = services.get_available_slots(self.bathhouse, self.date)
+        with self.assertNumQueries(0):
+            second = services.get_available_slots(self.bathhouse, self.date)
+
+        self.assertEqual(first, second)
+        self.assertEqual(availability_cache.stats()["hits"], 1)
+        self.assertEqual(availability_cache.stats()["misses"], 1)
+
+    def test_approval_invalidates_only_affected_day(self):
+        other_date = self.date + timedelta(days=1)
+        before = services.get_available_slots(self.bathhouse, self.date)
+        services.get_free_intervals(self.bathhouse, other_date)
+
+        services.approve_booking(self.booking.id)
+
+        after = services.get_available_slots(self.bathhouse, self.date)
+        self.assertNotEqual(before, after)
+        with self.assertNumQueries(0):
+            services.get_free_intervals(self.bathhouse, other_date)
+
+    def test_pending_booking_changes_keep_cache(self):
+        services.get_available_slots(self.bathhouse, self.date)
+        self.booking.comment = "Комментарий"
+        self.booking.save()
+
+        with self.assertNumQueries(0):
+            services.get_available_slots(self.bathhouse, self.date)
+
+    def test_slot_config_change_invalidates_cache(self):
+        services.get_available_slots(self.bathhouse, self.date)
+        SystemConfig.objects.create(key="MIN_BOOKING_MINUTES", value="60")  # type: ignore
+
+        slots = services.get_available_slots(self.bathhouse, self.date)
+        self.assertEqual(slots[0][1] - slots[0][0], timedelta(minutes=60))
+
+    def test_unrelated_config_change_keeps_cache(self):
+        services.get_available_slots(self.bathhouse, self.date)
+        SystemConfig.objects.create(key="HOURLY_PRICE", value="2000")  # type: ignore
+
+        with self.assertNumQueries(0):
+            services.get_available_slots(self.bathhouse, self.date)
@@ -0,0 +1,94 @@
+from datetime import datetime, time, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytz
+from django.apps import apps as django_apps
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class BookingOverlapTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        day = timezone.now().date() + timedelta(days=3)
+        self.first = self._booking(day, 10, 12)
+        self.second = self._booking(day, 11, 13)
+
+    def _booking(self, day, start_hour, end_hour, status="pending"):
+        return Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=TZ.localize(datetime.combine(day, time(start_hour, 0))),
+            end_datetime=TZ.localize(datetime.combine(day, time(end_hour, 0))),
+            status=status,
+        )
+
+    def test_save_rejects_overlap_without_clean(self):
+        services.approve_booking(self.first.id)
+
+        # Проверка clean пропущена (например, гонка двух подтверждений) - save все равно не пропустит
+        self.second.status = "approved"
+        with self.assertRaises(ValidationError):
+            self.second.save()
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, "pending")
+
+    def test_approve_booking_reports_overlap(self):
+        services.approve_booking(self.first.id)
+        with self.assertRaises(ValidationError):
+            services.approve_booking(self.second.id)
+
+    def test_unchanged_approved_booking_saved_without_overlap_check(self):
+        services.approve_booking(self.first.id)
+        booking = Booking.objects.get(pk=self.first.id)  # type: ignore
+        booking.comment = "Без веника"
+        with self.assertNumQueries(1):
+            booking.save(update_fields=["comment"])
+
+    def test_clean_reports_overlap_with_database_constraint(self):
+        services.approve_booking(self.first.id)
+        self.second.status = "approved"
+
+        # Ошибку должна показать форма админки, а не ограничение БД при сохранении
+        with patch("bathhouse_booking.bookings.models.overlap_enforced_by_db", return_value=True):
+            with self.assertRaises(ValidationError) as ctx:
+                self.second.clean()
+        self.assertIn("start_datetime", ctx.exception.message_dict)
+
+    def test_database_constraint_violation_maps_to_validation_error(self):
+        self.second.status = "approved"
+        error = IntegrityError(
+            'conflicting key value violates exclusion constraint "booking_no_overlap_approved"'
+        )
+        with patch("bathhouse_booking.bookings.models.overlap_enforced_by_db", return_value=True), \
+                patch("django.db.models.Model.save", side_effect=error):
+            # Предварительная проверка в clean остается (пересечений еще нет), гонку ловит ограничение
+            with self.assertNumQueries(1):
+                self.second.clean()
+            with self.assertRaises(ValidationError):
+                self.second.save()
+
+    def test_constraint_migration_lists_existing_overlaps(self):
+        migration = import_module('bathhouse_booking.bookings.migrations.0008_booking_overlap_exclusion')
+        self._booking(self.first.start_datetime.astimezone(TZ).date(), 13, 15)
+        # Пересечения, оставшиеся с тех пор, когда save их не проверял; 13:00-15:00 только касается 11:00-13:00
+        Booking.objects.update(status="approved")  # type: ignore
+
+        self.assertEqual(migration.find_overlapping_approved(Booking), [(self.first.id, self.second.id)])
+        schema_editor = SimpleNamespace(connection=SimpleNamespace(vendor='postgresql'))
+        with self.assertRaisesMessage(RuntimeError, f"{self.first.id}/{self.second.id}"):
+            migration.check_approved_overlaps(django_apps, schema_editor)
+
+        Booking.objects.filter(pk=self.second.id).update(status="rejected")  # type: ignore
+        self.assertEqual(migration.find_overlapping_approved(Booking), [])
+        migration.check_approved_overlaps(django_apps, schema_editor)
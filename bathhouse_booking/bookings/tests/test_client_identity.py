@@ -0,0 +1,69 @@
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.client_identity import ClientIdentityMap, client_identity_map
+from bathhouse_booking.bookings.models import Client
+
+
+class ClientIdentityMapTests(TestCase):
+    def test_lru_bound(self):
+        identity_map = ClientIdentityMap(max_size=2)
+        identity_map.set("1", 10)
+        identity_map.set("2", 20)
+        identity_map.get("1")
+        identity_map.set("3", 30)
+
+        self.assertEqual(identity_map.get("1"), 10)
+        self.assertIsNone(identity_map.get("2"))
+        self.assertEqual(identity_map.stats(), {"hits": 2, "misses": 1, "size": 2})
+
+    def test_disabled_map_stores_nothing(self):
+        identity_map = ClientIdentityMap(max_size=0)
+        identity_map.set("1", 10)
+        self.assertIsNone(identity_map.get("1"))
+
+
+class ClientLookupTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="100")  # type: ignore
+
+    def test_repeat_lookup_by_primary_key(self):
+        self.assertEqual(async_to_sync(services.aget_client)(100), self.client_obj)
+        self.assertEqual(client_identity_map.get("100"), self.client_obj.pk)
+
+        with self.assertNumQueries(1) as ctx:
+            self.assertEqual(async_to_sync(services.aget_client)(100), self.client_obj)
+        self.assertIn('"bookings_client"."id" =', ctx.captured_queries[0]['sql'])
+
+    def test_stale_entry_after_telegram_id_change(self):
+        async_to_sync(services.aget_client)(100)
+        Client.objects.filter(pk=self.client_obj.pk).update(telegram_id="200")  # type: ignore
+
+        self.assertIsNone(async_to_sync(services.aget_client)(100))
+        self.assertIsNone(client_identity_map.get("100"))
+        self.assertEqual(async_to_sync(services.aget_client)(200), self.client_obj)
+
+    def test_get_or_create_does_not_duplicate(self):
+        client, created = async_to_sync(services.aget_or_create_client)(100, name="Другое имя")
+        self.assertEqual((client, created), (self.client_obj, False))
+
+        client, created = async_to_sync(services.aget_or_create_client)(300, name="Новый", phone="+79990000000")
+        self.assertTrue(created)
+        self.assertEqual(client.phone, "+79990000000")
+        self.assertEqual(async_to_sync(services.aget_or_create_client)(300, name="Новый"), (client, False))
+        self.assertEqual(Client.objects.filter(telegram_id="300").count(), 1)  # type: ignore
+
+    def test_telegram_id_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Client.objects.create(name="Дубликат", telegram_id="100")  # type: ignore
+
+    def test_blank_telegram_id_is_stored_as_null(self):
+        first = Client.objects.create(name="Без Telegram", telegram_id="")  # type: ignore
+        second = Client.objects.create(name="Тоже без Telegram", telegram_id="")  # type: ignore
+
+        self.assertEqual(
+            list(Client.objects.filter(pk__in=[first.pk, second.pk]).values_list('telegram_id', flat=True)),  # type: ignore
+            [None, None]
+        )
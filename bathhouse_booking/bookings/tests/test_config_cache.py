@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from bathhouse_booking.bookings.config_init import config_cache, get_config, get_config_bool, get_config_int
+from bathhouse_booking.bookings.models import SystemConfig
+
+
+class ConfigCacheTests(TestCase):
+    def setUp(self):
+        SystemConfig.objects.create(key="OPEN_HOUR", value="10")  # type: ignore
+        SystemConfig.objects.create(key="PAYMENT_INSTRUCTION", value="Карта 1234")  # type: ignore
+        SystemConfig.objects.create(key="TELEGRAM_NOTIFICATIONS_ENABLED", value="Yes")  # type: ignore
+
+    def test_all_keys_loaded_with_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+            self.assertEqual(get_config("PAYMENT_INSTRUCTION"), "Карта 1234")
+            self.assertTrue(get_config_bool("TELEGRAM_NOTIFICATIONS_ENABLED"))
+            self.assertEqual(get_config_int("CLOSE_HOUR", 22), 22)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+
+    def test_invalid_int_uses_default(self):
+        SystemConfig.objects.create(key="HOURLY_PRICE", value="дорого")  # type: ignore
+        self.assertEqual(get_config_int("HOURLY_PRICE", 1000), 1000)
+
+    def test_save_and_delete_invalidate_cache(self):
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+
+        config = SystemConfig.objects.get(key="OPEN_HOUR")  # type: ignore
+        config.value = "11"
+        config.save()
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 11)
+
+        config.delete()
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 9)
+
+    def test_ttl_expiry_reloads_values(self):
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+        # Изменение в обход сигналов (например, из другого процесса)
+        SystemConfig.objects.filter(key="OPEN_HOUR").update(value="12")  # type: ignore
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+
+        # После истечения TTL значения перечитываются
+        with patch("bathhouse_booking.bookings.compiled_cache.time.monotonic",
+                   return_value=config_cache._expires_at + 1):
+            self.assertEqual(get_config_int("OPEN_HOUR", 9), 12)
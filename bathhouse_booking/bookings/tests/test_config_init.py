@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from bathhouse_booking.bookings.config_init import (
+    DEFAULT_CONFIGS,
+    _existing_configs,
+    get_config_int,
+    initialize_system_config,
+    initialize_system_config_async,
+)
+from bathhouse_booking.bookings.config_version import read_version
+from bathhouse_booking.bookings.models import SystemConfig
+
+
+class InitializeSystemConfigTests(TestCase):
+    def test_creates_defaults_in_bulk(self):
+        # Чтение, одна вставка и повышение версии (первое - с созданием строки версии), плюс savepoint'ы
+        with self.assertNumQueries(10):
+            changed = initialize_system_config()
+
+        self.assertEqual(changed, len(DEFAULT_CONFIGS))
+        self.assertEqual(SystemConfig.objects.count(), len(DEFAULT_CONFIGS))  # type: ignore
+        self.assertEqual(read_version(), 1)
+
+    def test_idempotent_and_keeps_values(self):
+        initialize_system_config()
+        config = SystemConfig.objects.get(key="HOURLY_PRICE")  # type: ignore
+        config.value = "1500"
+        config.save()
+        version = read_version()
+
+        with self.assertNumQueries(3):
+            self.assertEqual(initialize_system_config(), 0)
+
+        self.assertEqual(read_version(), version)
+        self.assertEqual(get_config_int("HOURLY_PRICE", 1000), 1500)
+
+    def test_updates_outdated_descriptions_and_creates_missing(self):
+        SystemConfig.objects.create(key="OPEN_HOUR", value="8", description="старое")  # type: ignore
+
+        self.assertEqual(initialize_system_config(), len(DEFAULT_CONFIGS))
+
+        config = SystemConfig.objects.get(key="OPEN_HOUR")  # type: ignore
+        self.assertEqual(config.value, "8")
+        self.assertEqual(config.description, "Час открытия (0-23)")
+
+    def test_existing_rows_inserted_concurrently_are_ignored(self):
+        # Другая реплика успела создать ключ между чтением и вставкой
+        initialize_system_config()
+        SystemConfig.objects.filter(key="OPEN_HOUR").delete()  # type: ignore
+        SystemConfig.objects.bulk_create(  # type: ignore
+            [SystemConfig(key="OPEN_HOUR", value="7", description="Час открытия (0-23)")]
+        )
+
+        self.assertEqual(initialize_system_config(), 0)
+        self.assertEqual(SystemConfig.objects.get(key="OPEN_HOUR").value, "7")  # type: ignore
+
+    def test_keys_created_concurrently_are_not_logged(self):
+        initialize_system_config()
+        SystemConfig.objects.filter(key__in=["OPEN_HOUR", "CLOSE_HOUR"]).delete()  # type: ignore
+        stale = _existing_configs()
+        # Другая реплика создает OPEN_HOUR после нашего чтения
+        SystemConfig.objects.create(key="OPEN_HOUR", value="7", description="Час открытия (0-23)")  # type: ignore
+
+        with patch("bathhouse_booking.bookings.config_init._existing_configs",
+                   side_effect=[stale, _existing_configs()]), \
+                self.assertLogs("bathhouse_booking.bookings.config_init", level="INFO") as logs:
+            changed = async_to_sync(initialize_system_config_async)()
+
+        self.assertEqual(changed, 1)
+        created = [line for line in logs.output if "Created config" in line]
+        self.assertEqual(len(created), 1)
+        self.assertIn("CLOSE_HOUR", created[0])
+        self.assertEqual(SystemConfig.objects.get(key="OPEN_HOUR").value, "7")  # type: ignore
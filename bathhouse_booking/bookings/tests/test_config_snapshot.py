@@ -0,0 +1,57 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.config_snapshot import (
+    DEFAULT_PAYMENT_INSTRUCTION, ConfigSnapshot, get_config_snapshot
+)
+from bathhouse_booking.bookings.models import Client, SystemConfig
+
+
+class ConfigSnapshotParsingTests(SimpleTestCase):
+    def test_defaults_for_missing_and_invalid_values(self):
+        snapshot = ConfigSnapshot.from_values({
+            "OPEN_HOUR": "8",
+            "HOURLY_PRICE": "много",
+            "TELEGRAM_NOTIFICATIONS_ENABLED": "off",
+            "TELEGRAM_ADMIN_ID": "",
+        })
+        self.assertEqual(snapshot.open_hour, 8)
+        self.assertEqual(snapshot.close_hour, 22)
+        self.assertEqual(snapshot.hourly_price, 1000)
+        self.assertFalse(snapshot.notifications_enabled)
+        self.assertIsNone(snapshot.admin_id)
+        self.assertEqual(snapshot.payment_instruction, DEFAULT_PAYMENT_INSTRUCTION)
+
+    def test_snapshot_is_immutable(self):
+        snapshot = ConfigSnapshot.from_values({})
+        with self.assertRaises(AttributeError):
+            snapshot.open_hour = 10  # type: ignore
+
+
+class ConfigSnapshotTests(TestCase):
+    def setUp(self):
+        SystemConfig.objects.create(key="MAX_ACTIVE_BOOKINGS_PER_CLIENT", value="1")  # type: ignore
+        SystemConfig.objects.create(key="TELEGRAM_ADMIN_ID", value="42")  # type: ignore
+
+    def test_snapshot_reused_until_config_changes(self):
+        snapshot = get_config_snapshot()
+        self.assertEqual(snapshot.admin_id, "42")
+        with self.assertNumQueries(0):
+            self.assertIs(get_config_snapshot(), snapshot)
+
+        config = SystemConfig.objects.get(key="TELEGRAM_ADMIN_ID")  # type: ignore
+        config.value = "43"
+        config.save()
+        self.assertEqual(get_config_snapshot().admin_id, "43")
+        # Уже выданный срез не меняется
+        self.assertEqual(snapshot.admin_id, "42")
+
+    def test_booking_limit_uses_given_snapshot(self):
+        client = Client.objects.create(telegram_id="1", name="Клиент")  # type: ignore
+        snapshot = get_config_snapshot()
+        with self.assertNumQueries(0):
+            services.check_booking_limit(client, snapshot)
+
+        with self.assertRaises(ValidationError):
+            services.check_booking_limit(client, snapshot._replace(max_active_bookings=0))
@@ -0,0 +1,49 @@
+from datetime import time
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from bathhouse_booking.bookings.availability_cache import availability_cache
+from bathhouse_booking.bookings.config_init import get_config_int
+from bathhouse_booking.bookings.config_version import ConfigVersionWatcher, read_version
+from bathhouse_booking.bookings.models import PriceRule, SystemConfig, WorkingHours
+
+
+class ConfigVersionTests(TestCase):
+    def test_config_changes_bump_version(self):
+        self.assertEqual(read_version(), 0)
+
+        config = SystemConfig.objects.create(key="OPEN_HOUR", value="10")  # type: ignore
+        WorkingHours.objects.create(weekday=0, open_time=time(10, 0), close_time=time(20, 0))  # type: ignore
+        PriceRule.objects.create(start_time=time(18, 0), end_time=time(0, 0), hourly_price=1500)  # type: ignore
+        config.delete()
+
+        self.assertEqual(read_version(), 4)
+
+    def test_watcher_drops_caches_after_remote_change(self):
+        SystemConfig.objects.create(key="OPEN_HOUR", value="10")  # type: ignore
+        watcher = ConfigVersionWatcher(check_interval_seconds=5)
+
+        # Первая проверка только запоминает версию
+        self.assertFalse(watcher.check())
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+
+        # Изменение в другом процессе: данные и версия меняются в обход сигналов этого процесса
+        with patch("bathhouse_booking.bookings.signals.config_cache"), \
+                patch("bathhouse_booking.bookings.signals._invalidate_schedule"):
+            config = SystemConfig.objects.get(key="OPEN_HOUR")  # type: ignore
+            config.value = "12"
+            config.save()
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 10)
+
+        # До истечения интервала БД не опрашивается
+        with self.assertNumQueries(0):
+            self.assertFalse(watcher.check())
+
+        config_version = availability_cache.config_version
+        with patch("bathhouse_booking.bookings.config_version.time.monotonic",
+                   return_value=watcher._next_check_at):
+            self.assertTrue(watcher.check())
+
+        self.assertEqual(get_config_int("OPEN_HOUR", 9), 12)
+        self.assertGreater(availability_cache.config_version, config_version)
@@ -0,0 +1,55 @@
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.day_context import DayContext
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class DayContextTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = date(2030, 6, 1)
+        start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            status="approved"
+        )
+
+    def test_one_context_serves_slots_and_free_intervals(self):
+        schedule_cache.get()
+        # расписание уже скомпилировано: только строка занятости
+        with self.assertNumQueries(1):
+            context = DayContext.load(self.bathhouse, self.date)
+
+        with self.assertNumQueries(0):
+            slots = services.get_available_slots(self.bathhouse, self.date, context=context)
+            free_intervals = services.get_free_intervals(self.bathhouse, self.date, context=context)
+            slots_by_duration = services.get_available_slots_by_duration(self.bathhouse, self.date, context=context)
+
+        self.assertEqual(context.open_time, TZ.localize(datetime.combine(self.date, time(9, 0))))
+        self.assertEqual(context.close_time, TZ.localize(datetime.combine(self.date, time(22, 0))))
+        self.assertEqual(slots, services.get_available_slots(self.bathhouse, self.date))
+        self.assertEqual(free_intervals, services.get_free_intervals(self.bathhouse, self.date))
+        self.assertEqual(slots_by_duration[120], slots)
+
+    def test_load_range_reads_occupancy_once(self):
+        schedule_cache.get()
+        # расписание уже скомпилировано: только запрос занятости за диапазон
+        with self.assertNumQueries(1):
+            contexts = DayContext.load_range(self.bathhouse, self.date, self.date + timedelta(days=2))
+
+        self.assertEqual(list(contexts), [self.date + timedelta(days=i) for i in range(3)])
+        self.assertNotEqual(contexts[self.date].bits, 0)
+        self.assertEqual(contexts[self.date + timedelta(days=1)].free_intervals(), [
+            (contexts[self.date + timedelta(days=1)].open_time, contexts[self.date + timedelta(days=1)].close_time)
+        ])
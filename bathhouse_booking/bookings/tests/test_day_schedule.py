@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+import pytz
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class DayScheduleForBathhousesTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=1)
+        self.bathhouses = [Bathhouse.objects.create(name=f"Баня {i}") for i in range(3)]  # type: ignore
+
+        for bathhouse, (start_hour, end_hour) in zip(self.bathhouses[:2], ((10, 12), (9, 22))):
+            Booking.objects.create(  # type: ignore
+                client=self.client,
+                bathhouse=bathhouse,
+                start_datetime=TZ.localize(datetime.combine(self.date, time(start_hour, 0))),
+                end_datetime=TZ.localize(datetime.combine(self.date, time(end_hour, 0))),
+                status="approved"
+            )
+
+    def _expected_text(self, bathhouses):
+        text = f"📅 *Расписание свободных окон на {self.date.strftime('%d.%m.%Y')}*\n\n"
+        for bathhouse in bathhouses:
+            merged = services.merge_adjacent_intervals(
+                services.get_free_intervals(bathhouse, self.date), gap_minutes=30
+            )
+            formatted = services.format_free_intervals(merged)
+            text += f"*{bathhouse.name}:*\n"
+            text += f"  Свободно: {formatted}\n" if formatted else "  Нет свободного времени\n"
+            text += "\n"
+        return text
+
+    def test_text_matches_per_bathhouse_calculation(self):
+        ids = [bathhouse.id for bathhouse in self.bathhouses]
+        text = services.get_day_schedule_for_bathhouses(ids, self.date)
+
+        self.assertEqual(text, self._expected_text(self.bathhouses))
+        self.assertIn("Свободно: 09:00-10:00, 12:00-22:00", text)
+        self.assertIn("Нет свободного времени", text)
+
+    def test_query_count_does_not_grow_with_bathhouses(self):
+        for i in range(5):
+            Bathhouse.objects.create(name=f"Дополнительная {i}")  # type: ignore
+        ids = list(Bathhouse.objects.values_list("id", flat=True))  # type: ignore
+
+        schedule_cache.get()
+        # бани + занятость (расписание уже скомпилировано)
+        with self.assertNumQueries(2):
+            services.get_day_schedule_for_bathhouses(ids, self.date)
+
+    def test_error_for_one_bathhouse_keeps_others(self):
+        broken = self.bathhouses[0]
+        original = services.DayContext.from_schedule
+
+        def from_schedule(schedule, bathhouse_id, *args, **kwargs):
+            if bathhouse_id == broken.id:
+                raise ValueError("broken schedule")
+            return original(schedule, bathhouse_id, *args, **kwargs)
+
+        with patch.object(services.DayContext, "from_schedule", side_effect=from_schedule):
+            text = services.get_day_schedule_for_bathhouses([bathhouse.id for bathhouse in self.bathhouses], self.date)
+
+        self.assertIn(f"*{broken.name}:*\n  Ошибка получения данных\n", text)
+        self.assertIn(f"*{self.bathhouses[1].name}:*\n  Нет свободного времени\n", text)
+        self.assertIn(f"*{self.bathhouses[2].name}:*\n  Свободно: 09:00-22:00\n", text)
+
+    def test_missing_bathhouses_are_skipped(self):
+        text = services.get_day_schedule_for_bathhouses([999999, self.bathhouses[2].id], self.date)
+        self.assertEqual(text, self._expected_text([self.bathhouses[2]]))
+
+    def test_no_bathhouses_found_returns_empty_string(self):
+        self.assertEqual(services.get_day_schedule_for_bathhouses([999999], self.date), "")
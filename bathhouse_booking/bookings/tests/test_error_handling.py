@@ -95,7 +95,7 @@ class ErrorHandlingTests(TestCase):
     
     def test_get_available_slots_database_error(self):
         """Проверка обработки DatabaseError при получении доступных слотов."""
-        with patch('bathhouse_booking.bookings.services.Booking.objects.filter') as mock_filter:
+        with patch('bathhouse_booking.bookings.occupancy.DayOccupancy.objects.filter') as mock_filter:
             mock_filter.side_effect = DatabaseError("Database connection failed")
             
             with self.assertRaises(DatabaseError):
@@ -0,0 +1,135 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+import pytz
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import occupancy, services
+from bathhouse_booking.bookings.holds import release_expired_holds
+from bathhouse_booking.bookings.models import SLOT_HELD_ERROR, Bathhouse, Booking, Client, SystemConfig
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+SLOT_BITS = ((1 << 120) - 1) << 720  # 12:00-14:00
+
+
+class SlotHoldTests(TestCase):
+    def setUp(self):
+        self.first = Client.objects.create(name="Первый", telegram_id="1")  # type: ignore
+        self.second = Client.objects.create(name="Второй", telegram_id="2")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        self.start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        self.end = self.start + timedelta(hours=2)
+
+    def _request(self, client):
+        return services.create_booking_request(client, self.bathhouse, self.start, self.end)
+
+    def _expire(self, booking):
+        Booking.objects.filter(id=booking.id).update(hold_expires_at=timezone.now() - timedelta(minutes=1))  # type: ignore
+
+    def test_pending_booking_holds_slot(self):
+        booking = self._request(self.first)
+
+        self.assertIsNotNone(booking.hold_expires_at)
+        self.assertAlmostEqual(
+            (booking.hold_expires_at - timezone.now()).total_seconds(), 30 * 60, delta=60
+        )
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), SLOT_BITS)
+        self.assertNotIn((self.start, self.end), services.get_available_slots(self.bathhouse, self.date))
+
+    def test_held_slot_is_rejected_up_front(self):
+        self._request(self.first)
+
+        with self.assertRaises(ValidationError) as ctx:
+            services.create_booking_request(
+                self.second, self.bathhouse, self.start + timedelta(hours=1), self.end + timedelta(hours=1)
+            )
+        self.assertIn(SLOT_HELD_ERROR, str(ctx.exception))
+        self.assertEqual(Booking.objects.count(), 1)  # type: ignore
+
+    def test_expired_hold_does_not_block_before_sweep(self):
+        self._expire(self._request(self.first))
+
+        booking = self._request(self.second)
+        self.assertEqual(booking.client, self.second)
+
+    def test_hold_can_be_disabled(self):
+        SystemConfig.objects.create(key="SLOT_HOLD_MINUTES", value="0")  # type: ignore
+
+        booking = self._request(self.first)
+
+        self.assertIsNone(booking.hold_expires_at)
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+
+    def test_sweeper_releases_only_expired_holds(self):
+        expired = self._request(self.first)
+        self._expire(expired)
+        other_start = self.start + timedelta(days=1)
+        active = services.create_booking_request(
+            self.second, self.bathhouse, other_start, other_start + timedelta(hours=2)
+        )
+
+        self.assertEqual(release_expired_holds(batch_size=1), 1)
+
+        expired.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual(expired.status, "pending")
+        self.assertIsNone(expired.hold_expires_at)
+        self.assertIsNotNone(active.hold_expires_at)
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+        self.assertEqual(occupancy.find_mismatches(), [])
+        self.assertIn((self.start, self.end), services.get_available_slots(self.bathhouse, self.date))
+
+    def test_sweeper_processes_all_batches(self):
+        for hour in (10, 12, 14):
+            start = TZ.localize(datetime.combine(self.date, time(hour, 0)))
+            self._expire(services.create_booking_request(self.first, self.bathhouse, start, start + timedelta(hours=2)))
+
+        self.assertEqual(release_expired_holds(batch_size=2), 3)
+        self.assertFalse(Booking.objects.filter(hold_expires_at__isnull=False).exists())  # type: ignore
+
+    def test_payment_keeps_slot_after_hold_expires(self):
+        booking = self._request(self.first)
+        services.report_payment(booking.id)
+        self._expire(booking)
+
+        release_expired_holds()
+
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), SLOT_BITS)
+        with self.assertRaises(ValidationError):
+            self._request(self.second)
+
+    def test_late_payment_is_rejected_if_slot_taken(self):
+        late = self._request(self.first)
+        self._expire(late)
+        release_expired_holds()
+        self._request(self.second)
+
+        with self.assertRaises(ValidationError) as ctx:
+            services.report_payment(late.id)
+        self.assertIn(SLOT_HELD_ERROR, str(ctx.exception))
+        late.refresh_from_db()
+        self.assertEqual(late.status, "pending")
+
+    def test_late_payment_is_accepted_if_slot_free(self):
+        late = self._request(self.first)
+        self._expire(late)
+        release_expired_holds()
+
+        services.report_payment(late.id)
+
+        late.refresh_from_db()
+        self.assertEqual(late.status, "payment_reported")
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), SLOT_BITS)
+
+    def test_management_command(self):
+        self._expire(self._request(self.first))
+
+        out = StringIO()
+        call_command("release_expired_holds", stdout=out)
+
+        self.assertIn("Снято удержаний: 1", out.getvalue())
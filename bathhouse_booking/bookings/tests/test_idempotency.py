@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+import pytz
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.idempotency import RecentBookingRequests, booking_request_key, recent_booking_requests
+from bathhouse_booking.bookings.models import SLOT_HELD_ERROR, Bathhouse, Booking, Client
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class RecentBookingRequestsTests(TestCase):
+    def test_entry_expires(self):
+        requests = RecentBookingRequests(ttl_seconds=10)
+        with patch("bathhouse_booking.bookings.lru.time.monotonic", return_value=100):
+            requests.set(("1",), 5)
+            self.assertEqual(requests.get(("1",)), 5)
+        with patch("bathhouse_booking.bookings.lru.time.monotonic", return_value=111):
+            self.assertIsNone(requests.get(("1",)))
+        self.assertEqual(requests.stats(), {"hits": 1, "misses": 1, "size": 0})
+
+    def test_key_does_not_depend_on_timezone(self):
+        start = TZ.localize(datetime(2030, 1, 1, 12, 0))
+        end = start + timedelta(hours=2)
+        self.assertEqual(
+            booking_request_key(1, 2, start, end),
+            booking_request_key("1", 2, start.astimezone(pytz.UTC), end.astimezone(pytz.UTC))
+        )
+
+
+class IdempotentBookingRequestTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        day = timezone.now().date() + timedelta(days=2)
+        self.start = TZ.localize(datetime.combine(day, time(12, 0)))
+        self.end = self.start + timedelta(hours=2)
+        self.key = booking_request_key("1", self.bathhouse.id, self.start, self.end)
+
+    def _create(self):
+        return services.create_booking_request(
+            self.client_obj, self.bathhouse, self.start, self.end, idempotency_key=self.key
+        )
+
+    def test_repeated_request_returns_existing_booking(self):
+        booking = self._create()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._create(), booking)
+        self.assertEqual(Booking.objects.count(), 1)  # type: ignore
+
+    def test_request_after_cancel_creates_new_booking(self):
+        booking = self._create()
+        services.cancel_booking(booking.id)
+
+        repeated = self._create()
+
+        self.assertNotEqual(repeated.id, booking.id)
+        self.assertEqual(recent_booking_requests.get(self.key), repeated.id)
+
+    def test_without_key_slot_is_rejected_as_held(self):
+        self._create()
+        with self.assertRaises(ValidationError) as ctx:
+            services.create_booking_request(self.client_obj, self.bathhouse, self.start, self.end)
+        self.assertIn(SLOT_HELD_ERROR, str(ctx.exception))
@@ -0,0 +1,68 @@
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class MonthAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.full_day = date(2030, 2, 10)
+        self.partial_day = date(2030, 2, 11)
+
+        # Весь рабочий день 9:00-22:00 занят
+        self._create_booking(self.full_day, time(9, 0), 13 * 60, "approved")
+        # 12:00-14:00 занято
+        self._create_booking(self.partial_day, time(12, 0), 120, "approved")
+
+    def _create_booking(self, day, start_time, minutes, status):
+        start = TZ.localize(datetime.combine(day, start_time))
+        return Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(minutes=minutes),
+            status=status
+        )
+
+    def test_counts_cover_whole_month_with_one_occupancy_query(self):
+        schedule_cache.get()
+        # расписание уже скомпилировано: только запрос занятости за месяц
+        with self.assertNumQueries(1):
+            counts = services.get_month_availability(self.bathhouse, 2030, 2)
+
+        self.assertEqual(len(counts), 28)
+        self.assertEqual(counts[self.full_day], 0)
+        free_day = date(2030, 2, 1)
+        self.assertEqual(counts[free_day], len(services.get_available_slots(self.bathhouse, free_day)))
+        self.assertEqual(
+            counts[self.partial_day],
+            len(services.get_available_slots(self.bathhouse, self.partial_day))
+        )
+        self.assertLess(counts[self.partial_day], counts[free_day])
+
+    def test_summary_is_cached_and_invalidated_by_booking_changes(self):
+        services.get_month_availability(self.bathhouse, 2030, 2)
+        with self.assertNumQueries(0):
+            services.get_month_availability(self.bathhouse, 2030, 2)
+
+        Booking.objects.filter(  # type: ignore
+            start_datetime__date=self.full_day
+        ).get().delete()
+
+        counts = services.get_month_availability(self.bathhouse, 2030, 2)
+        self.assertGreater(counts[self.full_day], 0)
+
+    def test_other_month_summary_survives_booking_changes(self):
+        services.get_month_availability(self.bathhouse, 2030, 3)
+        self._create_booking(self.partial_day, time(16, 0), 120, "approved")
+
+        with self.assertNumQueries(0):
+            services.get_month_availability(self.bathhouse, 2030, 3)
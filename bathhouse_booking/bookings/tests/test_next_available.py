@@ -0,0 +1,77 @@
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class FindNextAvailableTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.first = Bathhouse.objects.create(name="Первая")  # type: ignore
+        self.second = Bathhouse.objects.create(name="Вторая")  # type: ignore
+        Bathhouse.objects.create(name="Закрыта", is_active=False)  # type: ignore
+        self.day = date(2030, 4, 1)
+        self.after = TZ.localize(datetime.combine(self.day, time(8, 0)))
+
+    def _approve(self, bathhouse, day, start_time, minutes):
+        start = TZ.localize(datetime.combine(day, start_time))
+        Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(minutes=minutes),
+            status="approved"
+        )
+
+    def _at(self, day, hour, minute=0):
+        return TZ.localize(datetime.combine(day, time(hour, minute)))
+
+    def test_slots_are_merged_across_bathhouses_by_start(self):
+        # Первая баня занята 9:00-12:00, вторая свободна
+        self._approve(self.first, self.day, time(9, 0), 180)
+
+        slots = services.find_next_available(120, after=self.after, limit=3)
+
+        self.assertEqual(
+            [(bathhouse.id, start) for bathhouse, start, _ in slots],
+            [
+                (self.second.id, self._at(self.day, 9)),
+                (self.second.id, self._at(self.day, 9, 30)),
+                (self.second.id, self._at(self.day, 10)),
+            ]
+        )
+        self.assertTrue(all(end - start == timedelta(minutes=120) for _, start, end in slots))
+
+    def test_search_skips_fully_booked_days_and_respects_after(self):
+        for bathhouse in (self.first, self.second):
+            self._approve(bathhouse, self.day, time(9, 0), 13 * 60)
+        after = self._at(self.day + timedelta(days=1), 20, 15)
+
+        # bathhouse_ids ограничивает поиск, 20:15 + 2 ч уже не помещается до закрытия
+        slots = services.find_next_available(120, after=after, bathhouse_ids=[self.first.id], limit=1)
+
+        self.assertEqual(slots, [(self.first, self._at(self.day + timedelta(days=2), 9),
+                                  self._at(self.day + timedelta(days=2), 11))])
+
+    def test_one_occupancy_query_for_whole_horizon(self):
+        self._approve(self.first, self.day, time(9, 0), 13 * 60)
+        schedule_cache.get()
+        # бани + занятость за горизонт (расписание уже скомпилировано)
+        with self.assertNumQueries(2):
+            services.find_next_available(60, after=self.after, horizon_days=30, limit=5)
+
+    def test_empty_when_horizon_is_full(self):
+        self._approve(self.first, self.day, time(9, 0), 13 * 60)
+        slots = services.find_next_available(60, after=self.after, bathhouse_ids=[self.first.id], horizon_days=1)
+        self.assertEqual(slots, [])
+
+    def test_non_positive_duration_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            services.find_next_available(0)
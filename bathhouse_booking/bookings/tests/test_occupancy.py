@@ -0,0 +1,134 @@
+from datetime import datetime, time, timedelta
+from importlib import import_module
+from io import StringIO
+
+import pytz
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import occupancy, services
+from bathhouse_booking.bookings.availability import (
+    find_available_slots_in_bits,
+    find_free_ranges_in_bits,
+    occupancy_bits_by_day,
+)
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client, DayOccupancy
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class OccupancyBitsTests(SimpleTestCase):
+    def test_booking_across_midnight_marks_both_days(self):
+        day = datetime(2030, 3, 1).date()
+        start = TZ.localize(datetime.combine(day, time(22, 0)))
+        bits = occupancy_bits_by_day([(start, start + timedelta(hours=4))], TZ)
+
+        self.assertEqual(set(bits), {day, day + timedelta(days=1)})
+        self.assertEqual(bits[day], ((1 << 120) - 1) << (22 * 60))
+        self.assertEqual(bits[day + timedelta(days=1)], (1 << 120) - 1)
+
+    def test_partial_minutes_are_marked_busy(self):
+        day = datetime(2030, 3, 1).date()
+        start = TZ.localize(datetime.combine(day, time(10, 0, 30)))
+        bits = occupancy_bits_by_day([(start, start + timedelta(minutes=1))], TZ)
+        self.assertEqual(bits[day], 0b11 << 600)
+
+    def test_migration_helper_matches_module(self):
+        migration = import_module('bathhouse_booking.bookings.migrations.0004_dayoccupancy')
+        start = TZ.localize(datetime(2030, 3, 1, 22, 0, 30))
+        intervals = [(start, start + timedelta(hours=4)), (start - timedelta(hours=5), start - timedelta(hours=4))]
+        self.assertEqual(migration._bits_by_day(intervals, TZ), occupancy_bits_by_day(intervals, TZ))
+
+    def test_slots_and_free_ranges(self):
+        bits = ((1 << 60) - 1) << 600  # 10:00-11:00
+        self.assertEqual(find_available_slots_in_bits(bits, 540, 780, 60, 60), [540, 660, 720])
+        self.assertEqual(find_free_ranges_in_bits(bits, 540, 780), [(540, 600), (660, 780)])
+        self.assertEqual(find_free_ranges_in_bits(0, 540, 780), [(540, 780)])
+
+
+class OccupancyMaintenanceTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        self.start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        self.booking = Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=self.bathhouse,
+            start_datetime=self.start,
+            end_datetime=self.start + timedelta(hours=2),
+            status="pending"
+        )
+
+    def test_pending_booking_does_not_occupy(self):
+        self.assertFalse(DayOccupancy.objects.exists())  # type: ignore
+
+    def test_approve_then_reject_updates_occupancy(self):
+        services.approve_booking(self.booking.id)
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), ((1 << 120) - 1) << 720)
+
+        services.reject_booking(self.booking.id, reason="Нет оплаты")
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+        self.assertFalse(DayOccupancy.objects.exists())  # type: ignore
+
+    def test_moving_approved_booking_frees_old_day(self):
+        services.approve_booking(self.booking.id)
+        booking = Booking.objects.get(id=self.booking.id)  # type: ignore
+        booking.start_datetime += timedelta(days=1)
+        booking.end_datetime += timedelta(days=1)
+        booking.save()
+
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+        self.assertNotEqual(occupancy.get_day_bits(self.bathhouse.id, self.date + timedelta(days=1)), 0)
+
+    def test_deleting_approved_booking_frees_day(self):
+        services.approve_booking(self.booking.id)
+        Booking.objects.get(id=self.booking.id).delete()  # type: ignore
+        self.assertFalse(DayOccupancy.objects.exists())  # type: ignore
+
+    def test_status_change_of_stale_booking_rebuilds_days(self):
+        services.report_payment(self.booking.id)
+        stale = Booking.objects.get(id=self.booking.id)  # type: ignore
+        # Изменение в обход сигналов: загруженное состояние устарело
+        Booking.objects.filter(id=self.booking.id).update(status="cancelled")  # type: ignore
+        occupancy.rebuild_all()
+
+        stale.status = "approved"
+        stale.save()
+
+        self.assertEqual(occupancy.find_mismatches(), [])
+        self.assertNotEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+
+    def test_hold_migration_rebuilds_table(self):
+        migration = import_module('bathhouse_booking.bookings.migrations.0009_booking_hold_expires_at')
+        services.report_payment(self.booking.id)
+        DayOccupancy.objects.all().delete()  # type: ignore
+
+        migration.rebuild_occupancy(django_apps, None)
+
+        self.assertEqual(occupancy.find_mismatches(), [])
+        self.assertTrue(DayOccupancy.objects.exists())  # type: ignore
+
+    def test_available_slots_read_single_occupancy_row(self):
+        services.approve_booking(self.booking.id)
+        schedule_cache.get()
+        # расписание уже скомпилировано: только строка занятости
+        with self.assertNumQueries(1):
+            slots = services.get_available_slots(self.bathhouse, self.date)
+        self.assertNotIn(12, [slot[0].hour for slot in slots])
+
+    def test_rebuild_command_restores_and_checks_table(self):
+        services.approve_booking(self.booking.id)
+        DayOccupancy.objects.all().delete()  # type: ignore
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_occupancy', '--check', stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_occupancy', stdout=out)
+        self.assertIn("1 строк", out.getvalue())
+        self.assertEqual(occupancy.find_mismatches(), [])
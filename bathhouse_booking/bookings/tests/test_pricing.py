@@ -0,0 +1,86 @@
+from datetime import date, datetime, time
+
+import pytz
+from django.test import TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Client, PriceRule, SystemConfig
+from bathhouse_booking.bookings.pricing import price_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+def local(day, hour, minute=0):
+    return TZ.localize(datetime.combine(day, time(hour, minute)))
+
+
+class PriceTableTests(TestCase):
+    def setUp(self):
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.other = Bathhouse.objects.create(name="Другая баня")  # type: ignore
+        SystemConfig.objects.create(key="HOURLY_PRICE", value="1000")  # type: ignore
+        self.monday = date(2030, 7, 1)
+        self.saturday = date(2030, 7, 6)
+
+    def test_peak_weekend_and_bathhouse_rules(self):
+        # Вечерний час пик для всех бань, выходные дороже, у первой бани своя цена в выходные
+        PriceRule.objects.create(start_time=time(18, 0), end_time=time(0, 0), hourly_price=1500)  # type: ignore
+        PriceRule.objects.create(  # type: ignore
+            day_type='weekends', start_time=time(0, 0), end_time=time(0, 0), hourly_price=1200
+        )
+        PriceRule.objects.create(  # type: ignore
+            bathhouse=self.bathhouse, day_type='weekends',
+            start_time=time(10, 0), end_time=time(14, 0), hourly_price=2000
+        )
+        table = price_cache.get()
+
+        # 17:00-19:00 в будни: час по базовой цене и час пик
+        self.assertEqual(table.quote(self.bathhouse.id, local(self.monday, 17), local(self.monday, 19)), 2500)
+        # Правило для выходных важнее правила на любой день
+        self.assertEqual(table.quote(self.other.id, local(self.saturday, 17), local(self.saturday, 19)), 2400)
+        self.assertEqual(table.quote(self.bathhouse.id, local(self.saturday, 13), local(self.saturday, 15)), 3200)
+        # Интервал через полночь считается по ценам каждых суток
+        self.assertEqual(
+            table.quote(self.other.id, local(self.monday, 23), local(date(2030, 7, 2), 1)), 2500
+        )
+
+    def test_quote_day_matches_quote(self):
+        PriceRule.objects.create(start_time=time(12, 30), end_time=time(15, 0), hourly_price=1800)  # type: ignore
+        slots_by_duration = services.get_available_slots_by_duration(self.bathhouse, self.monday)
+        table = price_cache.get()
+
+        # Таблица уже скомпилирована - все слоты дня оцениваются без запросов
+        with self.assertNumQueries(0):
+            prices = services.get_slot_prices(self.bathhouse, self.monday, slots_by_duration)
+
+        self.assertEqual(set(prices), set(slots_by_duration))
+        for duration, slots in slots_by_duration.items():
+            self.assertEqual(prices[duration], [table.quote(self.bathhouse.id, start, end) for start, end in slots])
+
+    def test_minimum_is_one_hour(self):
+        table = price_cache.get()
+        self.assertEqual(table.quote(self.bathhouse.id, local(self.monday, 10), local(self.monday, 10, 30)), 1000)
+
+    def test_rule_change_rebuilds_table(self):
+        start, end = local(self.monday, 10), local(self.monday, 12)
+        self.assertEqual(price_cache.get().quote(self.bathhouse.id, start, end), 2000)
+
+        rule = PriceRule.objects.create(  # type: ignore
+            bathhouse=self.bathhouse, start_time=time(9, 0), end_time=time(11, 0), hourly_price=600
+        )
+        self.assertEqual(price_cache.get().quote(self.bathhouse.id, start, end), 1600)
+
+        rule.delete()
+        config = SystemConfig.objects.get(key="HOURLY_PRICE")  # type: ignore
+        config.value = "1100"
+        config.save()
+        self.assertEqual(price_cache.get().quote(self.bathhouse.id, start, end), 2200)
+
+    def test_booking_request_uses_price_rules(self):
+        PriceRule.objects.create(start_time=time(18, 0), end_time=time(22, 0), hourly_price=1500)  # type: ignore
+        client = Client.objects.create(telegram_id="1", name="Клиент")  # type: ignore
+
+        booking = services.create_booking_request(
+            client, self.bathhouse, local(self.monday, 17), local(self.monday, 19)
+        )
+        self.assertEqual(booking.price_total, 2500)
@@ -0,0 +1,111 @@
+"""
+Планы выполнения горячих запросов.
+
+Запросы перехватываются из настоящих сервисных функций и прогоняются через
+EXPLAIN QUERY PLAN, поэтому тест ловит и удаленный индекс, и изменение формы
+запроса, при котором индекс перестал подходить. Планировщик SQLite не зависит
+от статистики таблиц, поэтому планы стабильны на пустой тестовой базе.
+"""
+from datetime import datetime, time, timedelta
+from unittest import skipUnless
+from unittest.mock import AsyncMock
+
+import pytz
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bathhouse_booking.bookings import occupancy, services
+from bathhouse_booking.bookings.active_bookings import recount_active_bookings
+from bathhouse_booking.bookings.holds import conflicting_bookings, release_expired_holds
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.transitions import transition
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+@skipUnless(connection.vendor == 'sqlite', "Планы сверяются для планировщика SQLite")
+class HotQueryPlanTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        self.booking = Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            status="pending"
+        )
+
+    def _plans(self, func, table, statements=('SELECT', 'UPDATE')):
+        """Планы всех запросов func к таблице table."""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if table not in sql or not sql.startswith(statements):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans.append(" | ".join(row[-1] for row in cursor.fetchall()))
+        self.assertTrue(plans, f"Нет запросов к {table}")
+        return plans
+
+    def assertUsesIndex(self, func, table, index):
+        for plan in self._plans(func, table):
+            self.assertIn(index, plan)
+            self.assertNotIn(f"SCAN {table}", plan)
+
+    def test_active_bookings_recount(self):
+        self.assertUsesIndex(
+            recount_active_bookings, "bookings_booking", "booking_client_status_idx"
+        )
+
+    def test_user_bookings(self):
+        from bathhouse_booking.bot.handlers.my_bookings import get_user_bookings
+
+        plans = self._plans(lambda: async_to_sync(get_user_bookings)("1"), "bookings_booking")
+        self.assertIn("booking_client_status_idx", plans[-1])
+
+    def test_client_lookup(self):
+        # Уникальный telegram_id: SQLite ищет по автоматическому уникальному индексу
+        self.assertUsesIndex(
+            lambda: async_to_sync(services.aget_client)("1"),
+            "bookings_client", "(telegram_id=?)"
+        )
+
+    def test_overlap_check_on_approve(self):
+        self.assertIn(
+            "booking_bh_status_time_idx",
+            self._plans(lambda: transition(self.booking.id, "approved"), "bookings_booking", ("UPDATE",))[0]
+        )
+
+    def test_slot_conflicts(self):
+        self.assertUsesIndex(
+            lambda: conflicting_bookings(self.booking).exists(),
+            "bookings_booking", "booking_bh_status_time_idx"
+        )
+
+    def test_occupancy_rebuild(self):
+        self.assertUsesIndex(
+            lambda: occupancy.compute_days_bits(self.bathhouse.id, [self.date]),
+            "bookings_booking", "booking_bh_status_time_idx"
+        )
+
+    def test_hold_sweeper(self):
+        plans = self._plans(release_expired_holds, "bookings_booking")
+        self.assertIn("booking_pending_hold_idx", plans[0])
+
+    def test_notification_queue_poll(self):
+        from bathhouse_booking.bot.main import process_notification_queue
+
+        self.assertUsesIndex(
+            lambda: async_to_sync(process_notification_queue)(AsyncMock()),
+            "bookings_notificationqueue", "notification_unsent_idx"
+        )
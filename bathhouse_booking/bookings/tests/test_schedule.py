@@ -0,0 +1,85 @@
+from datetime import date, time
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, ScheduleException, SystemConfig, WorkingHours
+from bathhouse_booking.bookings.schedule import CLOSED, CompiledSchedule, merge_windows, schedule_cache
+
+
+class CompiledScheduleTests(SimpleTestCase):
+    def setUp(self):
+        self.monday = date(2030, 7, 1)
+        self.schedule = CompiledSchedule(
+            default_windows=((540, 1320),),
+            weekly={(None, 0): ((600, 1200),), (1, 0): ((480, 720), (780, 1380))},
+            exceptions={(None, self.monday): CLOSED, (2, self.monday): ((720, 900),)},
+            slot_step_minutes=30,
+            min_booking_minutes=120,
+        )
+
+    def test_lookup_priority(self):
+        # Исключение для всех бань важнее часов по дню недели
+        self.assertEqual(self.schedule.day_windows(1, self.monday), CLOSED)
+        # Исключение бани важнее общего исключения
+        self.assertEqual(self.schedule.day_windows(2, self.monday), ((720, 900),))
+        next_monday = date(2030, 7, 8)
+        self.assertEqual(self.schedule.day_windows(1, next_monday), ((480, 720), (780, 1380)))
+        self.assertEqual(self.schedule.day_windows(3, next_monday), ((600, 1200),))
+        self.assertEqual(self.schedule.day_windows(3, date(2030, 7, 9)), ((540, 1320),))
+
+    def test_merge_windows(self):
+        self.assertEqual(merge_windows([(600, 700), (540, 600), (800, 900), (850, 950), (10, 10)]),
+                         ((540, 700), (800, 950)))
+
+
+class ScheduleAvailabilityTests(TestCase):
+    def setUp(self):
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.monday = date(2030, 7, 1)
+
+    def test_weekday_hours_with_break(self):
+        WorkingHours.objects.create(  # type: ignore
+            bathhouse=self.bathhouse, weekday=0, open_time=time(10, 0), close_time=time(13, 0)
+        )
+        WorkingHours.objects.create(  # type: ignore
+            bathhouse=self.bathhouse, weekday=0, open_time=time(14, 0), close_time=time(18, 0)
+        )
+
+        slots = services.get_available_slots(self.bathhouse, self.monday)
+        self.assertEqual(
+            [(start.strftime("%H:%M"), end.strftime("%H:%M")) for start, end in slots],
+            [("10:00", "12:00"), ("10:30", "12:30"), ("11:00", "13:00"),
+             ("14:00", "16:00"), ("14:30", "16:30"), ("15:00", "17:00"), ("15:30", "17:30"), ("16:00", "18:00")]
+        )
+        free_intervals = services.get_free_intervals(self.bathhouse, self.monday)
+        self.assertEqual(
+            [(start.hour, end.hour) for start, end in free_intervals],
+            [(10, 13), (14, 18)]
+        )
+
+    def test_holiday_closes_all_bathhouses_and_change_recompiles(self):
+        self.assertTrue(services.get_available_slots(self.bathhouse, self.monday))
+
+        ScheduleException.objects.create(date=self.monday, is_closed=True, comment="Праздник")  # type: ignore
+
+        self.assertEqual(services.get_available_slots(self.bathhouse, self.monday), [])
+        self.assertEqual(services.get_free_intervals(self.bathhouse, self.monday), [])
+        self.assertEqual(services.get_month_availability(self.bathhouse, 2030, 7)[self.monday], 0)
+        self.assertIn("Не работает", services.get_day_schedule_for_bathhouses([self.bathhouse.id], self.monday))
+
+    def test_compiled_once_until_schedule_changes(self):
+        schedule_cache.get()
+        with self.assertNumQueries(0):
+            schedule_cache.get()
+
+        SystemConfig.objects.create(key="OPEN_HOUR", value="12")  # type: ignore
+        slots = services.get_available_slots(self.bathhouse, date(2030, 7, 2))
+        self.assertEqual(slots[0][0].hour, 12)
+
+    def test_exception_validation(self):
+        with self.assertRaises(ValidationError):
+            ScheduleException(date=self.monday).full_clean()
+        with self.assertRaises(ValidationError):
+            WorkingHours(weekday=0, open_time=time(18, 0), close_time=time(9, 0)).full_clean()
@@ -0,0 +1,82 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from django.test import SimpleTestCase, TestCase
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.availability import (
+    find_available_slots_in_bits,
+    find_free_ranges_in_bits,
+    find_slots_in_free_ranges,
+)
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client, SystemConfig
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class SlotsInFreeRangesTests(SimpleTestCase):
+    def test_matches_per_duration_bitmap_scan(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            bits = 0
+            for _ in range(rng.randint(0, 6)):
+                start = rng.randrange(540, 1320)
+                bits |= ((1 << rng.randint(1, 120)) - 1) << start
+            lengths = [60, 120, 180, 240]
+
+            free_ranges = find_free_ranges_in_bits(bits, 540, 1320)
+            starts_by_length = find_slots_in_free_ranges(free_ranges, 540, 30, lengths)
+
+            for length in lengths:
+                self.assertEqual(
+                    starts_by_length[length],
+                    find_available_slots_in_bits(bits, 540, 1320, 30, length)
+                )
+
+
+class SlotsByDurationTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = date(2030, 5, 1)
+        # Занято 12:00-14:00: до обеда 3 часа, после - 8 часов
+        start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        Booking.objects.create(  # type: ignore
+            client=self.client,
+            bathhouse=self.bathhouse,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            status="approved"
+        )
+
+    def test_default_durations_derived_from_single_read(self):
+        schedule_cache.get()
+        # расписание уже скомпилировано: одна строка занятости на все длительности
+        with self.assertNumQueries(1):
+            slots_by_duration = services.get_available_slots_by_duration(self.bathhouse, self.date)
+
+        self.assertEqual(list(slots_by_duration), [120, 180, 240, 300, 360, 420, 480])
+        self.assertEqual(slots_by_duration[120], services.get_available_slots(self.bathhouse, self.date))
+        self.assertEqual(
+            [(start.hour, start.minute) for start, _ in slots_by_duration[180]][:2],
+            [(9, 0), (14, 0)]
+        )
+        self.assertEqual(
+            [(start.hour, end.hour) for start, end in slots_by_duration[480]],
+            [(14, 22)]
+        )
+
+    def test_explicit_durations_and_cache(self):
+        services.get_available_slots_by_duration(self.bathhouse, self.date)
+        with self.assertNumQueries(0):
+            services.get_available_slots_by_duration(self.bathhouse, self.date)
+
+        slots_by_duration = services.get_available_slots_by_duration(self.bathhouse, self.date, durations=[600, 60])
+        self.assertEqual(list(slots_by_duration), [60])
+
+    def test_durations_follow_min_booking_minutes(self):
+        SystemConfig.objects.create(key="MIN_BOOKING_MINUTES", value="90")  # type: ignore
+        slots_by_duration = services.get_available_slots_by_duration(self.bathhouse, self.date)
+        self.assertEqual(list(slots_by_duration)[:3], [90, 150, 210])
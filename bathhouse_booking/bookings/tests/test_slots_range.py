@@ -0,0 +1,50 @@
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.models import Bathhouse, Booking, Client
+from bathhouse_booking.bookings.schedule import schedule_cache
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+
+class AvailableSlotsRangeTests(TestCase):
+    def setUp(self):
+        self.client = Client.objects.create(name="Клиент", phone="+79123456789")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.start_date = timezone.now().date() + timedelta(days=2)
+        self.end_date = self.start_date + timedelta(days=6)
+
+        # Бронирования в разные дни, включая переходящее через полночь
+        for day_offset, start_hour, hours in ((0, 10, 2), (1, 18, 3), (3, 21, 5), (6, 9, 13)):
+            start = TZ.localize(datetime.combine(self.start_date + timedelta(days=day_offset), time(start_hour, 0)))
+            Booking.objects.create(  # type: ignore
+                client=self.client,
+                bathhouse=self.bathhouse,
+                start_datetime=start,
+                end_datetime=start + timedelta(hours=hours),
+                status="approved"
+            )
+
+    def test_range_matches_single_day_results(self):
+        slots_by_date = services.get_available_slots_range(self.bathhouse, self.start_date, self.end_date)
+
+        self.assertEqual(len(slots_by_date), 7)
+        for day, slots in slots_by_date.items():
+            self.assertEqual(slots, services.get_available_slots(self.bathhouse, day))
+
+    def test_range_uses_single_booking_query(self):
+        schedule_cache.get()
+        # расписание уже скомпилировано: один запрос занятости на весь диапазон
+        with self.assertNumQueries(1):
+            services.get_available_slots_range(self.bathhouse, self.start_date, self.end_date)
+
+    def test_iter_yields_days_in_order(self):
+        days = [day for day, _ in services.iter_available_slots_range(self.bathhouse, self.start_date, self.end_date)]
+        self.assertEqual(days, [self.start_date + timedelta(days=i) for i in range(7)])
+
+    def test_empty_range(self):
+        self.assertEqual(services.get_available_slots_range(self.bathhouse, self.end_date, self.start_date), {})
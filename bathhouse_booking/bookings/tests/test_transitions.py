@@ -0,0 +1,261 @@
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+import pytz
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+
+from bathhouse_booking.bookings import occupancy, services
+from bathhouse_booking.bookings.models import OVERLAP_ERROR, Bathhouse, Booking, Client, NotificationQueue
+from bathhouse_booking.bookings.transitions import _conflicts, _without_overlaps, transition
+
+TZ = pytz.timezone('Asia/Jakarta')
+
+SLOT_BITS = ((1 << 120) - 1) << 720  # 12:00-14:00
+
+
+def _concurrent_write(status):
+    """Подменяет _conflicts так, чтобы перед UPDATE статус изменил "другой процесс"."""
+    def side_effect(booking, new_status):
+        Booking.objects.filter(pk=booking.pk).update(status=status)  # type: ignore
+        return _conflicts(booking, new_status)
+    return patch("bathhouse_booking.bookings.transitions._conflicts", side_effect=side_effect)
+
+
+class BookingTransitionTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        self.start = TZ.localize(datetime.combine(self.date, time(12, 0)))
+        self.booking = services.create_booking_request(
+            self.client_obj, self.bathhouse, self.start, self.start + timedelta(hours=2)
+        )
+
+    def test_report_payment_within_hold_takes_two_queries(self):
+        with self.assertNumQueries(2):
+            booking, old_status = transition(self.booking.id, "payment_reported")
+
+        self.assertEqual((booking.status, old_status), ("payment_reported", "pending"))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "payment_reported")
+
+    def test_approve_paid_booking_updates_counter_in_same_transaction(self):
+        transition(self.booking.id, "payment_reported")
+
+        # Чтение, SAVEPOINT, UPDATE бронирования, UPDATE счетчика клиента, RELEASE
+        with self.assertNumQueries(5):
+            transition(self.booking.id, "approved")
+
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), SLOT_BITS)
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.active_bookings_count, 1)
+
+    def test_not_allowed_transition_fails_fast(self):
+        transition(self.booking.id, "approved")
+
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError) as ctx:
+                services.cancel_booking(self.booking.id)
+        self.assertEqual(ctx.exception.code, "invalid_transition")
+        self.assertIn("Нельзя отменить бронирование со статусом approved", str(ctx.exception))
+
+    def test_double_tap_is_a_no_op(self):
+        with patch("bathhouse_booking.bookings.notifications.queue_admin_payment_notification") as notify:
+            services.report_payment(self.booking.id)
+            services.report_payment(self.booking.id)
+
+        notify.assert_called_once_with(self.booking.id)
+
+    def test_concurrent_change_is_not_overwritten(self):
+        with _concurrent_write("cancelled"):
+            with self.assertRaises(ValidationError) as ctx:
+                services.approve_booking(self.booking.id)
+
+        self.assertEqual(ctx.exception.code, "invalid_transition")
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "cancelled")
+
+    def test_concurrent_same_transition_is_a_no_op(self):
+        with _concurrent_write("approved"), \
+                patch("bathhouse_booking.bookings.notifications.send_booking_status_notification") as notify:
+            services.approve_booking(self.booking.id)
+
+        notify.assert_not_called()
+
+    def test_approve_checks_overlap_in_update(self):
+        other = Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=self.start + timedelta(hours=1),
+            end_datetime=self.start + timedelta(hours=3),
+            status="pending"
+        )
+        services.approve_booking(other.id)
+
+        with self.assertRaises(ValidationError) as ctx:
+            services.approve_booking(self.booking.id)
+        self.assertIn(OVERLAP_ERROR, str(ctx.exception))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, "pending")
+
+    def test_reject_appends_reason_to_comment(self):
+        Booking.objects.filter(pk=self.booking.id).update(comment="С веником")  # type: ignore
+
+        services.reject_booking(self.booking.id, reason="Нет оплаты")
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.comment, "С веником\nОтклонено: Нет оплаты")
+
+    def test_cancel_releases_held_slot(self):
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), SLOT_BITS)
+        services.get_available_slots(self.bathhouse, self.date)
+
+        services.cancel_booking(self.booking.id)
+
+        self.assertEqual(occupancy.get_day_bits(self.bathhouse.id, self.date), 0)
+        self.assertIn(
+            (self.start, self.start + timedelta(hours=2)),
+            services.get_available_slots(self.bathhouse, self.date)
+        )
+        self.assertEqual(occupancy.find_mismatches(), [])
+
+
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name="Клиент", telegram_id="1")  # type: ignore
+        self.bathhouse = Bathhouse.objects.create(name="Баня")  # type: ignore
+        self.date = timezone.now().date() + timedelta(days=2)
+        self.bookings = [
+            Booking.objects.create(  # type: ignore
+                client=self.client_obj,
+                bathhouse=self.bathhouse,
+                start_datetime=TZ.localize(datetime.combine(self.date, time(hour, 0))),
+                end_datetime=TZ.localize(datetime.combine(self.date, time(hour + 2, 0))),
+                status="payment_reported"
+            )
+            for hour in range(8, 20, 2)
+        ]
+
+    def _ids(self):
+        return [booking.id for booking in self.bookings]
+
+    def test_approve_many_with_constant_queries(self):
+        # Блокировка строк, блокировка бани, проверка пересечений, UPDATE (в savepoint), UPDATE счетчиков,
+        # INSERT уведомлений
+        with self.assertNumQueries(10):
+            approved, errors = services.approve_bookings(self._ids())
+
+        self.assertEqual(errors, {})
+        self.assertEqual({booking.id for booking in approved}, set(self._ids()))
+        self.assertEqual(
+            set(Booking.objects.filter(id__in=self._ids()).values_list('status', flat=True)),  # type: ignore
+            {"approved"}
+        )
+        self.assertEqual(
+            NotificationQueue.objects.filter(status="approved").count(), len(self.bookings)  # type: ignore
+        )
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.active_bookings_count, len(self.bookings))
+        self.assertEqual(occupancy.find_mismatches(), [])
+
+    def test_constraint_violation_falls_back_to_single_transitions(self):
+        first = self.bookings[0]
+        rival = Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=first.start_datetime,
+            end_datetime=first.end_datetime,
+            status="pending"
+        )
+        original_update = QuerySet.update
+
+        def without_overlaps(candidates, errors):
+            accepted = _without_overlaps(candidates, errors)
+            # Параллельное подтверждение заняло время первого бронирования после проверки
+            original_update(Booking.objects.filter(pk=rival.pk), status="approved")  # type: ignore
+            return accepted
+
+        def update(queryset, **kwargs):
+            if not update.failed and kwargs.get('status') == 'approved':
+                update.failed = True
+                raise IntegrityError('violates exclusion constraint "booking_no_overlap_approved"')
+            return original_update(queryset, **kwargs)
+        update.failed = False
+
+        with patch("bathhouse_booking.bookings.transitions._without_overlaps", side_effect=without_overlaps), \
+                patch.object(QuerySet, "update", update):
+            approved, errors = services.approve_bookings(self._ids())
+
+        self.assertEqual(list(errors), [first.id])
+        self.assertEqual(errors[first.id].message_dict['start_datetime'], [OVERLAP_ERROR])
+        self.assertEqual({booking.id for booking in approved}, set(self._ids()[1:]))
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.active_bookings_count, len(self.bookings) - 1)
+        self.assertEqual(occupancy.find_mismatches(), [])
+
+    def test_status_changed_after_read_falls_back_to_single_transitions(self):
+        cancelled = self.bookings[1]
+        original_update = QuerySet.update
+
+        def without_overlaps(candidates, errors):
+            # Другой процесс отменяет бронирование после чтения (в SQLite строки не блокируются)
+            original_update(Booking.objects.filter(pk=cancelled.pk), status="cancelled")  # type: ignore
+            return _without_overlaps(candidates, errors)
+
+        with patch("bathhouse_booking.bookings.transitions._without_overlaps", side_effect=without_overlaps):
+            approved, errors = services.approve_bookings(self._ids())
+
+        self.assertEqual(list(errors), [cancelled.id])
+        self.assertEqual(errors[cancelled.id].code, "invalid_transition")
+        self.assertEqual({booking.id for booking in approved}, set(self._ids()) - {cancelled.id})
+        self.assertEqual(Booking.objects.get(pk=cancelled.pk).status, "cancelled")  # type: ignore
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.active_bookings_count, len(self.bookings) - 1)
+
+    def test_overlaps_inside_batch_and_with_approved(self):
+        first, second = self.bookings[:2]
+        inside = Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=first.start_datetime + timedelta(hours=1),
+            end_datetime=first.end_datetime + timedelta(hours=1),
+            status="pending"
+        )
+        existing = Booking.objects.create(  # type: ignore
+            client=self.client_obj,
+            bathhouse=self.bathhouse,
+            start_datetime=second.start_datetime + timedelta(hours=1),
+            end_datetime=second.end_datetime,
+            status="pending"
+        )
+        services.approve_booking(existing.id)
+
+        approved, errors = services.approve_bookings([inside.id, first.id, second.id])
+
+        self.assertEqual([booking.id for booking in approved], [first.id])
+        self.assertEqual(set(errors), {inside.id, second.id})
+        self.assertIn(OVERLAP_ERROR, str(errors[inside.id]))
+        inside.refresh_from_db()
+        self.assertEqual(inside.status, "pending")
+
+    def test_reject_reports_invalid_and_missing(self):
+        Booking.objects.filter(id=self.bookings[0].id).update(status="cancelled")  # type: ignore
+        services.reject_booking(self.bookings[1].id)
+
+        rejected, errors = services.reject_bookings(self._ids()[:3] + [0], reason="Нет оплаты")
+
+        self.assertEqual([booking.id for booking in rejected], [self.bookings[2].id])
+        self.assertEqual(errors[self.bookings[0].id].code, "invalid_transition")
+        self.assertEqual(errors[0].code, "not_found")
+        self.assertNotIn(self.bookings[1].id, errors)
+        self.bookings[2].refresh_from_db()
+        self.assertEqual(self.bookings[2].comment, "Отклонено: Нет оплаты")
+        self.assertEqual(
+            NotificationQueue.objects.get(booking_id=self.bookings[2].id).message.splitlines()[-1],  # type: ignore
+            "Причина: Нет оплаты"
+        )
+        self.assertEqual(occupancy.find_mismatches(), [])
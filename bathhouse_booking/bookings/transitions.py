@@ -0,0 +1,366 @@
+"""
+Переходы бронирования между статусами.
+
+Каждый переход - это чтение строки и один условный UPDATE
+"... WHERE id = ? AND status = <прочитанный статус>": если статус успели
+изменить параллельно (двойное нажатие кнопки, два администратора), UPDATE не
+затронет ни одной строки, и переход не потеряет чужое изменение. Пересечения
+проверяются только при подтверждении - условием NOT EXISTS в том же UPDATE
+(в PostgreSQL дополнительно ограничением-исключением). Недопустимые переходы
+отклоняются до UPDATE, повторный переход в текущий статус ничего не делает.
+
+UPDATE не вызывает сигналы модели Booking, поэтому таблица занятости и кэш
+доступности обновляются здесь явно и только если бронирование начало или
+перестало занимать время бани: условный UPDATE подтверждает, что прочитанный
+статус актуален. Счетчик активных бронирований клиента
+(active_bookings.py) меняется в одной транзакции с UPDATE.
+"""
+import logging
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, Q, TextField, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .models import (
+    BOOKING_OVERLAP_CONSTRAINT,
+    OVERLAP_ERROR,
+    SLOT_HELD_ERROR,
+    Booking,
+    lock_bathhouse,
+    occupying_q,
+)
+from .active_bookings import ACTIVE_STATUS, adjust_active_count, adjust_active_counts
+from .occupancy import _occupies, invalidate_availability, rebuild_for_intervals
+
+logger = logging.getLogger(__name__)
+
+# Целевой статус -> статусы, из которых в него можно перейти
+ALLOWED_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    'payment_reported': ('pending',),
+    'approved': ('pending', 'payment_reported'),
+    'rejected': ('pending', 'payment_reported', 'approved'),
+    'cancelled': ('pending', 'payment_reported'),
+}
+
+_ACTIONS = {
+    'payment_reported': 'отметить оплату, если у бронирования статус',
+    'approved': 'подтвердить бронирование со статусом',
+    'rejected': 'отклонить бронирование со статусом',
+    'cancelled': 'отменить бронирование со статусом',
+}
+
+
+def _conflicts(booking, new_status):
+    """
+    Бронирования, из-за которых переход невозможен, и текст ошибки (None, если проверка не нужна).
+
+    Подтверждение не должно пересекаться с approved бронированиями; сообщение об
+    оплате после истечения удержания - с любыми бронированиями, занимающими время.
+    """
+    if new_status == 'approved':
+        conflicts = Booking.objects.filter(  # type: ignore
+            bathhouse_id=booking.bathhouse_id, status='approved'
+        )
+        error = OVERLAP_ERROR
+    elif new_status == 'payment_reported':
+        now = timezone.now()
+        if booking.hold_expires_at is not None and booking.hold_expires_at > now:
+            return None, None
+        conflicts = Booking.objects.filter(  # type: ignore
+            occupying_q(now), bathhouse_id=booking.bathhouse_id
+        )
+        error = SLOT_HELD_ERROR
+    else:
+        return None, None
+
+    conflicts = conflicts.filter(
+        start_datetime__lt=booking.end_datetime,
+        end_datetime__gt=booking.start_datetime
+    ).exclude(pk=booking.pk)
+    return conflicts, error
+
+
+def _overlap_error(error):
+    return ValidationError({'start_datetime': error, 'end_datetime': error})
+
+
+def _appended_comment(comment, note):
+    return f"{comment}\n{note}" if comment else note
+
+
+def _comment_with_note(note):
+    """Выражение UPDATE, дописывающее note в комментарий бронирования"""
+    return Case(
+        When(comment='', then=Value(note)),
+        default=Concat(F('comment'), Value(f"\n{note}")),
+        output_field=TextField()
+    )
+
+
+def _apply_status(booking, new_status, note, intervals) -> None:
+    """
+    Перенести выполненный UPDATE на объект бронирования.
+
+    Интервал бронирования добавляется в intervals, если оно начало или перестало
+    занимать время бани.
+    """
+    previous = booking.occupancy_key()
+    booking.status = new_status
+    if note:
+        booking.comment = _appended_comment(booking.comment, note)
+    current = booking.occupancy_key()
+    booking._loaded_occupancy = current
+    if _occupies(previous) != _occupies(current):
+        intervals.append(current[1:4])
+
+
+def transition(booking_id, new_status, note: Optional[str] = None) -> Tuple[Booking, str]:
+    """
+    Перевести бронирование в новый статус.
+
+    Args:
+        booking_id: ID бронирования
+        new_status: Целевой статус (ключ ALLOWED_TRANSITIONS)
+        note: Строка, которая дописывается в комментарий бронирования (опционально)
+
+    Returns:
+        Кортеж (бронирование в новом статусе, статус до перехода); если бронирование
+        уже было в целевом статусе, статус до перехода равен новому и ничего не меняется
+
+    Raises:
+        ValidationError: Если бронирование не найдено, переход недопустим или время занято
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    booking = Booking.objects.filter(pk=booking_id).first()  # type: ignore
+    if booking is None:
+        raise ValidationError(f"Бронирование с ID {booking_id} не найдено", code='not_found')
+
+    old_status = booking.status
+    if old_status == new_status:
+        return booking, old_status
+    if old_status not in ALLOWED_TRANSITIONS[new_status]:
+        raise ValidationError(f"Нельзя {_ACTIONS[new_status]} {old_status}", code='invalid_transition')
+
+    changes = {'status': new_status}
+    if note:
+        changes['comment'] = _comment_with_note(note)
+
+    rows = Booking.objects.filter(pk=booking_id, status=old_status)  # type: ignore
+    conflicts, error = _conflicts(booking, new_status)
+    if conflicts is not None:
+        rows = rows.filter(~Exists(conflicts))
+
+    # Изменение счетчика активных бронирований клиента (в одной транзакции с UPDATE)
+    delta = (new_status == ACTIVE_STATUS) - (old_status == ACTIVE_STATUS)
+
+    if new_status == 'payment_reported' and conflicts is not None:
+        # Удержание истекло: слот проверяется под блокировкой бани, как при создании бронирования
+        with transaction.atomic():
+            lock_bathhouse(booking.bathhouse_id)
+            updated = rows.update(**changes)
+    elif delta:
+        try:
+            with transaction.atomic(using=rows.db):
+                updated = rows.update(**changes)
+                if updated:
+                    adjust_active_count(booking.client_id, delta)
+        except IntegrityError as e:
+            # PostgreSQL: параллельное подтверждение успело занять время
+            if BOOKING_OVERLAP_CONSTRAINT in str(e):
+                raise _overlap_error(OVERLAP_ERROR) from e
+            raise
+    else:
+        updated = rows.update(**changes)
+
+    if not updated:
+        current_status = Booking.objects.filter(pk=booking_id).values_list(  # type: ignore
+            'status', flat=True
+        ).first()
+        if current_status is None:
+            raise ValidationError(f"Бронирование с ID {booking_id} не найдено", code='not_found')
+        if current_status == new_status:
+            # Тот же переход только что выполнил параллельный запрос
+            booking.status = current_status
+            return booking, current_status
+        if current_status == old_status and conflicts is not None:
+            raise _overlap_error(error)
+        raise ValidationError(f"Нельзя {_ACTIONS[new_status]} {current_status}", code='invalid_transition')
+
+    intervals: List[Tuple] = []
+    _apply_status(booking, new_status, note, intervals)
+    invalidate_availability(rebuild_for_intervals(intervals))
+
+    logger.debug(f"Booking transition: ID={booking_id}, {old_status} -> {new_status}")
+    return booking, old_status
+
+
+def bulk_transition(booking_ids: Iterable[int], new_status, note: Optional[str] = None
+                    ) -> Tuple[List[Tuple[Booking, str]], Dict[int, ValidationError]]:
+    """
+    Перевести несколько бронирований в новый статус одним набором запросов.
+
+    Бронирования блокируются одним SELECT ... FOR UPDATE и обновляются одним
+    UPDATE. Для подтверждения строки бань блокируются (как при создании
+    бронирования), а пересечения с уже подтвержденными бронированиями
+    проверяются одним запросом; внутри пачки при пересечении подтверждается
+    бронирование, которое начинается раньше. Если UPDATE отклонит ограничение
+    PostgreSQL (параллельное подтверждение) или затронет не все бронирования
+    (статус успели изменить после чтения), он откатывается, и бронирования
+    переводятся по одному через transition. Переходы в статусы, для которых нужна проверка удержания
+    (payment_reported), не поддерживаются.
+
+    Args:
+        booking_ids: ID бронирований
+        new_status: Целевой статус (ключ ALLOWED_TRANSITIONS, кроме payment_reported)
+        note: Строка, которая дописывается в комментарий каждого бронирования (опционально)
+
+    Returns:
+        Кортеж (список пар (бронирование в новом статусе, статус до перехода),
+        словарь {ID бронирования: ошибка} для непереведенных бронирований).
+        Бронирования, уже находившиеся в целевом статусе, не попадают ни в один из них
+
+    Raises:
+        DatabaseError: Если произошла ошибка базы данных
+    """
+    if new_status == 'payment_reported':
+        raise ValueError("bulk_transition не поддерживает переход в payment_reported")
+
+    booking_ids = list(dict.fromkeys(booking_ids))
+    errors: Dict[int, ValidationError] = {}
+    if not booking_ids:
+        return [], errors
+
+    with transaction.atomic():
+        bookings = {
+            booking.pk: booking for booking in Booking.objects.select_for_update(of=('self',)).select_related(  # type: ignore
+                'client', 'bathhouse'
+            ).filter(pk__in=booking_ids)
+        }
+
+        candidates = []
+        for booking_id in booking_ids:
+            booking = bookings.get(booking_id)
+            if booking is None:
+                errors[booking_id] = ValidationError(
+                    f"Бронирование с ID {booking_id} не найдено", code='not_found'
+                )
+            elif booking.status == new_status:
+                continue
+            elif booking.status not in ALLOWED_TRANSITIONS[new_status]:
+                errors[booking_id] = ValidationError(
+                    f"Нельзя {_ACTIONS[new_status]} {booking.status}", code='invalid_transition'
+                )
+            else:
+                candidates.append(booking)
+
+        if new_status == 'approved' and candidates:
+            candidates = _without_overlaps(candidates, errors)
+
+        if not candidates:
+            return [], errors
+
+        changes = {'status': new_status}
+        if note:
+            changes['comment'] = _comment_with_note(note)
+
+        # Каждая строка обновляется, только если ее статус не изменился после чтения:
+        # по прочитанным статусам считаются изменения счетчиков
+        ids_by_status: Dict[str, List[int]] = {}
+        for booking in candidates:
+            ids_by_status.setdefault(booking.status, []).append(booking.pk)
+        rows = Booking.objects.filter(  # type: ignore
+            reduce(or_, (Q(status=status, pk__in=ids) for status, ids in ids_by_status.items()))
+        )
+        deltas: Dict[int, int] = {}
+        for booking in candidates:
+            deltas[booking.client_id] = deltas.get(booking.client_id, 0) + (
+                (new_status == ACTIVE_STATUS) - (booking.status == ACTIVE_STATUS)
+            )
+
+        try:
+            with transaction.atomic(using=rows.db):
+                if rows.update(**changes) != len(candidates):
+                    # Статус части бронирований успели изменить (в SQLite SELECT ... FOR UPDATE
+                    # не блокирует строки): откатываем UPDATE и переводим по одному
+                    raise _StaleCandidates
+        except _StaleCandidates:
+            return _transition_each(candidates, new_status, note, errors), errors
+        except IntegrityError as e:
+            # PostgreSQL: параллельное подтверждение успело занять время части пачки;
+            # переводим по одному, чтобы ошибку получили только конфликтующие бронирования
+            if new_status == 'approved' and BOOKING_OVERLAP_CONSTRAINT in str(e):
+                return _transition_each(candidates, new_status, note, errors), errors
+            raise
+        adjust_active_counts(deltas)
+
+        changed = []
+        intervals = []
+        for booking in candidates:
+            old_status = booking.status
+            _apply_status(booking, new_status, note, intervals)
+            changed.append((booking, old_status))
+
+        affected = rebuild_for_intervals(intervals)
+
+    invalidate_availability(affected)
+
+    logger.debug(
+        f"Bulk booking transition to {new_status}: "
+        f"changed={[booking.pk for booking, _ in changed]}, errors={sorted(errors)}"
+    )
+    return changed, errors
+
+
+class _StaleCandidates(Exception):
+    """Массовый UPDATE затронул не все бронирования-кандидаты"""
+
+
+def _transition_each(candidates, new_status, note, errors) -> List[Tuple[Booking, str]]:
+    """Перевести бронирования по одному через transition; ошибки записываются в errors."""
+    changed = []
+    for candidate in candidates:
+        try:
+            booking, old_status = transition(candidate.pk, new_status, note)
+        except ValidationError as e:
+            errors[candidate.pk] = e
+            continue
+        if old_status != new_status:
+            changed.append((booking, old_status))
+    return changed
+
+
+def _without_overlaps(candidates, errors):
+    """
+    Оставить бронирования, которые можно подтвердить без пересечений.
+
+    Пересечения с уже подтвержденными бронированиями ищутся одним запросом по
+    окну, покрывающему все кандидаты; остальные ошибки записываются в errors.
+    """
+    bathhouse_ids = sorted({booking.bathhouse_id for booking in candidates})
+    lock_bathhouse(bathhouse_ids)
+
+    taken: Dict[int, List[Tuple]] = {}
+    for bathhouse_id, start, end in Booking.objects.filter(  # type: ignore
+        bathhouse_id__in=bathhouse_ids,
+        status='approved',
+        start_datetime__lt=max(booking.end_datetime for booking in candidates),
+        end_datetime__gt=min(booking.start_datetime for booking in candidates)
+    ).exclude(pk__in=[booking.pk for booking in candidates]).values_list(
+        'bathhouse_id', 'start_datetime', 'end_datetime'
+    ):
+        taken.setdefault(bathhouse_id, []).append((start, end))
+
+    accepted = []
+    for booking in sorted(candidates, key=lambda b: (b.start_datetime, b.pk)):
+        intervals = taken.setdefault(booking.bathhouse_id, [])
+        if any(start < booking.end_datetime and end > booking.start_datetime for start, end in intervals):
+            errors[booking.pk] = _overlap_error(OVERLAP_ERROR)
+            continue
+        intervals.append((booking.start_datetime, booking.end_datetime))
+        accepted.append(booking)
+    return accepted
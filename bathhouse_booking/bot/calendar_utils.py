@@ -1,15 +1,95 @@
 from aiogram_calendar import SimpleCalendar, SimpleCalendarCallback
+from aiogram_calendar.schemas import SimpleCalAct
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
+from asgiref.sync import sync_to_async
+from typing import Dict, Optional
 import datetime
+import logging
 
-async def get_calendar_keyboard(show_back_button: bool = True, back_callback: str = "back_to_bathhouse_selection"):
+logger = logging.getLogger(__name__)
+
+# Отметки дней в календаре бронирования
+PAST_DAY_TEXT = "·"
+FULL_DAY_MARK = "✖"
+
+
+def _load_month_availability(bathhouse_id: int, year: int, month: int) -> Dict[datetime.date, int]:
+    """Загрузить сводку свободных слотов бани за месяц (синхронно)."""
+    from bathhouse_booking.bookings.models import Bathhouse
+    from bathhouse_booking.bookings import services
+    
+    bathhouse = Bathhouse.objects.get(id=bathhouse_id)  # type: ignore
+    return services.get_month_availability(bathhouse, year, month)
+
+
+def _local_today() -> datetime.date:
+    """Текущая дата в часовом поясе бани (не сервера)."""
+    from django.utils import timezone
+    from bathhouse_booking.bookings.services import BATHHOUSE_TIMEZONE
+    
+    return timezone.now().astimezone(BATHHOUSE_TIMEZONE).date()
+
+
+def mark_unavailable_days(markup: InlineKeyboardMarkup, availability: Dict[datetime.date, int],
+                          today: datetime.date) -> InlineKeyboardMarkup:
+    """Пометить прошедшие и полностью занятые дни и отключить их кнопки
+    :param markup: клавиатура SimpleCalendar
+    :param availability: количество свободных слотов по датам месяца
+    :param today: текущая дата
+    """
+    ignore_callback = SimpleCalendar.ignore_callback
+    
+    for row in markup.inline_keyboard:
+        for index, button in enumerate(row):
+            if not button.callback_data or not button.callback_data.startswith(SimpleCalendarCallback.__prefix__):
+                continue
+            data = SimpleCalendarCallback.unpack(button.callback_data)
+            if data.act != SimpleCalAct.day:
+                continue
+            
+            day = datetime.date(int(data.year), int(data.month), int(data.day))
+            if day < today:
+                row[index] = InlineKeyboardButton(text=PAST_DAY_TEXT, callback_data=ignore_callback)
+            elif availability.get(day) == 0:
+                row[index] = InlineKeyboardButton(text=f"{day.day}{FULL_DAY_MARK}", callback_data=ignore_callback)
+    
+    return markup
+
+
+class AvailabilityCalendar(SimpleCalendar):
+    """Календарь бронирования, на котором недоступные дни бани отключены"""
+    
+    def __init__(self, bathhouse_id: Optional[int] = None):
+        super().__init__(locale='ru_RU.UTF-8', cancel_btn='Отмена', today_btn='Сегодня')
+        self.bathhouse_id = bathhouse_id
+    
+    async def start_calendar(self, year: Optional[int] = None, month: Optional[int] = None) -> InlineKeyboardMarkup:
+        today = _local_today()
+        year = year or today.year
+        month = month or today.month
+        markup = await super().start_calendar(year=year, month=month)
+        
+        availability: Dict[datetime.date, int] = {}
+        if self.bathhouse_id is not None:
+            try:
+                availability = await sync_to_async(_load_month_availability)(self.bathhouse_id, year, month)
+            except Exception as e:
+                # Без сводки показываем календарь без отметок о занятости
+                logger.error(f"Error loading month availability for bathhouse {self.bathhouse_id}: {e}")
+        
+        return mark_unavailable_days(markup, availability, today)
+
+
+async def get_calendar_keyboard(show_back_button: bool = True, back_callback: str = "back_to_bathhouse_selection",
+                                bathhouse_id: Optional[int] = None):
     """Получить клавиатуру с календарем и кнопкой назад
     :param show_back_button: показывать кнопку назад
     :param back_callback: callback_data для кнопки назад
+    :param bathhouse_id: баня, полностью занятые дни которой нужно отключить
     """
-    calendar = SimpleCalendar(locale='ru_RU.UTF-8', cancel_btn='Отмена', today_btn='Сегодня')
+    calendar = AvailabilityCalendar(bathhouse_id=bathhouse_id)
     calendar_markup = await calendar.start_calendar()
     
     if show_back_button:
@@ -1,6 +1,8 @@
 from aiogram import Dispatcher
 from typing import Any, Dict
 
+from .middleware.client import ClientMiddleware
+from .middleware.config_snapshot import ConfigSnapshotMiddleware
 from .middleware.session_timeout import SessionTimeoutMiddleware
 
 
@@ -9,19 +11,29 @@ async def setup_dependencies(dp: Dispatcher) -> None:
     
     try:
         from bathhouse_booking.bookings import services
+        # Асинхронные версии: вызовы разных пользователей не выстраиваются в очередь
+        # на единственном потоке sync_to_async
         dp["services"] = {
-            "create_booking_request": services.create_booking_request,
-            "report_payment": services.report_payment,
-            "approve_booking": services.approve_booking,
-            "reject_booking": services.reject_booking,
-            "get_available_slots": services.get_available_slots,
-            "cancel_booking": services.cancel_booking,
+            "create_booking_request": services.acreate_booking_request,
+            "report_payment": services.areport_payment,
+            "approve_booking": services.aapprove_booking,
+            "reject_booking": services.areject_booking,
+            "get_available_slots": services.aget_available_slots,
+            "get_available_slots_range": services.aget_available_slots_range,
+            "get_available_slots_by_duration": services.aget_available_slots_by_duration,
+            "get_slot_prices": services.aget_slot_prices,
+            "find_next_available": services.afind_next_available,
+            "cancel_booking": services.acancel_booking,
         }
     except ImportError:
         pass
     
+    # Срез настроек на обновление должен быть готов до проверки таймаута сессии
+    dp.update.outer_middleware(ConfigSnapshotMiddleware())
     # Добавляем middleware для таймаута сессий
     dp.update.outer_middleware(SessionTimeoutMiddleware())
+    # Клиент загружается одним запросом на обновление
+    dp.update.outer_middleware(ClientMiddleware())
 
 
 def get_services(dp: Dispatcher) -> Dict[str, Any]:
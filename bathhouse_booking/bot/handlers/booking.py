@@ -3,6 +3,7 @@ from aiogram.fsm.context import FSMContext
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
+from typing import Optional
 from asgiref.sync import sync_to_async
 from aiogram_calendar import SimpleCalendar, SimpleCalendarCallback
 import logging
@@ -11,11 +12,27 @@ import pytz
 
 from ..states import BookingStates
 from ..keyboards import bathhouses_keyboard, date_selection_keyboard, slots_keyboard, payment_confirmation_keyboard
-from bathhouse_booking.bookings.models import Bathhouse, Client, SystemConfig
+from ..calendar_utils import AvailabilityCalendar
+from bathhouse_booking.bookings.models import SLOT_HELD_ERROR, Bathhouse, Client, SystemConfig
 from bathhouse_booking.bookings import services
+from bathhouse_booking.bookings.config_snapshot import ConfigSnapshot, get_config_snapshot_async
+from bathhouse_booking.bookings.idempotency import booking_request_key
 
 logger = logging.getLogger(__name__)
 
+SLOT_TAKEN_TEXT = "Это время уже занято. Пожалуйста, выберите другой слот."
+
+
+def hold_text(booking) -> str:
+    """Строка о том, до какого времени за клиентом удерживается слот (пустая, если удержания нет)"""
+    if not booking.hold_expires_at:
+        return ""
+    hold_local = booking.hold_expires_at.astimezone(pytz.timezone('Asia/Jakarta'))
+    return (
+        f"⏳ Время закреплено за вами до {hold_local.strftime('%H:%M')}. "
+        "Если не сообщить об оплате до этого момента, его смогут забронировать другие.\n\n"
+    )
+
 
 async def _cleanup_previous_messages(callback_query: types.CallbackQuery, state: FSMContext) -> None:
     """Удалить предыдущие сообщения с клавиатурами"""
@@ -62,29 +79,37 @@ async def _update_activity_timestamp(state: FSMContext) -> None:
     """Обновить timestamp последней активности"""
     await state.update_data(last_activity=time.time())
 
+async def _slot_options_keyboard(state: FSMContext, bathhouse, selected_date, slots_by_duration) -> types.InlineKeyboardMarkup:
+    """Сохранить слоты всех длительностей и их цены в состоянии и показать самую короткую"""
+    durations = list(slots_by_duration)
+    slot_prices = await services.aget_slot_prices(bathhouse, selected_date, slots_by_duration)
+    await state.update_data(slot_options=slots_by_duration, slot_prices=slot_prices)
+    return slots_keyboard(
+        slots_by_duration[durations[0]], durations, durations[0], prices=slot_prices[durations[0]]
+    )
+
+
 router = Router()
 
 
 @router.callback_query(lambda c: c.data == "book_bathhouse")
-async def start_booking(callback_query: types.CallbackQuery, state: FSMContext) -> None:
+async def start_booking(callback_query: types.CallbackQuery, state: FSMContext,
+                        config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None) -> None:
     await callback_query.answer()
     if callback_query.message:
         # Удаляем предыдущие сообщения с клавиатурами
         await _cleanup_previous_messages(callback_query, state)
         
         try:
-            # Получаем или создаем клиента
-            client, created = await sync_to_async(Client.objects.get_or_create)(
-                telegram_id=str(callback_query.from_user.id),
-                defaults={
-                    'name': callback_query.from_user.full_name or callback_query.from_user.first_name or "Unknown",
-                    'phone': "",
-                    'telegram_id': str(callback_query.from_user.id)
-                }
-            )
+            # Клиента передает ClientMiddleware; новых клиентов создаем
+            if client is None:
+                client, created = await services.aget_or_create_client(
+                    callback_query.from_user.id,
+                    name=callback_query.from_user.full_name or callback_query.from_user.first_name or "Unknown"
+                )
             
             # Проверяем лимит активных бронирований
-            await sync_to_async(services.check_booking_limit)(client)
+            await services.acheck_booking_limit(client, config)
             
             # Лимит не превышен, продолжаем процесс бронирования
             start_msg = await callback_query.message.answer("Начинаем процесс бронирования...")
@@ -94,8 +119,8 @@ async def start_booking(callback_query: types.CallbackQuery, state: FSMContext)
             # Сохраняем ID стартового сообщения
             await state.update_data(start_message_id=start_msg.message_id)
             
-            # Получить список активных бань из БД (асинхронно)
-            bathhouses = await sync_to_async(lambda: list(Bathhouse.objects.filter(is_active=True)))()
+            # Получить список активных бань из БД (async ORM)
+            bathhouses = await services.aget_active_bathhouses()
             if bathhouses:
                 keyboard = bathhouses_keyboard(bathhouses)
                 selection_msg = await callback_query.message.answer("Выберите баню:", reply_markup=keyboard)
@@ -152,7 +177,7 @@ async def select_bathhouse(callback_query: types.CallbackQuery, state: FSMContex
         await state.set_state(BookingStates.waiting_for_date)
         await _update_activity_timestamp(state)
         
-        keyboard = await date_selection_keyboard()
+        keyboard = await date_selection_keyboard(bathhouse_id)
         date_msg = await callback_query.message.answer("Выберите дату:", reply_markup=keyboard)
         # Сохраняем ID сообщения с выбором даты
         await state.update_data(date_selection_message_id=date_msg.message_id)
@@ -165,8 +190,10 @@ async def process_calendar_date(callback_query: types.CallbackQuery, state: FSMC
         return
     
     try:
-        # Используем стандартный обработчик календаря
-        calendar = SimpleCalendar(locale='ru_RU.UTF-8', cancel_btn='Отмена', today_btn='Сегодня')
+        # Календарь с отметками занятости выбранной бани: при листании месяцев
+        # полностью занятые дни остаются отключенными
+        state_data = await state.get_data()
+        calendar = AvailabilityCalendar(bathhouse_id=state_data.get("bathhouse_id"))
         # Распаковываем callback данные
         data = SimpleCalendarCallback.unpack(callback_query.data)
         selected, selected_date = await calendar.process_selection(callback_query, data)
@@ -183,8 +210,7 @@ async def process_calendar_date(callback_query: types.CallbackQuery, state: FSMC
         await _update_activity_timestamp(state)
         
         # Получаем bathhouse_id из состояния
-        data = await state.get_data()
-        bathhouse_id = data.get("bathhouse_id")
+        bathhouse_id = state_data.get("bathhouse_id")
         if not bathhouse_id:
             from ..keyboards import back_to_main_keyboard
             await callback_query.message.answer(
@@ -196,14 +222,14 @@ async def process_calendar_date(callback_query: types.CallbackQuery, state: FSMC
         
         # Получаем доступные слоты
         try:
-            bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bathhouse_id)
-            available_slots = await sync_to_async(services.get_available_slots)(bathhouse, selected_date)
+            bathhouse = await Bathhouse.objects.aget(id=bathhouse_id)
+            slots_by_duration = await services.aget_available_slots_by_duration(bathhouse, selected_date)
+            available_slots = next(iter(slots_by_duration.values()), [])
             
             logger.info(f"Available slots for bathhouse {bathhouse_id} on {selected_date}: {len(available_slots)} slots")
             
             if available_slots:
-                from ..keyboards import slots_keyboard
-                keyboard = slots_keyboard(available_slots)
+                keyboard = await _slot_options_keyboard(state, bathhouse, selected_date, slots_by_duration)
                 slots_msg = await callback_query.message.answer("Выберите доступное время:", reply_markup=keyboard)
                 # Сохраняем ID сообщения с выбором времени
                 await state.update_data(slots_selection_message_id=slots_msg.message_id)
@@ -212,7 +238,7 @@ async def process_calendar_date(callback_query: types.CallbackQuery, state: FSMC
                 # Возвращаем к выбору даты
                 await state.set_state(BookingStates.waiting_for_date)
                 from ..keyboards import date_selection_keyboard
-                keyboard = await date_selection_keyboard()
+                keyboard = await date_selection_keyboard(bathhouse_id)
                 date_msg = await callback_query.message.answer("Выберите другую дату:", reply_markup=keyboard)
                 await state.update_data(date_selection_message_id=date_msg.message_id)
         except Exception as e:
@@ -271,13 +297,14 @@ async def select_date(callback_query: types.CallbackQuery, state: FSMContext) ->
         
         # Получаем доступные слоты
         try:
-            bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bathhouse_id)
-            available_slots = await sync_to_async(services.get_available_slots)(bathhouse, selected_date)
+            bathhouse = await Bathhouse.objects.aget(id=bathhouse_id)
+            slots_by_duration = await services.aget_available_slots_by_duration(bathhouse, selected_date)
+            available_slots = next(iter(slots_by_duration.values()), [])
             
             logger.info(f"Available slots for bathhouse {bathhouse_id} on {selected_date}: {len(available_slots)} slots")
             
             if available_slots:
-                keyboard = slots_keyboard(available_slots)
+                keyboard = await _slot_options_keyboard(state, bathhouse, selected_date, slots_by_duration)
                 slots_msg = await callback_query.message.answer("Выберите доступное время:", reply_markup=keyboard)
                 # Сохраняем ID сообщения с выбором времени
                 await state.update_data(slots_selection_message_id=slots_msg.message_id)
@@ -285,7 +312,7 @@ async def select_date(callback_query: types.CallbackQuery, state: FSMContext) ->
                 await callback_query.message.answer("К сожалению, на эту дату нет доступных слотов. Выберите другую дату.")
                 # Возвращаем к выбору даты
                 await state.set_state(BookingStates.waiting_for_date)
-                keyboard = await date_selection_keyboard()
+                keyboard = await date_selection_keyboard(bathhouse_id)
                 date_msg = await callback_query.message.answer("Выберите другую дату:", reply_markup=keyboard)
                 await state.update_data(date_selection_message_id=date_msg.message_id)
         except Exception as e:
@@ -295,7 +322,8 @@ async def select_date(callback_query: types.CallbackQuery, state: FSMContext) ->
 
 
 @router.callback_query(lambda c: c.data and c.data.startswith("select_slot:"))
-async def select_slot(callback_query: types.CallbackQuery, state: FSMContext) -> None:
+async def select_slot(callback_query: types.CallbackQuery, state: FSMContext,
+                      config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None) -> None:
     await callback_query.answer()
     if callback_query.message and callback_query.data:
         # Удаляем предыдущие сообщения с клавиатурами
@@ -342,133 +370,235 @@ async def select_slot(callback_query: types.CallbackQuery, state: FSMContext) ->
             await callback_query.message.answer("Ошибка: некорректный формат времени. Попробуйте еще раз.")
             return
         
-        # Получаем данные из состояния
-        data = await state.get_data()
-        bathhouse_id = data.get("bathhouse_id")
-        selected_date = data.get("selected_date")
+        await _book_slot(callback_query, state, start_str, end_str, config, client)
+
+
+
+
+@router.callback_query(lambda c: c.data and c.data.startswith("slot_duration:"))
+async def select_slot_duration(callback_query: types.CallbackQuery, state: FSMContext) -> None:
+    """Переключить длительность слотов без повторного запроса к сервисам"""
+    await callback_query.answer()
+    if not callback_query.message or not callback_query.data:
+        return
+    
+    data = await state.get_data()
+    slot_options = data.get("slot_options") or {}
+    try:
+        duration = int(callback_query.data.split(":", 1)[1])
+    except ValueError:
+        logger.error(f"Invalid slot duration callback_data: {callback_query.data}")
+        return
+    
+    if duration not in slot_options:
+        await callback_query.message.answer("Список слотов устарел. Выберите дату заново.")
+        return
+    
+    await callback_query.message.edit_reply_markup(
+        reply_markup=slots_keyboard(
+            slot_options[duration], list(slot_options), duration,
+            prices=(data.get("slot_prices") or {}).get(duration)
+        )
+    )
+
+@router.callback_query(lambda c: c.data == "nearest_free_time")
+async def nearest_free_time(callback_query: types.CallbackQuery, state: FSMContext,
+                            config: Optional[ConfigSnapshot] = None) -> None:
+    """Показать ближайшие свободные слоты по всем баням без выбора даты"""
+    await callback_query.answer()
+    if callback_query.message:
+        await _cleanup_previous_messages(callback_query, state)
         
-        if not bathhouse_id or not selected_date:
+        try:
+            from ..keyboards import nearest_slots_keyboard
+            
+            config = config or await get_config_snapshot_async()
+            slots = await services.afind_next_available(config.min_booking_minutes)
+            
+            if not slots:
+                from ..keyboards import back_to_main_keyboard
+                await callback_query.message.answer(
+                    "К сожалению, в ближайшие дни нет свободного времени.",
+                    reply_markup=back_to_main_keyboard()
+                )
+                return
+            
+            await state.set_state(BookingStates.waiting_for_slot)
+            await _update_activity_timestamp(state)
+            
+            slots_msg = await callback_query.message.answer(
+                "Ближайшее свободное время:",
+                reply_markup=nearest_slots_keyboard(slots)
+            )
+            await state.update_data(slots_selection_message_id=slots_msg.message_id)
+        except Exception as e:
             from ..keyboards import back_to_main_keyboard
+            logger.error(f"Error finding nearest free time: {e}", exc_info=True)
             await callback_query.message.answer(
-                "Ошибка: отсутствуют необходимые данные. Начните заново.",
+                "Произошла ошибка при поиске свободного времени. Пожалуйста, попробуйте позже.",
                 reply_markup=back_to_main_keyboard()
             )
-            await state.clear()
-            return
-        
-        # Создаем datetime объекты в UTC
-        # Предполагаем, что выбранное время - в часовом поясе бани (GMT+7)
-        import pytz
-        bathhouse_tz = pytz.timezone('Asia/Jakarta')  # GMT+7
-        start_time = datetime.strptime(start_str, "%H:%M").time()
-        end_time = datetime.strptime(end_str, "%H:%M").time()
+
+
+@router.callback_query(lambda c: c.data and c.data.startswith("nearest_slot:"))
+async def select_nearest_slot(callback_query: types.CallbackQuery, state: FSMContext,
+                              config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None) -> None:
+    """Забронировать слот из списка ближайшего свободного времени"""
+    await callback_query.answer()
+    if callback_query.message and callback_query.data:
+        await _cleanup_previous_messages(callback_query, state)
         
-        # Создаем datetime в часовом поясе бани, затем конвертируем в UTC
-        start_datetime_local = bathhouse_tz.localize(datetime.combine(selected_date, start_time))
-        end_datetime_local = bathhouse_tz.localize(datetime.combine(selected_date, end_time))
+        # Формат: nearest_slot:<bathhouse_id>:<YYYY-MM-DD>:HH:MM-HH:MM
+        try:
+            _, bathhouse_id_str, date_str, slot_str = callback_query.data.split(":", 3)
+            bathhouse_id = int(bathhouse_id_str)
+            selected_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            start_str, end_str = slot_str.split("-")
+        except ValueError as e:
+            logger.error(f"Error parsing nearest slot data: {e}, callback_data={callback_query.data}")
+            await callback_query.message.answer("Ошибка: некорректный формат времени. Попробуйте еще раз.")
+            return
         
-        # Конвертируем в UTC для хранения в базе данных
-        start_datetime = start_datetime_local.astimezone(pytz.UTC)
-        end_datetime = end_datetime_local.astimezone(pytz.UTC)
+        await state.update_data(bathhouse_id=bathhouse_id, selected_date=selected_date)
+        await state.set_state(BookingStates.waiting_for_slot)
         
-        # Сохраняем слот в состоянии
-        await state.update_data(
-            start_datetime=start_datetime,
-            end_datetime=end_datetime
+        await _book_slot(callback_query, state, start_str, end_str, config, client)
+
+async def _book_slot(callback_query: types.CallbackQuery, state: FSMContext, start_str: str, end_str: str,
+                     config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None) -> None:
+    """Создать бронирование на выбранный слот (HH:MM) для бани и даты из состояния"""
+    # Получаем данные из состояния
+    data = await state.get_data()
+    bathhouse_id = data.get("bathhouse_id")
+    selected_date = data.get("selected_date")
+    
+    if not bathhouse_id or not selected_date:
+        from ..keyboards import back_to_main_keyboard
+        await callback_query.message.answer(
+            "Ошибка: отсутствуют необходимые данные. Начните заново.",
+            reply_markup=back_to_main_keyboard()
         )
-        await _update_activity_timestamp(state)
+        await state.clear()
+        return
+    
+    # Создаем datetime объекты в UTC
+    # Предполагаем, что выбранное время - в часовом поясе бани (GMT+7)
+    import pytz
+    bathhouse_tz = pytz.timezone('Asia/Jakarta')  # GMT+7
+    start_time = datetime.strptime(start_str, "%H:%M").time()
+    end_time = datetime.strptime(end_str, "%H:%M").time()
+    
+    # Создаем datetime в часовом поясе бани, затем конвертируем в UTC
+    start_datetime_local = bathhouse_tz.localize(datetime.combine(selected_date, start_time))
+    end_datetime_local = bathhouse_tz.localize(datetime.combine(selected_date, end_time))
+    
+    # Конвертируем в UTC для хранения в базе данных
+    start_datetime = start_datetime_local.astimezone(pytz.UTC)
+    end_datetime = end_datetime_local.astimezone(pytz.UTC)
+    
+    # Сохраняем слот в состоянии
+    await state.update_data(
+        start_datetime=start_datetime,
+        end_datetime=end_datetime
+    )
+    await _update_activity_timestamp(state)
+    
+    # Получаем или создаем клиента
+    try:
+        if client is None:
+            client, created = await services.aget_or_create_client(
+                callback_query.from_user.id,
+                name=callback_query.from_user.full_name or callback_query.from_user.first_name or "Unknown"
+            )
         
-        # Получаем или создаем клиента
-        try:
-            client, created = await sync_to_async(Client.objects.get_or_create)(
-                telegram_id=str(callback_query.from_user.id),
-                defaults={
-                    'name': callback_query.from_user.full_name or callback_query.from_user.first_name or "Unknown",
-                    'phone': "",
-                    'telegram_id': str(callback_query.from_user.id)
-                }
+        # Проверяем, есть ли у клиента номер телефона
+        if client.phone and client.phone.strip():
+            # Телефон есть, создаем бронирование сразу
+            await state.set_state(BookingStates.waiting_for_payment)
+            bathhouse = await Bathhouse.objects.aget(id=bathhouse_id)  # type: ignore
+            config = config or await get_config_snapshot_async()
+            booking = await services.acreate_booking_request(
+                client=client,
+                bathhouse=bathhouse,
+                start=start_datetime,
+                end=end_datetime,
+                config=config,
+                # Повторное нажатие или повторная доставка callback вернет то же бронирование
+                idempotency_key=booking_request_key(callback_query.from_user.id, bathhouse_id, start_datetime, end_datetime)
             )
             
-            # Проверяем, есть ли у клиента номер телефона
-            if client.phone and client.phone.strip():
-                # Телефон есть, создаем бронирование сразу
-                await state.set_state(BookingStates.waiting_for_payment)
-                bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bathhouse_id)
-                booking = await sync_to_async(services.create_booking_request)(
-                    client=client,
-                    bathhouse=bathhouse,
-                    start=start_datetime,
-                    end=end_datetime
-                )
-                
-                # Сохраняем ID бронирования в состоянии
-                await state.update_data(booking_id=booking.id)
-                
-                # Показываем инструкцию по оплате из конфига (асинхронно)
-                from bathhouse_booking.bookings.config_init import get_config
-                payment_text = await sync_to_async(get_config)("PAYMENT_INSTRUCTION", 
-                                         "Пожалуйста, переведите оплату на карту •1234 5678 9012 3456• и нажмите 'Я оплатил'")
-                
-                # Форматируем сумму оплаты
-                amount = booking.price_total or 0
-                if amount <= 0:
-                    logger.warning(f"Booking {booking.id} has invalid price: {booking.price_total}")
-                    amount = 1000  # fallback цена
-                
-                amount_text = f"Сумма к оплате: {amount} руб.\n\n"
-                
-                keyboard = payment_confirmation_keyboard()
-                msg = await callback_query.message.answer(
-                    f"Бронирование создано! ID: {booking.id}\n{amount_text}{payment_text}",
-                    reply_markup=keyboard
-                )
-                # Сохраняем ID сообщения для возможного удаления при отмене
-                await state.update_data(booking_created_message_id=msg.message_id)
-            else:
-                # Телефона нет, переходим к вводу телефона
-                await state.set_state(BookingStates.waiting_for_phone)
-                from ..keyboards import skip_phone_keyboard
-                await callback_query.message.answer(
-                    "📱 *У вас не указан номер телефона*\n\n"
-                    "Хотите добавить его для связи? Отправьте номер телефона в формате:\n"
-                    "+7XXXXXXXXXX или 8XXXXXXXXXX\n\n"
-                    "Или нажмите 'Пропустить' чтобы продолжить без телефона.",
-                    reply_markup=skip_phone_keyboard(),
-                    parse_mode="Markdown"
-                )
+            # Сохраняем ID бронирования в состоянии
+            await state.update_data(booking_id=booking.id)
             
-        except ValidationError as e:
-            from ..keyboards import back_to_main_keyboard
-            # Обрабатываем ошибку лимита бронирований
-            error_message = str(e)
-            if "У вас уже есть" in error_message and "активных бронирований" in error_message:
-                # Показываем пользователю понятное сообщение об ошибке лимита
-                await callback_query.message.answer(
-                    error_message,
-                    reply_markup=back_to_main_keyboard()
-                )
-            elif "прошлом" in error_message:
-                # Ошибка бронирования в прошлое
-                await callback_query.message.answer(
-                    "Нельзя забронировать баню в прошлом. Пожалуйста, выберите будущую дату и время.",
-                    reply_markup=back_to_main_keyboard()
-                )
-            else:
-                # Для других ValidationError показываем общее сообщение
-                logger.error(f"Validation error creating booking: {e}", exc_info=True)
-                await callback_query.message.answer(
-                    "Произошла ошибка при создании бронирования. Пожалуйста, проверьте данные и попробуйте еще раз.",
-                    reply_markup=back_to_main_keyboard()
-                )
-            await state.clear()
-        except Exception as e:
-            from ..keyboards import back_to_main_keyboard
-            logger.error(f"Error creating booking: {e}", exc_info=True)
+            # Показываем инструкцию по оплате из среза настроек
+            payment_text = config.payment_instruction
+            
+            # Форматируем сумму оплаты
+            amount = booking.price_total or 0
+            if amount <= 0:
+                logger.warning(f"Booking {booking.id} has invalid price: {booking.price_total}")
+                amount = 1000  # fallback цена
+            
+            amount_text = f"Сумма к оплате: {amount} руб.\n\n"
+            
+            keyboard = payment_confirmation_keyboard()
+            msg = await callback_query.message.answer(
+                f"Бронирование создано! ID: {booking.id}\n{amount_text}{hold_text(booking)}{payment_text}",
+                reply_markup=keyboard
+            )
+            # Сохраняем ID сообщения для возможного удаления при отмене
+            await state.update_data(booking_created_message_id=msg.message_id)
+        else:
+            # Телефона нет, переходим к вводу телефона
+            await state.set_state(BookingStates.waiting_for_phone)
+            from ..keyboards import skip_phone_keyboard
+            await callback_query.message.answer(
+                "📱 *У вас не указан номер телефона*\n\n"
+                "Хотите добавить его для связи? Отправьте номер телефона в формате:\n"
+                "+7XXXXXXXXXX или 8XXXXXXXXXX\n\n"
+                "Или нажмите 'Пропустить' чтобы продолжить без телефона.",
+                reply_markup=skip_phone_keyboard(),
+                parse_mode="Markdown"
+            )
+        
+    except ValidationError as e:
+        from ..keyboards import back_to_main_keyboard
+        # Обрабатываем ошибку лимита бронирований
+        error_message = str(e)
+        if "У вас уже есть" in error_message and "активных бронирований" in error_message:
+            # Показываем пользователю понятное сообщение об ошибке лимита
             await callback_query.message.answer(
-                "Произошла ошибка при создании бронирования. Пожалуйста, попробуйте позже или обратитесь к администратору.",
+                error_message,
                 reply_markup=back_to_main_keyboard()
             )
-            await state.clear()
+        elif SLOT_HELD_ERROR in error_message:
+            # Слот успели занять или удержать другим бронированием
+            await callback_query.message.answer(
+                SLOT_TAKEN_TEXT,
+                reply_markup=back_to_main_keyboard()
+            )
+        elif "прошлом" in error_message:
+            # Ошибка бронирования в прошлое
+            await callback_query.message.answer(
+                "Нельзя забронировать баню в прошлом. Пожалуйста, выберите будущую дату и время.",
+                reply_markup=back_to_main_keyboard()
+            )
+        else:
+            # Для других ValidationError показываем общее сообщение
+            logger.error(f"Validation error creating booking: {e}", exc_info=True)
+            await callback_query.message.answer(
+                "Произошла ошибка при создании бронирования. Пожалуйста, проверьте данные и попробуйте еще раз.",
+                reply_markup=back_to_main_keyboard()
+            )
+        await state.clear()
+    except Exception as e:
+        from ..keyboards import back_to_main_keyboard
+        logger.error(f"Error creating booking: {e}", exc_info=True)
+        await callback_query.message.answer(
+            "Произошла ошибка при создании бронирования. Пожалуйста, попробуйте позже или обратитесь к администратору.",
+            reply_markup=back_to_main_keyboard()
+        )
+        await state.clear()
 
 
 @router.callback_query(lambda c: c.data == "payment_reported")
@@ -500,7 +630,7 @@ async def report_payment(callback_query: types.CallbackQuery, state: FSMContext)
             return
         
         try:
-            await sync_to_async(services.report_payment)(booking_id)
+            await services.areport_payment(booking_id)
             
             from ..keyboards import main_menu_keyboard
             await callback_query.bot.send_message(
@@ -510,11 +640,16 @@ async def report_payment(callback_query: types.CallbackQuery, state: FSMContext)
             )
             await state.clear()
         except Exception as e:
-            logger.error(f"Error processing payment: {e}", exc_info=True)
             from ..keyboards import main_menu_keyboard
+            if isinstance(e, ValidationError) and SLOT_HELD_ERROR in str(e):
+                # Удержание истекло, и слот успел занять другой клиент
+                text = f"❌ Время удержания слота истекло, и его уже занял другой клиент. {SLOT_TAKEN_TEXT}"
+            else:
+                logger.error(f"Error processing payment: {e}", exc_info=True)
+                text = f"❌ Ошибка при обработке оплаты: {str(e)}"
             await callback_query.bot.send_message(
                 chat_id=chat_id,
-                text=f"❌ Ошибка при обработке оплаты: {str(e)}",
+                text=text,
                 reply_markup=main_menu_keyboard()
             )
             await state.clear()
@@ -542,7 +677,7 @@ async def cancel_booking(callback_query: types.CallbackQuery, state: FSMContext)
         
         if booking_id:
             try:
-                await sync_to_async(services.cancel_booking)(booking_id)
+                await services.acancel_booking(booking_id)
                 await callback_query.bot.send_message(
                     chat_id=chat_id,
                     text="✅ Бронирование отменено.",
@@ -578,7 +713,7 @@ async def back_to_main(callback_query: types.CallbackQuery, state: FSMContext) -
         if current_state == BookingStates.waiting_for_payment and 'booking_id' in data:
             try:
                 booking_id = data['booking_id']
-                await sync_to_async(services.cancel_booking)(booking_id)
+                await services.acancel_booking(booking_id)
                 logger.info(f"Auto-cancelled booking {booking_id} when user clicked 'назад'")
             except Exception as e:
                 logger.error(f"Failed to auto-cancel booking: {e}")
@@ -616,7 +751,7 @@ async def back_to_bathhouse_selection(callback_query: types.CallbackQuery, state
         if current_state == BookingStates.waiting_for_payment and 'booking_id' in data:
             try:
                 booking_id = data['booking_id']
-                await sync_to_async(services.cancel_booking)(booking_id)
+                await services.acancel_booking(booking_id)
                 logger.info(f"Auto-cancelled booking {booking_id} when user clicked 'назад' to bathhouse selection")
             except Exception as e:
                 logger.error(f"Failed to auto-cancel booking: {e}")
@@ -638,7 +773,7 @@ async def back_to_bathhouse_selection(callback_query: types.CallbackQuery, state
         await _update_activity_timestamp(state)
         
         # Получаем список активных бань
-        bathhouses = await sync_to_async(lambda: list(Bathhouse.objects.filter(is_active=True)))()
+        bathhouses = await services.aget_active_bathhouses()
         if bathhouses:
             from ..keyboards import bathhouses_keyboard
             keyboard = bathhouses_keyboard(bathhouses)
@@ -662,7 +797,7 @@ async def back_to_date_selection(callback_query: types.CallbackQuery, state: FSM
         if current_state == BookingStates.waiting_for_payment and 'booking_id' in data:
             try:
                 booking_id = data['booking_id']
-                await sync_to_async(services.cancel_booking)(booking_id)
+                await services.acancel_booking(booking_id)
                 logger.info(f"Auto-cancelled booking {booking_id} when user clicked 'назад' to date selection")
             except Exception as e:
                 logger.error(f"Failed to auto-cancel booking: {e}")
@@ -684,7 +819,7 @@ async def back_to_date_selection(callback_query: types.CallbackQuery, state: FSM
         await _update_activity_timestamp(state)
         
         from ..keyboards import date_selection_keyboard
-        keyboard = await date_selection_keyboard()
+        keyboard = await date_selection_keyboard(data.get("bathhouse_id"))
         date_msg = await callback_query.message.answer("Выберите дату:", reply_markup=keyboard)
         await state.update_data(date_selection_message_id=date_msg.message_id)
 
@@ -702,7 +837,7 @@ async def back_to_slots_selection(callback_query: types.CallbackQuery, state: FS
         if current_state == BookingStates.waiting_for_payment and 'booking_id' in data:
             try:
                 booking_id = data['booking_id']
-                await sync_to_async(services.cancel_booking)(booking_id)
+                await services.acancel_booking(booking_id)
                 logger.info(f"Auto-cancelled booking {booking_id} when user clicked 'назад' to slots selection")
             except Exception as e:
                 logger.error(f"Failed to auto-cancel booking: {e}")
@@ -739,12 +874,12 @@ async def back_to_slots_selection(callback_query: types.CallbackQuery, state: FS
         
         try:
             # Получаем доступные слоты
-            bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bathhouse_id)
-            available_slots = await sync_to_async(services.get_available_slots)(bathhouse, selected_date)
+            bathhouse = await Bathhouse.objects.aget(id=bathhouse_id)
+            slots_by_duration = await services.aget_available_slots_by_duration(bathhouse, selected_date)
+            available_slots = next(iter(slots_by_duration.values()), [])
             
             if available_slots:
-                from ..keyboards import slots_keyboard
-                keyboard = slots_keyboard(available_slots)
+                keyboard = await _slot_options_keyboard(state, bathhouse, selected_date, slots_by_duration)
                 slots_msg = await callback_query.message.answer("Выберите доступное время:", reply_markup=keyboard)
                 await state.update_data(slots_selection_message_id=slots_msg.message_id)
             else:
@@ -752,7 +887,7 @@ async def back_to_slots_selection(callback_query: types.CallbackQuery, state: FS
                 # Возвращаем к выбору даты
                 await state.set_state(BookingStates.waiting_for_date)
                 from ..keyboards import date_selection_keyboard
-                keyboard = await date_selection_keyboard()
+                keyboard = await date_selection_keyboard(bathhouse_id)
                 date_msg = await callback_query.message.answer("Выберите другую дату:", reply_markup=keyboard)
                 await state.update_data(date_selection_message_id=date_msg.message_id)
                 
@@ -772,7 +907,7 @@ async def view_schedule(callback_query: types.CallbackQuery, state: FSMContext)
         
         try:
             # Получаем список активных бань
-            bathhouses = await sync_to_async(lambda: list(Bathhouse.objects.filter(is_active=True)))()
+            bathhouses = await services.aget_active_bathhouses()
             
             if not bathhouses:
                 await callback_query.message.answer("К сожалению, сейчас нет доступных бань.")
@@ -828,47 +963,14 @@ async def process_schedule_calendar_date(callback_query: types.CallbackQuery, st
                 await state.clear()
                 return
             
-            # Получаем бани по ID
-            bathhouses = []
-            for bh_id in bathhouse_ids:
-                try:
-                    bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bh_id)
-                    bathhouses.append(bathhouse)
-                except Bathhouse.DoesNotExist:
-                    logger.warning(f"Bathhouse with id {bh_id} not found")
+            # Получаем бани, их бронирования и готовый текст расписания за один переход в синхронный код
+            schedule_text = await sync_to_async(services.get_day_schedule_for_bathhouses)(bathhouse_ids, selected_date)
             
-            if not bathhouses:
+            if not schedule_text:
                 await callback_query.message.answer("К сожалению, сейчас нет доступных бань.")
                 await state.clear()
                 return
             
-            # Собираем информацию о расписании на выбранную дату
-            schedule_text = f"📅 *Расписание свободных окон на {selected_date.strftime('%d.%m.%Y')}*\n\n"
-            
-            for bathhouse in bathhouses:
-                schedule_text += f"*{bathhouse.name}:*\n"
-                
-                try:
-                    # Получаем свободные интервалы
-                    free_intervals = await sync_to_async(services.get_free_intervals)(bathhouse, selected_date)
-                    
-                    # Объединяем смежные интервалы (с допуском 30 минут)
-                    merged_intervals = await sync_to_async(services.merge_adjacent_intervals)(free_intervals, gap_minutes=30)
-                    
-                    # Форматируем свободные интервалы
-                    formatted_intervals = await sync_to_async(services.format_free_intervals)(merged_intervals)
-                    
-                    if formatted_intervals:
-                        schedule_text += f"  Свободно: {formatted_intervals}\n"
-                    else:
-                        schedule_text += f"  Нет свободного времени\n"
-                        
-                except Exception as e:
-                    logger.error(f"Error getting free intervals for {bathhouse.name} on {selected_date}: {e}")
-                    schedule_text += f"  Ошибка получения данных\n"
-                
-                schedule_text += "\n"
-            
             # Отправляем расписание пользователю с кнопкой возврата на главную
             from ..keyboards import back_to_main_keyboard
             await callback_query.message.answer(
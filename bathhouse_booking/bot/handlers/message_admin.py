@@ -4,6 +4,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from asgiref.sync import sync_to_async
 from bathhouse_booking.bookings.models import SystemConfig, Client
+from bathhouse_booking.bookings.services import aget_or_create_client
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,7 +49,8 @@ async def cancel_message(message: types.Message, state: FSMContext):
     await message.answer("❌ Отправка сообщения отменена.")
 
 @router.message(MessageAdminStates.waiting_for_message)
-async def forward_to_admin(message: types.Message, state: FSMContext, bot):
+async def forward_to_admin(message: types.Message, state: FSMContext, bot,
+                           client: Optional[Client] = None):
     """Переслать сообщение администратору"""
     admin_id = await get_admin_telegram_id()
     
@@ -57,14 +60,12 @@ async def forward_to_admin(message: types.Message, state: FSMContext, bot):
         return
     
     try:
-        # Получаем или создаем клиента
-        client, created = await sync_to_async(Client.objects.get_or_create)(
-            telegram_id=str(message.from_user.id),
-            defaults={
-                'name': message.from_user.full_name or 'Неизвестный',
-                'phone': ''
-            }
-        )
+        # Клиента передает ClientMiddleware; новых клиентов создаем
+        if client is None:
+            client, created = await aget_or_create_client(
+                message.from_user.id,
+                name=message.from_user.full_name or 'Неизвестный'
+            )
         
         # Пересылаем сообщение администратору
         forwarded_msg = await message.forward(chat_id=admin_id)
@@ -2,29 +2,32 @@ from aiogram import Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from asgiref.sync import sync_to_async
 from bathhouse_booking.bookings.models import Client, Booking
-from bathhouse_booking.bookings.services import cancel_booking
+from bathhouse_booking.bookings.services import acancel_booking, aget_client
 from datetime import datetime
+from typing import Optional
 import pytz
 
 router = Router()
 
 BATHHOUSE_TIMEZONE = pytz.timezone('Asia/Jakarta')
 
-async def get_user_bookings(telegram_id: str):
+async def get_user_bookings(telegram_id: str, client: Optional[Client] = None):
     """Получить активные бронирования пользователя"""
     try:
-        # Находим клиента по telegram_id
-        client = await sync_to_async(Client.objects.get)(telegram_id=telegram_id)
+        # Находим клиента по telegram_id, если его не передал ClientMiddleware
+        if client is None:
+            client = await aget_client(telegram_id)
+        if client is None:
+            return []
         
-        # Получаем активные бронирования с prefetch_related для bathhouse
-        bookings = await sync_to_async(list)(
-            Booking.objects.filter(
+        # Получаем активные бронирования с select_related для bathhouse (async ORM)
+        bookings = [
+            booking async for booking in Booking.objects.filter(
                 client=client,
                 status__in=['pending', 'payment_reported', 'approved']
             ).select_related('bathhouse').order_by('start_datetime')
-        )
+        ]
         
         return bookings
     except Client.DoesNotExist:
@@ -103,11 +106,12 @@ def create_booking_detail_keyboard(booking_id, can_cancel=True):
     return builder.as_markup()
 
 @router.callback_query(lambda c: c.data == "my_bookings")
-async def show_my_bookings(callback: types.CallbackQuery, state: FSMContext):
+async def show_my_bookings(callback: types.CallbackQuery, state: FSMContext,
+                           client: Optional[Client] = None):
     """Показать активные бронирования пользователя"""
     await state.clear()
     
-    bookings = await get_user_bookings(str(callback.from_user.id))
+    bookings = await get_user_bookings(str(callback.from_user.id), client)
     
     if not bookings:
         await callback.message.edit_text(
@@ -124,16 +128,18 @@ async def show_my_bookings(callback: types.CallbackQuery, state: FSMContext):
     )
 
 @router.callback_query(lambda c: c.data.startswith("view_booking:"))
-async def view_booking_detail(callback: types.CallbackQuery, state: FSMContext):
+async def view_booking_detail(callback: types.CallbackQuery, state: FSMContext,
+                              client: Optional[Client] = None):
     """Показать детали бронирования"""
     booking_id = int(callback.data.split(":")[1])
     
     try:
         # Используем select_related для получения связанных объектов
-        booking = await sync_to_async(Booking.objects.select_related('bathhouse', 'client').get)(id=booking_id)
+        booking = await Booking.objects.select_related('bathhouse', 'client').aget(id=booking_id)
         
         # Проверяем, принадлежит ли бронирование текущему пользователю
-        client = await sync_to_async(Client.objects.get)(telegram_id=str(callback.from_user.id))
+        if client is None:
+            client = await Client.objects.aget(telegram_id=str(callback.from_user.id))
         if booking.client.id != client.id:
             await callback.answer("❌ Это не ваше бронирование!")
             return
@@ -152,21 +158,23 @@ async def view_booking_detail(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer(f"❌ Ошибка: {str(e)}")
 
 @router.callback_query(lambda c: c.data.startswith("cancel_booking:"))
-async def cancel_user_booking(callback: types.CallbackQuery, state: FSMContext):
+async def cancel_user_booking(callback: types.CallbackQuery, state: FSMContext,
+                              client: Optional[Client] = None):
     """Отменить бронирование пользователем"""
     booking_id = int(callback.data.split(":")[1])
     
     try:
         # Проверяем, принадлежит ли бронирование текущему пользователю
-        client = await sync_to_async(Client.objects.get)(telegram_id=str(callback.from_user.id))
-        booking = await sync_to_async(Booking.objects.select_related('client').get)(id=booking_id)
+        if client is None:
+            client = await Client.objects.aget(telegram_id=str(callback.from_user.id))  # type: ignore
+        booking = await Booking.objects.select_related('client').aget(id=booking_id)  # type: ignore
         
         if booking.client.id != client.id:
             await callback.answer("❌ Это не ваше бронирование!")
             return
         
         # Отменяем бронирование
-        await sync_to_async(cancel_booking)(booking_id)
+        await acancel_booking(booking_id)
         
         await callback.message.edit_text(
             "✅ Бронирование успешно отменено!\n\n"
@@ -184,6 +192,7 @@ async def cancel_user_booking(callback: types.CallbackQuery, state: FSMContext):
         )
 
 @router.callback_query(lambda c: c.data == "back_to_my_bookings")
-async def back_to_my_bookings(callback: types.CallbackQuery, state: FSMContext):
+async def back_to_my_bookings(callback: types.CallbackQuery, state: FSMContext,
+                              client: Optional[Client] = None):
     """Вернуться к списку бронирований"""
-    await show_my_bookings(callback, state)
\ No newline at end of file
+    await show_my_bookings(callback, state, client)
\ No newline at end of file
@@ -1,16 +1,18 @@
 from aiogram import Router, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from asgiref.sync import sync_to_async
-from bathhouse_booking.bookings.models import Client, Bathhouse
+from bathhouse_booking.bookings.models import SLOT_HELD_ERROR, Client, Bathhouse
 from bathhouse_booking.bookings import services
-from bathhouse_booking.bookings.config_init import get_config
+from bathhouse_booking.bookings.config_snapshot import ConfigSnapshot, get_config_snapshot_async
+from bathhouse_booking.bookings.idempotency import booking_request_key
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from typing import Optional
 import re
 import logging
 
 from ..states import BookingStates
+from .booking import SLOT_TAKEN_TEXT, hold_text
 
 logger = logging.getLogger(__name__)
 
@@ -48,12 +50,14 @@ def format_phone_number(phone: str) -> str:
     return phone
 
 @router.callback_query(lambda c: c.data == "skip_phone")
-async def skip_phone(callback: types.CallbackQuery, state: FSMContext):
+async def skip_phone(callback: types.CallbackQuery, state: FSMContext,
+                     config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None):
     """Пропустить ввод номера телефона"""
-    await create_booking_with_phone(callback, state, phone="")
+    await create_booking_with_phone(callback, state, phone="", config=config, client=client)
 
 @router.message(lambda message: message.text and not message.text.startswith('/'))
-async def handle_phone_input(message: types.Message, state: FSMContext):
+async def handle_phone_input(message: types.Message, state: FSMContext,
+                             config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None):
     """Обработать ввод номера телефона"""
     current_state = await state.get_state()
     if current_state != BookingStates.waiting_for_phone.state:
@@ -81,9 +85,10 @@ async def handle_phone_input(message: types.Message, state: FSMContext):
             self.from_user = message.from_user
     
     mock_callback = MockCallback(message)
-    await create_booking_with_phone(mock_callback, state, phone=formatted_phone)
+    await create_booking_with_phone(mock_callback, state, phone=formatted_phone, config=config, client=client)
 
-async def create_booking_with_phone(callback, state: FSMContext, phone: str):
+async def create_booking_with_phone(callback, state: FSMContext, phone: str,
+                                    config: Optional[ConfigSnapshot] = None, client: Optional[Client] = None):
     """Создать бронирование с указанным номером телефона"""
     from ..keyboards import payment_confirmation_keyboard, back_to_main_keyboard
     
@@ -111,38 +116,38 @@ async def create_booking_with_phone(callback, state: FSMContext, phone: str):
         return
     
     try:
-        # Получаем или создаем клиента
-        client, created = await sync_to_async(Client.objects.get_or_create)(
-            telegram_id=str(callback.from_user.id),
-            defaults={
-                'name': callback.from_user.full_name or callback.from_user.first_name or "Unknown",
-                'phone': phone,
-                'telegram_id': str(callback.from_user.id)
-            }
-        )
+        # Клиента передает ClientMiddleware; новых клиентов создаем
+        created = False
+        if client is None:
+            client, created = await services.aget_or_create_client(
+                callback.from_user.id,
+                name=callback.from_user.full_name or callback.from_user.first_name or "Unknown",
+                phone=phone
+            )
         
         # Если клиент уже существует, обновляем номер телефона если он был указан
         if not created and phone:
             client.phone = phone
-            await sync_to_async(client.save)()
+            await client.asave(update_fields=['phone'])
         
-        bathhouse = await sync_to_async(Bathhouse.objects.get)(id=bathhouse_id)
-        booking = await sync_to_async(services.create_booking_request)(
+        bathhouse = await Bathhouse.objects.aget(id=bathhouse_id)  # type: ignore
+        config = config or await get_config_snapshot_async()
+        booking = await services.acreate_booking_request(
             client=client,
             bathhouse=bathhouse,
             start=start_datetime,
-            end=end_datetime
+            end=end_datetime,
+            config=config,
+            # Повторное нажатие или повторная доставка callback вернет то же бронирование
+            idempotency_key=booking_request_key(callback.from_user.id, bathhouse_id, start_datetime, end_datetime)
         )
         
         # Сохраняем ID бронирования в состоянии
         await state.update_data(booking_id=booking.id)
         await state.set_state(BookingStates.waiting_for_payment)
         
-        # Показываем инструкцию по оплате из конфига
-        payment_text = await sync_to_async(get_config)(
-            "PAYMENT_INSTRUCTION", 
-            "Пожалуйста, переведите оплату на карту •1234 5678 9012 3456• и нажмите 'Я оплатил'"
-        )
+        # Показываем инструкцию по оплате из среза настроек
+        payment_text = config.payment_instruction
         
         keyboard = payment_confirmation_keyboard()
         
@@ -169,6 +174,7 @@ async def create_booking_with_phone(callback, state: FSMContext, phone: str):
             f"📱 Телефон: {phone if phone else 'не указан'}\n"
             f"🔢 ID бронирования: {booking.id}\n\n"
             f"{amount_text}"
+            f"{hold_text(booking)}"
             f"{payment_text}"
         )
         
@@ -195,6 +201,11 @@ async def create_booking_with_phone(callback, state: FSMContext, phone: str):
                 error_message,
                 reply_markup=back_to_main_keyboard()
             )
+        elif SLOT_HELD_ERROR in error_message:
+            await callback.message.answer(
+                SLOT_TAKEN_TEXT,
+                reply_markup=back_to_main_keyboard()
+            )
         elif "прошлом" in error_message:
             await callback.message.answer(
                 "Нельзя забронировать баню в прошлом. Пожалуйста, выберите будущую дату и время.",
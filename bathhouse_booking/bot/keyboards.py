@@ -5,6 +5,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 def main_menu_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(text="Забронировать баню", callback_data="book_bathhouse"))
+    builder.add(InlineKeyboardButton(text="Ближайшее свободное время", callback_data="nearest_free_time"))
     builder.add(InlineKeyboardButton(text="Посмотреть расписание", callback_data="view_schedule"))
     builder.add(InlineKeyboardButton(text="Мои бронирования", callback_data="my_bookings"))
     builder.add(InlineKeyboardButton(text="Написать админу", callback_data="message_admin"))
@@ -28,19 +29,48 @@ def bathhouses_keyboard(bathhouses) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-async def date_selection_keyboard() -> InlineKeyboardMarkup:
+async def date_selection_keyboard(bathhouse_id=None) -> InlineKeyboardMarkup:
     """Устаревшая функция, используйте календарь вместо этого"""
     from .calendar_utils import get_calendar_keyboard
-    return await get_calendar_keyboard()
+    return await get_calendar_keyboard(bathhouse_id=bathhouse_id)
 
 
-def slots_keyboard(slots) -> InlineKeyboardMarkup:
+def format_duration(minutes: int) -> str:
+    """Отформатировать длительность бронирования для кнопки"""
+    hours, rest = divmod(minutes, 60)
+    if not hours:
+        return f"{rest} мин"
+    return f"{hours} ч {rest} мин" if rest else f"{hours} ч"
+
+
+def slots_keyboard(slots, durations=None, selected_duration=None, prices=None) -> InlineKeyboardMarkup:
+    """Клавиатура слотов; при нескольких длительностях сверху добавляется ряд их переключения
+    :param slots: слоты (начало, конец) выбранной длительности
+    :param durations: доступные длительности в минутах
+    :param selected_duration: текущая длительность
+    :param prices: стоимость каждого слота в рублях (в порядке слотов)
+    """
     builder = InlineKeyboardBuilder()
-    for slot in slots:
+    row_sizes = []
+    if durations and len(durations) > 1:
+        for duration in durations:
+            label = format_duration(duration)
+            builder.add(InlineKeyboardButton(
+                text=f"✓ {label}" if duration == selected_duration else label,
+                callback_data=f"slot_duration:{duration}"
+            ))
+        # Не больше четырех длительностей в ряду
+        row_sizes.extend([4] * (len(durations) // 4))
+        if len(durations) % 4:
+            row_sizes.append(len(durations) % 4)
+    for index, slot in enumerate(slots):
         start_str = slot[0].strftime("%H:%M")
         end_str = slot[1].strftime("%H:%M")
+        text = f"{start_str} - {end_str}"
+        if prices is not None:
+            text += f" — {prices[index]} руб."
         builder.add(InlineKeyboardButton(
-            text=f"{start_str} - {end_str}",
+            text=text,
             callback_data=f"select_slot:{start_str}-{end_str}"
         ))
     # Добавляем кнопку "назад" к выбору даты
@@ -48,6 +78,25 @@ def slots_keyboard(slots) -> InlineKeyboardMarkup:
         text="⬅️ Назад",
         callback_data="back_to_date_selection"
     ))
+    builder.adjust(*row_sizes, 1)
+    return builder.as_markup()
+
+
+def nearest_slots_keyboard(slots) -> InlineKeyboardMarkup:
+    """Клавиатура ближайших свободных слотов: (баня, начало, конец)"""
+    builder = InlineKeyboardBuilder()
+    for bathhouse, start, end in slots:
+        start_str = start.strftime("%H:%M")
+        end_str = end.strftime("%H:%M")
+        builder.add(InlineKeyboardButton(
+            text=f"{bathhouse.name}: {start.strftime('%d.%m')} {start_str} - {end_str}",
+            callback_data=f"nearest_slot:{bathhouse.id}:{start.date().isoformat()}:{start_str}-{end_str}"
+        ))
+    # Добавляем кнопку "назад" к главному меню
+    builder.add(InlineKeyboardButton(
+        text="⬅️ Назад",
+        callback_data="back_to_main"
+    ))
     builder.adjust(1)
     return builder.as_markup()
 
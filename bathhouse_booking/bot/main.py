@@ -84,6 +84,36 @@ async def notification_queue_worker(bot: Bot) -> None:
         await asyncio.sleep(5)
 
 
+async def hold_sweeper_worker() -> None:
+    """Фоновая задача для снятия истекших удержаний слотов"""
+    from django.conf import settings
+    from bathhouse_booking.bookings.holds import release_expired_holds
+
+    interval = getattr(settings, "HOLD_SWEEP_INTERVAL_SECONDS", 60)
+    while True:
+        try:
+            await sync_to_async(release_expired_holds)()
+        except Exception as e:
+            logger.error(f"Error in hold sweeper worker: {e}")
+
+        await asyncio.sleep(interval)
+
+
+async def active_bookings_recount_worker() -> None:
+    """Фоновая задача для пересчета счетчиков активных бронирований (закончившиеся бронирования, расхождения)"""
+    from django.conf import settings
+    from bathhouse_booking.bookings.active_bookings import recount_active_bookings
+
+    interval = getattr(settings, "ACTIVE_BOOKINGS_RECOUNT_INTERVAL_SECONDS", 600)
+    while True:
+        try:
+            await sync_to_async(recount_active_bookings)()
+        except Exception as e:
+            logger.error(f"Error in active bookings recount worker: {e}")
+
+        await asyncio.sleep(interval)
+
+
 async def main() -> None:
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not bot_token:
@@ -111,17 +141,22 @@ async def main() -> None:
     
     # Запускаем фоновую задачу для обработки очереди уведомлений
     queue_task = asyncio.create_task(notification_queue_worker(bot))
+    # Запускаем фоновую задачу для снятия истекших удержаний слотов
+    sweeper_task = asyncio.create_task(hold_sweeper_worker())
+    # Запускаем фоновую задачу для пересчета счетчиков активных бронирований
+    recount_task = asyncio.create_task(active_bookings_recount_worker())
     
     logger.info("Bot starting...")
     try:
         await dp.start_polling(bot)
     finally:
-        # Отменяем фоновую задачу при остановке бота
-        queue_task.cancel()
-        try:
-            await queue_task
-        except asyncio.CancelledError:
-            pass
+        # Отменяем фоновые задачи при остановке бота
+        for task in (queue_task, sweeper_task, recount_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
 
 if __name__ == "__main__":
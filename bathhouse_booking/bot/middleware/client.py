@@ -0,0 +1,24 @@
+"""
+Middleware, передающее обработчикам клиента, от которого пришло обновление.
+"""
+import logging
+from aiogram import BaseMiddleware
+
+from bathhouse_booking.bookings.services import aget_client
+
+logger = logging.getLogger(__name__)
+
+
+class ClientMiddleware(BaseMiddleware):
+    """
+    Найти Client по Telegram ID отправителя один раз на обновление и положить его в data["client"].
+
+    Клиент ищется одним запросом (по первичному ключу, если Telegram ID уже
+    встречался); для пользователей, которые еще не бронировали, там будет None.
+    """
+    
+    async def __call__(self, handler, event, data):
+        if "client" not in data:
+            user = data.get("event_from_user")
+            data["client"] = await aget_client(user.id) if user is not None else None
+        return await handler(event, data)
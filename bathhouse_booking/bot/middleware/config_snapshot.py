@@ -0,0 +1,21 @@
+"""
+Middleware, передающее обработчикам срез настроек системы.
+"""
+import logging
+from aiogram import BaseMiddleware
+
+from bathhouse_booking.bookings.config_snapshot import get_config_snapshot_async
+from bathhouse_booking.bookings.config_version import config_version_watcher
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigSnapshotMiddleware(BaseMiddleware):
+    """Получить ConfigSnapshot один раз на обновление и положить его в data["config"]"""
+    
+    async def __call__(self, handler, event, data):
+        if "config" not in data:
+            # Изменения настроек из другого процесса (админка) сверяются не чаще раза в несколько секунд
+            await config_version_watcher.acheck()
+            data["config"] = await get_config_snapshot_async()
+        return await handler(event, data)
@@ -32,7 +32,11 @@ class SessionTimeoutMiddleware(BaseMiddleware):
         # Проверяем timestamp последней активности
         last_activity = state_data.get("last_activity")
         if last_activity:
-            timeout_minutes = await get_config_int_async("BOOKING_SESSION_TIMEOUT_MINUTES", 30)
+            config = data.get("config")
+            if config is not None:
+                timeout_minutes = config.session_timeout_minutes
+            else:
+                timeout_minutes = await get_config_int_async("BOOKING_SESSION_TIMEOUT_MINUTES", 30)
             timeout_seconds = timeout_minutes * 60
             
             if time.time() - last_activity > timeout_seconds:
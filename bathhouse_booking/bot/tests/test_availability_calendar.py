@@ -0,0 +1,38 @@
+import asyncio
+import datetime
+from unittest.mock import patch
+
+from aiogram_calendar import SimpleCalendar
+
+from bot.calendar_utils import FULL_DAY_MARK, PAST_DAY_TEXT, _local_today, mark_unavailable_days
+
+
+def _day_buttons(markup):
+    return {
+        button.text: button.callback_data
+        for row in markup.inline_keyboard[3:-1]
+        for button in row
+    }
+
+
+class TestAvailabilityCalendar:
+    """Тесты отметок недоступных дней в календаре бронирования"""
+
+    def test_past_and_full_days_are_disabled(self):
+        markup = asyncio.run(SimpleCalendar().start_calendar(year=2030, month=2))
+        today = datetime.date(2030, 2, 10)
+        availability = {datetime.date(2030, 2, 12): 0, datetime.date(2030, 2, 13): 5}
+
+        buttons = _day_buttons(mark_unavailable_days(markup, availability, today))
+
+        assert "9" not in buttons
+        assert buttons[PAST_DAY_TEXT] == SimpleCalendar.ignore_callback
+        assert buttons[f"12{FULL_DAY_MARK}"] == SimpleCalendar.ignore_callback
+        assert buttons["13"] != SimpleCalendar.ignore_callback
+        assert buttons["10"] != SimpleCalendar.ignore_callback
+
+    def test_today_is_local_bathhouse_date(self):
+        # 18:00 UTC - в Джакарте (GMT+7) уже следующий день
+        now = datetime.datetime(2030, 2, 9, 18, 0, tzinfo=datetime.timezone.utc)
+        with patch("django.utils.timezone.now", return_value=now):
+            assert _local_today() == datetime.date(2030, 2, 10)
@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from bathhouse_booking.bookings.config_snapshot import ConfigSnapshot
+from bathhouse_booking.bookings.config_version import config_version_watcher
+from bathhouse_booking.bot.middleware.config_snapshot import ConfigSnapshotMiddleware
+
+
+def test_middleware_injects_snapshot_once():
+    snapshot = ConfigSnapshot.from_values({"OPEN_HOUR": "10"})
+    handler = AsyncMock(return_value="ok")
+    data = {}
+
+    with patch(
+        "bathhouse_booking.bot.middleware.config_snapshot.get_config_snapshot_async",
+        AsyncMock(return_value=snapshot),
+    ) as get_snapshot, patch.object(config_version_watcher, "acheck", AsyncMock(return_value=False)) as check:
+        result = asyncio.run(ConfigSnapshotMiddleware()(handler, object(), data))
+        # Повторный проход (вложенный роутер) не перечитывает настройки
+        asyncio.run(ConfigSnapshotMiddleware()(handler, object(), data))
+
+    assert result == "ok"
+    assert data["config"] is snapshot
+    get_snapshot.assert_awaited_once()
+    check.assert_awaited_once()
+    assert handler.await_args.args[1]["config"] is snapshot
+
+
+def test_client_middleware_injects_client_once():
+    from bathhouse_booking.bot.middleware.client import ClientMiddleware
+
+    client = object()
+    handler = AsyncMock(return_value="ok")
+    data = {"event_from_user": type("User", (), {"id": 100})()}
+
+    with patch(
+        "bathhouse_booking.bot.middleware.client.aget_client", AsyncMock(return_value=client)
+    ) as get_client:
+        result = asyncio.run(ClientMiddleware()(handler, object(), data))
+        asyncio.run(ClientMiddleware()(handler, object(), data))
+
+    assert result == "ok"
+    assert data["client"] is client
+    get_client.assert_awaited_once_with(100)
+
+
+def test_client_middleware_without_user():
+    from bathhouse_booking.bot.middleware.client import ClientMiddleware
+
+    data = {}
+    with patch("bathhouse_booking.bot.middleware.client.aget_client", AsyncMock()) as get_client:
+        asyncio.run(ClientMiddleware()(AsyncMock(), object(), data))
+
+    assert data["client"] is None
+    get_client.assert_not_awaited()
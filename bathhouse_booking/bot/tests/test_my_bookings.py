@@ -94,24 +94,14 @@ class TestMyBookings:
         mock_booking.id = 1
         mock_booking.client = mock_client
         
-        # Мокаем sync_to_async для разных вызовов
-        with patch('bot.handlers.my_bookings.sync_to_async') as mock_sync:
-            # Создаем async функции для моков
-            call_count = 0
-            async def async_mock(*args, **kwargs):
-                nonlocal call_count
-                call_count += 1
-                if call_count == 1:  # Client.objects.get
-                    return mock_client
-                elif call_count == 2:  # Booking.objects.select_related().get
-                    return mock_booking
-                elif call_count == 3:  # cancel_booking
-                    return None
-                return MagicMock()
-            
-            mock_sync.return_value = async_mock
-            
+        # Мокаем асинхронные запросы к ORM
+        bookings = MagicMock()
+        bookings.aget = AsyncMock(return_value=mock_booking)
+        with patch.object(Client.objects, 'aget', AsyncMock(return_value=mock_client)), \
+                patch.object(Booking.objects, 'select_related', return_value=bookings), \
+                patch('bot.handlers.my_bookings.acancel_booking', AsyncMock(return_value=None)) as mock_cancel:
             await cancel_user_booking(mock_callback, state)
+            mock_cancel.assert_awaited_once_with(1)
         
         # Проверяем сообщение об успешной отмене
         mock_message.edit_text.assert_called_once()
@@ -25,15 +25,12 @@ class TestScheduleCalendar:
         storage = MemoryStorage()
         state = FSMContext(storage=storage, key=StorageKey(bot_id=123, chat_id=123, user_id=456))
         
-        # Мокаем sync_to_async для получения бань
-        with patch('bot.handlers.booking.sync_to_async') as mock_sync:
-            mock_bathhouse = MagicMock(name="Баня 1", is_active=True)
-            mock_bathhouse.id = 1
-            mock_bathhouses = [mock_bathhouse]
-            # sync_to_async должен возвращать async функцию
-            async def mock_async_func(*args, **kwargs):
-                return mock_bathhouses
-            mock_sync.return_value = mock_async_func
+        # Мокаем получение активных бань (async ORM)
+        mock_bathhouse = MagicMock(name="Баня 1", is_active=True)
+        mock_bathhouse.id = 1
+        mock_bathhouses = [mock_bathhouse]
+        with patch('bot.handlers.booking.services.aget_active_bathhouses',
+                   AsyncMock(return_value=mock_bathhouses)):
             
             # Мокаем календарь - патчим модуль в sys.modules
             import sys
@@ -69,12 +66,7 @@ class TestScheduleCalendar:
         state = FSMContext(storage=storage, key=StorageKey(bot_id=123, chat_id=123, user_id=456))
         
         # Мокаем пустой список бань
-        with patch('bot.handlers.booking.sync_to_async') as mock_sync:
-            # sync_to_async должен возвращать async функцию
-            async def mock_async_func(*args, **kwargs):
-                return []
-            mock_sync.return_value = mock_async_func
-            
+        with patch('bot.handlers.booking.services.aget_active_bathhouses', AsyncMock(return_value=[])):
             await view_schedule(mock_callback, state)
         
         # Проверяем сообщение об отсутствии бань
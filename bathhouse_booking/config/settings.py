@@ -131,6 +131,29 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'  # type: ignore
 
 
+# Кэш доступных слотов и свободных интервалов в памяти процесса
+AVAILABILITY_CACHE_SIZE = int(os.getenv('AVAILABILITY_CACHE_SIZE', '1024'))
+AVAILABILITY_CACHE_TTL_SECONDS = int(os.getenv('AVAILABILITY_CACHE_TTL_SECONDS', '60'))
+
+# Кэш SystemConfig в памяти процесса
+CONFIG_CACHE_TTL_SECONDS = int(os.getenv('CONFIG_CACHE_TTL_SECONDS', '60'))
+# Как часто процесс сверяет общую версию настроек (изменения из другого процесса)
+CONFIG_VERSION_CHECK_SECONDS = int(os.getenv('CONFIG_VERSION_CHECK_SECONDS', '5'))
+
+# Как часто бот снимает истекшие удержания слотов
+HOLD_SWEEP_INTERVAL_SECONDS = int(os.getenv('HOLD_SWEEP_INTERVAL_SECONDS', '60'))
+
+# Как часто бот пересчитывает счетчики активных бронирований клиентов
+ACTIVE_BOOKINGS_RECOUNT_INTERVAL_SECONDS = int(os.getenv('ACTIVE_BOOKINGS_RECOUNT_INTERVAL_SECONDS', '600'))
+
+# Размер карты Telegram ID -> ID клиента в памяти процесса бота
+CLIENT_IDENTITY_MAP_SIZE = int(os.getenv('CLIENT_IDENTITY_MAP_SIZE', '10000'))
+
+# Сколько секунд повторный запрос на то же бронирование возвращает уже созданное
+BOOKING_IDEMPOTENCY_TTL_SECONDS = int(os.getenv('BOOKING_IDEMPOTENCY_TTL_SECONDS', '120'))
+BOOKING_IDEMPOTENCY_MAX_SIZE = int(os.getenv('BOOKING_IDEMPOTENCY_MAX_SIZE', '10000'))
+
+
 # Logging configuration
 # https://docs.djangoproject.com/en/5.2/topics/logging/
 LOGGING = {
@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    """Сбрасывать кэши в памяти процесса между тестами: откат транзакций их не затрагивает"""
+    from bathhouse_booking.bookings.availability_cache import availability_cache
+    from bathhouse_booking.bookings.client_identity import client_identity_map
+    from bathhouse_booking.bookings.config_init import config_cache
+    from bathhouse_booking.bookings.config_version import config_version_watcher
+    from bathhouse_booking.bookings.idempotency import recent_booking_requests
+    from bathhouse_booking.bookings.pricing import price_cache
+    from bathhouse_booking.bookings.schedule import schedule_cache
+
+    availability_cache.clear()
+    config_cache.invalidate()
+    schedule_cache.invalidate()
+    price_cache.invalidate()
+    config_version_watcher.reset()
+    client_identity_map.clear()
+    recent_booking_requests.clear()
+    yield
+    availability_cache.clear()
+    config_cache.invalidate()
+    schedule_cache.invalidate()
+    price_cache.invalidate()
+    config_version_watcher.reset()
+    client_identity_map.clear()
+    recent_booking_requests.clear()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк расчета доступных слотов: прежний перебор "слот x бронирование"
+против однопроходного движка по интервалам и чтения битовой карты суток
+(как в DayOccupancy) из bookings.availability.
+
+Запуск из корня репозитория:
+    python scripts/bench_available_slots.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, time, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bathhouse_booking.bookings.availability import (
+    find_available_slots,
+    find_available_slots_in_bits,
+    merge_busy_intervals,
+    occupancy_bits_by_day,
+)
+
+BATHHOUSE_TIMEZONE = pytz.timezone('Asia/Jakarta')
+OPEN_HOUR = 9
+CLOSE_HOUR = 22
+SLOT_STEP_MINUTES = 5
+MIN_BOOKING_MINUTES = 60
+BOOKINGS_PER_DAY = (10, 100, 1000)
+
+
+def legacy_available_slots(date, approved_bookings):
+    """Копия прежней реализации services.get_available_slots без обращения к БД."""
+    slots = []
+    current_time_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(OPEN_HOUR, 0)))
+    end_time_local = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(CLOSE_HOUR, 0)))
+
+    while current_time_local < end_time_local:
+        slot_start_local = current_time_local
+        slot_end_local = slot_start_local + timedelta(minutes=MIN_BOOKING_MINUTES)
+
+        if slot_end_local <= end_time_local:
+            slot_start_utc = slot_start_local.astimezone(pytz.UTC)
+            slot_end_utc = slot_end_local.astimezone(pytz.UTC)
+
+            overlaps = False
+            for booking_start, booking_end in approved_bookings:
+                if not (slot_end_utc <= booking_start or slot_start_utc >= booking_end):
+                    overlaps = True
+                    break
+
+            if not overlaps:
+                slots.append((slot_start_local, slot_end_local))
+
+        current_time_local += timedelta(minutes=SLOT_STEP_MINUTES)
+
+    return slots
+
+
+def engine_available_slots(date, approved_bookings):
+    """Новая реализация на отсортированных интервалах."""
+    return find_available_slots(
+        merge_busy_intervals(approved_bookings),
+        BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(OPEN_HOUR, 0))),
+        BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(CLOSE_HOUR, 0))),
+        SLOT_STEP_MINUTES,
+        MIN_BOOKING_MINUTES,
+    )
+
+
+def bitmap_available_slots(date, bits):
+    """Чтение по готовой битовой карте суток, как в services.get_available_slots."""
+    open_time = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(OPEN_HOUR, 0)))
+    slots = []
+    for start_minute in find_available_slots_in_bits(
+        bits, OPEN_HOUR * 60, CLOSE_HOUR * 60, SLOT_STEP_MINUTES, MIN_BOOKING_MINUTES
+    ):
+        slot_start = open_time + timedelta(minutes=start_minute - OPEN_HOUR * 60)
+        slots.append((slot_start, slot_start + timedelta(minutes=MIN_BOOKING_MINUTES)))
+    return slots
+
+
+def make_bookings(date, count, rng):
+    """Сгенерировать count коротких бронирований, разбросанных по рабочему дню (в UTC)."""
+    day_start = BATHHOUSE_TIMEZONE.localize(datetime.combine(date, time(OPEN_HOUR, 0)))
+    working_minutes = (CLOSE_HOUR - OPEN_HOUR) * 60
+    bookings = []
+    for _ in range(count):
+        start = day_start + timedelta(minutes=rng.randrange(working_minutes))
+        end = start + timedelta(minutes=rng.randint(1, 3))
+        bookings.append((start.astimezone(pytz.UTC), end.astimezone(pytz.UTC)))
+    # Как из БД: order_by("start_datetime")
+    bookings.sort()
+    return bookings
+
+
+def main():
+    rng = random.Random(0)
+    date = datetime(2030, 1, 15).date()
+
+    print(f"{'bookings':>8} | {'legacy, ms':>10} | {'engine, ms':>10} | {'bitmap, ms':>10} | {'speedup':>7}")
+    print("-" * 58)
+    for count in BOOKINGS_PER_DAY:
+        bookings = make_bookings(date, count, rng)
+
+        legacy = legacy_available_slots(date, bookings)
+        engine = engine_available_slots(date, bookings)
+        bits = occupancy_bits_by_day(bookings, BATHHOUSE_TIMEZONE).get(date, 0)
+        bitmap = bitmap_available_slots(date, bits)
+        assert legacy == engine == bitmap, f"Results differ for {count} bookings"
+
+        number = max(1, 2000 // count)
+        legacy_ms = timeit.timeit(lambda: legacy_available_slots(date, bookings), number=number) / number * 1000
+        engine_ms = timeit.timeit(lambda: engine_available_slots(date, bookings), number=number) / number * 1000
+        bitmap_ms = timeit.timeit(lambda: bitmap_available_slots(date, bits), number=number) / number * 1000
+        print(
+            f"{count:>8} | {legacy_ms:>10.3f} | {engine_ms:>10.3f} | {bitmap_ms:>10.3f} | "
+            f"{legacy_ms / min(engine_ms, bitmap_ms):>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()